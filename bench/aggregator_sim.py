@@ -0,0 +1,380 @@
+"""Run an aggregator and several local sensor processes on recorded scans.
+
+    python bench/aggregator_sim.py --sites 3 --sensors 2 --duration 8
+    python bench/aggregator_sim.py --load 300 --duration 10
+
+Every site sees the protected SSID CorpNet on its own access points; all of
+them go into the shared baseline. One site's second recorded scan adds a
+CorpNet BSSID that is not in the baseline, and the run fails (exit 1) unless
+the aggregator raises exactly that `single_site` alert for that site.
+--load adds that many in-process virtual sensors uploading every
+--upload-interval seconds, to check the aggregator keeps up. Everything
+talks to the aggregator with a shared token; the run also fails if a
+baseline upload without it, or with a wrong one, is accepted, if a gzip
+body that inflates past the size limit or a malformed body gets anything
+but a 400, if a baseline upload that changes nothing bumps the baseline
+version, or if an upload whose reply was lost loses events when it is
+retried. A sensor whose upload is refused must resync, and one with a
+wrong token must stop.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth
+from roguefinder.bssid import format_bssid
+from roguefinder.netsh_parser import AP
+from roguefinder.aggregator import MAX_BODY, SensorIndex
+from roguefinder.baseline import BaselineStore
+from roguefinder.uplink import TOKEN_ENV, Uplink, push_baseline
+
+PROTECTED = "CorpNet"
+ROGUE = 0x02C0FFEE0001
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def site_networks(site, neighbours=20):
+    legit = [synth.bssid_for(100 * site + k) for k in range(4)]
+    networks = [(PROTECTED, legit)]
+    rng = random.Random(site)
+    for n in range(neighbours):
+        networks.append((f"Neighbour-{site}-{n}", [synth.bssid_for(10000 + 100 * site + n)]))
+    if rng.random() < 0.5:
+        networks.append(("", [synth.bssid_for(20000 + site)]))
+    return legit, networks
+
+
+def write_site(path, site, rogue):
+    os.makedirs(path, exist_ok=True)
+    legit, networks = site_networks(site)
+    scans = [networks]
+    if rogue:
+        scans.append([(PROTECTED, legit + [ROGUE])] + networks[1:])
+    for i, scan in enumerate(scans):
+        with open(os.path.join(path, f"networks_bssid_{i}.txt"), "w", encoding="utf-8", newline="") as f:
+            f.write(synth.render_networks(scan, seed=site))
+    with open(os.path.join(path, "interfaces.txt"), "w", encoding="utf-8", newline="") as f:
+        f.write(synth.interfaces_output(PROTECTED, legit[0]))
+    return legit
+
+
+def get(url, token):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(request, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def post_status(url, body, headers):
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        # The server dropped the connection instead of answering.
+        return None
+
+
+def wait_listening(url, proc, token, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            get(url + "/v1/stats", token)
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def check_refusals(url, token):
+    """Writes the aggregator must refuse; returns failure messages."""
+    failures = []
+    if push_baseline(url, PROTECTED, [ROGUE], replace=False):
+        failures.append("baseline upload without a token was accepted")
+    if push_baseline(url, PROTECTED, [ROGUE], replace=False, token=token + "x"):
+        failures.append("baseline upload with a wrong token was accepted")
+    # A few hundred KB that inflate to more than MAX_BODY.
+    bomb = gzip.compress(b'{"ssid":"' + PROTECTED.encode() + b'","bssids":[' + b" " * (MAX_BODY + 1024) + b"]}")
+    status = post_status(url + "/v1/baseline", bomb, {"Content-Type": "application/json", "Content-Encoding": "gzip",
+                                                      "Authorization": f"Bearer {token}"})
+    if status != 400:
+        failures.append(f"oversized gzip body got status {status}, expected 400")
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    malformed = [
+        ("/v1/deltas", {"sensor": "bad", "seq": 1, "full": True, "add": [[PROTECTED, ROGUE]]}),
+        ("/v1/deltas", {"sensor": "bad", "seq": 1, "full": True, "add": {PROTECTED: ROGUE}}),
+        ("/v1/deltas", {"sensor": "bad", "seq": "1", "add": {}}),
+        ("/v1/deltas", {"sensor": ["bad"], "seq": 1}),
+        ("/v1/baseline", {"ssid": [PROTECTED], "bssids": [ROGUE]}),
+        ("/v1/baseline", {"ssid": PROTECTED, "bssids": "notalist"}),
+        ("/v1/baseline", {"ssid": PROTECTED, "bssids": [ROGUE], "replace": "yes"}),
+    ]
+    for path, body in malformed:
+        status = post_status(url + path, json.dumps(body).encode(), headers)
+        if status != 400:
+            failures.append(f"malformed {path} body {body} got status {status}, expected 400")
+    push_baseline(url, PROTECTED, [], token=token)
+    version = get(url + "/v1/baseline", token)["version"]
+    push_baseline(url, PROTECTED, [], token=token)
+    push_baseline(url, PROTECTED, [], replace=False, token=token)
+    if get(url + "/v1/baseline", token)["version"] != version:
+        failures.append("a baseline upload that changed nothing bumped the version")
+    uplink = Uplink(url, "wrong-token", "nowhere", interval=0.1, token=token + "x")
+    uplink.record([], [], lambda: [AP(PROTECTED, ROGUE)])
+    deadline = time.monotonic() + 5
+    while uplink.rejected is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    uplink.close()
+    if uplink.rejected is None:
+        failures.append(f"an uplink with a wrong token kept retrying ({uplink.failures} failed uploads)")
+    return failures
+
+
+class LossyConnection:
+    """Feeds uploads straight to a SensorIndex. Drops the replies to the
+    request numbers in `lose`; answers those in `refuse` with that status
+    without applying them."""
+
+    def __init__(self, index):
+        self.index = index
+        self.lose = set()
+        self.refuse = {}
+        self.requests = 0
+        self.sent = []
+
+    def request(self, method, path, obj=None, headers=None):
+        self.requests += 1
+        if path != "/deltas":
+            return 200, None, {"version": self.index.version, "ssids": {}}
+        self.sent.append(obj)
+        if self.requests in self.refuse:
+            return self.refuse[self.requests], None, {"error": "refused"}
+        reply = self.index.ingest(obj)
+        if self.requests in self.lose:
+            raise OSError("reply lost")
+        return 200, None, reply
+
+    def close(self):
+        pass
+
+
+def check_lost_reply(tmp):
+    """An upload the aggregator applied but whose reply was lost must not cost later events."""
+    index = SensorIndex(BaselineStore.open_dir(os.path.join(tmp, "lossy")))
+    uplink = Uplink("127.0.0.1:1", "lossy", "lossy-site", interval=3600)
+    uplink.conn = conn = LossyConnection(index)
+    aps = [AP(PROTECTED, synth.bssid_for(40000 + k)) for k in range(3)]
+    uplink.record([], [], lambda: aps[:1])
+    uplink.flush()
+    uplink.record(aps[1:2], [], None)
+    conn.lose.add(conn.requests + 1)
+    uplink.flush()
+    uplink.record(aps[2:], [], None)
+    uplink.flush()
+    uplink.flush()
+    uplink.close()
+    got = set(index.snapshot().get(PROTECTED, {}))
+    missing = {format_bssid(ap.bssid) for ap in aps} - got
+    return [f"events lost after a lost reply: {sorted(missing)}"] if missing else []
+
+
+def check_refused_upload(tmp):
+    """A refused upload is not resent: 4xx leads to a full snapshot, 401 stops the uplink."""
+    index = SensorIndex(BaselineStore.open_dir(os.path.join(tmp, "refused")))
+    uplink = Uplink("127.0.0.1:1", "refused", "refused-site", interval=3600)
+    uplink.conn = conn = LossyConnection(index)
+    aps = [AP(PROTECTED, synth.bssid_for(41000 + k)) for k in range(3)]
+    uplink.record([], [], lambda: aps[:1])
+    uplink.flush()
+    uplink.record(aps[1:2], [], None)
+    conn.refuse[conn.requests + 1] = 400
+    uplink.flush()
+    uplink.record(aps[2:], [], lambda: aps)
+    uplink.flush()
+    failures = []
+    if not conn.sent[-1].get("full"):
+        failures.append("a 400 was not followed by a full snapshot")
+    got = set(index.snapshot().get(PROTECTED, {}))
+    if got != {format_bssid(ap.bssid) for ap in aps}:
+        failures.append(f"index after a refused upload: {sorted(got)}")
+    conn.refuse[conn.requests + 1] = 401
+    uplink.record([], aps[2:], None)
+    uplink.flush()
+    sent = len(conn.sent)
+    uplink.record([], aps[1:2], None)
+    uplink.flush()
+    uplink.close()
+    if uplink.rejected is None or len(conn.sent) != sent:
+        failures.append("the uplink kept uploading after a 401")
+    return failures
+
+
+def virtual_load(url, count, interval, stop, counters, token):
+    """In-process sensors: each reports a few APs and churns one every cycle."""
+    uplinks = []
+    tables = []
+    for i in range(count):
+        aps = [AP(f"Load-{i % 50}", synth.bssid_for(30000 + i * 8 + k)) for k in range(6)]
+        tables.append(aps)
+        uplinks.append(Uplink(url, f"load-{i}", f"load-site-{i % 25}", interval=interval, token=token))
+    tick = 0
+    while not stop.is_set():
+        for uplink, aps in zip(uplinks, tables):
+            churn = aps[tick % len(aps)]
+            if tick % 2:
+                uplink.record([churn], [], lambda aps=aps: aps)
+            else:
+                uplink.record([], [churn], lambda aps=aps: aps)
+        tick += 1
+        stop.wait(interval)
+    for uplink in uplinks:
+        uplink.close()
+        counters["uploads"] += uplink.uploads
+        counters["failures"] += uplink.failures
+
+
+def main():
+    p = argparse.ArgumentParser(description="Exercise the aggregator with local sensor processes")
+    p.add_argument("--sites", type=int, default=3)
+    p.add_argument("--sensors", type=int, default=2, help="sensor processes per site")
+    p.add_argument("--rogue-site", type=int, default=1, help="site whose scans include the rogue BSSID")
+    p.add_argument("--duration", type=float, default=8, help="seconds to let the sensors run")
+    p.add_argument("--upload-interval", type=float, default=1)
+    p.add_argument("--load", type=int, default=0, help="extra in-process virtual sensors")
+    p.add_argument("--keep", action="store_true", help="keep the temporary directory")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="aggsim-")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    alerts_path = os.path.join(tmp, "aggregator.jsonl")
+    token = secrets.token_urlsafe(24)
+    env = dict(os.environ, **{TOKEN_ENV: token})
+    procs = []
+    agg = subprocess.Popen([sys.executable, "-m", "roguefinder.aggregator", "--listen", f"127.0.0.1:{port}",
+                            "--dir", os.path.join(tmp, "aggregator"), "--events", alerts_path,
+                            "--stale-after", "30"], cwd=ROOT, env=env)
+    failures = []
+    try:
+        if not wait_listening(url, agg, token):
+            print("aggregator did not start", file=sys.stderr)
+            sys.exit(1)
+        failures += check_refusals(url, token)
+        failures += check_lost_reply(tmp)
+        failures += check_refused_upload(tmp)
+        baseline = []
+        for site in range(args.sites):
+            baseline += write_site(os.path.join(tmp, f"site-{site}"), site, site == args.rogue_site)
+        if not push_baseline(url, PROTECTED, baseline, token=token):
+            print("could not seed the shared baseline", file=sys.stderr)
+            sys.exit(1)
+
+        for site in range(args.sites):
+            for n in range(args.sensors):
+                sensor = f"s-{site}-{n}"
+                data = os.path.join(tmp, sensor)
+                os.makedirs(data)
+                procs.append(subprocess.Popen(
+                    [sys.executable, os.path.join(ROOT, "rogue_finder.py"), "--recorded", os.path.join(tmp, f"site-{site}"),
+                     "--data-dir", data, "--aggregator", url, "--sensor-id", sensor, "--site", f"site-{site}",
+                     "--upload-interval", str(args.upload_interval), "--interval", "1", "--fixed-interval",
+                     "--daemon", "--events", os.path.join(data, "events.jsonl")],
+                    cwd=data, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+        stop = threading.Event()
+        counters = {"uploads": 0, "failures": 0}
+        loader = None
+        if args.load:
+            loader = threading.Thread(target=virtual_load,
+                                      args=(url, args.load, args.upload_interval, stop, counters, token))
+            loader.start()
+        start = time.monotonic()
+        time.sleep(args.duration)
+        stats = get(url + "/v1/stats", token)
+        index = get(url + "/v1/index", token)
+        stop.set()
+        if loader is not None:
+            loader.join()
+        elapsed = time.monotonic() - start
+
+        print(f"sensors: {stats['sensors']}  sites: {stats['sites']}  ssids: {stats['ssids']}  "
+              f"bssids: {stats['bssids']}  requests: {stats['requests']} ({stats['requests'] / elapsed:.0f}/s)")
+        if args.load:
+            print(f"virtual sensors: {args.load}  uploads: {counters['uploads']}  failed: {counters['failures']}")
+            if counters["failures"]:
+                failures.append(f"{counters['failures']} virtual uploads failed")
+        expected = args.sites * args.sensors + args.load
+        if stats["sensors"] != expected:
+            failures.append(f"aggregator knows {stats['sensors']} sensors, expected {expected}")
+        seen = index.get(PROTECTED, {})
+        if len(seen) < 4 * args.sites:
+            failures.append(f"index has {len(seen)} {PROTECTED} BSSIDs, expected at least {4 * args.sites}")
+
+        for proc in procs:
+            if proc.poll() is not None:
+                failures.append(f"sensor exited early with status {proc.returncode}")
+        rogue = format_bssid(ROGUE)
+        shared = 0
+        for site in range(args.sites):
+            for n in range(args.sensors):
+                with open(os.path.join(tmp, f"s-{site}-{n}", ".baseline"), "r", encoding="utf-8") as f:
+                    shared += sum(1 for line in f if line.startswith("+\t" + PROTECTED))
+        print(f"shared baseline records on sensors: {shared}")
+        if shared < len(baseline) * args.sites * args.sensors:
+            failures.append("not every sensor received the shared baseline")
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(10)
+        agg.terminate()
+        agg.wait(10)
+
+    alerts = []
+    with open(alerts_path, "r", encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event["event"] == "single_site":
+                alerts.append(event)
+    for alert in alerts:
+        print(f"alert: {alert['ssid']} {alert['bssid']} only at {alert['site']} (seen by {', '.join(alert['sensors'])})")
+    wrong = [a for a in alerts if a["bssid"] != rogue or a["site"] != f"site-{args.rogue_site}"]
+    if args.rogue_site < args.sites and not any(a["bssid"] == rogue for a in alerts):
+        failures.append(f"no single_site alert for {rogue}")
+    if wrong:
+        failures.append(f"{len(wrong)} unexpected single_site alerts")
+    if args.keep:
+        print(f"kept {tmp}")
+    else:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
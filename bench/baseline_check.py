@@ -0,0 +1,217 @@
+"""Check that the baseline journal survives what it has to survive.
+
+    python bench/baseline_check.py
+
+Each case writes a store (or a legacy `.last_bssid`) in a fresh directory,
+reopens it and compares what comes back: a torn trailing record, SSIDs with
+tabs, newlines and backslashes, legacy imports with and without BSSIDs,
+SSIDs with no BSSIDs (and their security profile) across compaction, and
+compaction triggered by churn. The run fails (exit 1) on any difference.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder.baseline import BaselineStore, SecurityProfile
+
+PROFILE = SecurityProfile("WPA2-Enterprise", "CCMP", [6, 36])
+
+
+def snapshot(store):
+    return ({ssid: set(store.bssids(ssid)) for ssid in store.ssids()},
+            {ssid: store.profile(ssid) for ssid in store.ssids() if store.profile(ssid) is not None})
+
+
+def reopen(data, store=None):
+    if store is not None:
+        store.close()
+    return BaselineStore.open_dir(data)
+
+
+def case_torn_line(data):
+    store = BaselineStore.open_dir(data)
+    store.replace("CorpNet", [0x001122334455, 0x001122334456], PROFILE)
+    expected = snapshot(store)
+    store.close()
+    with open(store.path, "a", encoding="utf-8", newline="\n") as f:
+        f.write("+\tCorpNet\t00:11:22:33")
+    store = reopen(data)
+    failures = []
+    got = snapshot(store)
+    if got != expected:
+        failures.append(f"torn line: {got} != {expected}")
+    # Loading a torn journal rewrites it, so the next append starts on a clean line.
+    store.add("CorpNet", 0x001122334457)
+    expected[0]["CorpNet"].add(0x001122334457)
+    store = reopen(data, store)
+    got = snapshot(store)
+    store.close()
+    if got != expected:
+        failures.append(f"append after torn line: {got} != {expected}")
+    return failures
+
+
+def case_escaping(data):
+    names = ["tab\there", "new\nline", "back\\slash", "cr\rlf", "\\t literal", "trailing\\", "Café ☃"]
+    store = BaselineStore.open_dir(data)
+    for i, ssid in enumerate(names):
+        store.replace(ssid, [0x0200000000 + i], SecurityProfile(f"WPA2\t{ssid}", "CCMP", [i + 1]))
+    expected = snapshot(store)
+    store = reopen(data, store)
+    failures = []
+    if snapshot(store) != expected:
+        failures.append(f"escaping: {snapshot(store)} != {expected}")
+    store.compact()
+    store = reopen(data, store)
+    if snapshot(store) != expected:
+        failures.append(f"escaping after compaction: {snapshot(store)} != {expected}")
+    store.close()
+    return failures
+
+
+def case_legacy(data):
+    failures = []
+    with open(os.path.join(data, ".last_bssid"), "w", encoding="utf-8") as f:
+        f.write("HomeNet\n00:11:22:33:44:55\nAA-BB-CC-DD-EE-FF\n\nnot a bssid\n")
+    store = reopen(data)
+    got = snapshot(store)
+    store.close()
+    expected = ({"HomeNet": {0x001122334455, 0xAABBCCDDEEFF}}, {})
+    if got != expected:
+        failures.append(f"legacy import: {got} != {expected}")
+    if not os.path.exists(os.path.join(data, ".baseline")):
+        failures.append("legacy import did not write a journal")
+    return failures
+
+
+def case_legacy_ssid_only(data):
+    # Older --setup wrote just the SSID when it could not read a BSSID.
+    with open(os.path.join(data, ".last_bssid"), "w", encoding="utf-8") as f:
+        f.write("HomeNet\n")
+    expected = ({"HomeNet": set()}, {})
+    failures = []
+    store = reopen(data)
+    if snapshot(store) != expected:
+        failures.append(f"SSID-only legacy import: {snapshot(store)} != {expected}")
+    store = reopen(data, store)
+    if snapshot(store) != expected:
+        failures.append(f"SSID-only legacy import reloaded: {snapshot(store)} != {expected}")
+    store.close()
+    return failures
+
+
+def case_empty_ssid(data):
+    failures = []
+    store = BaselineStore.open_dir(data)
+    store.replace("Empty", [], PROFILE)
+    store.replace("Emptied", [0x001122334455])
+    store.remove("Emptied", 0x001122334455)
+    expected = ({"Empty": set(), "Emptied": set()}, {"Empty": PROFILE})
+    if snapshot(store) != expected:
+        failures.append(f"empty SSIDs in memory: {snapshot(store)} != {expected}")
+    store = reopen(data, store)
+    if snapshot(store) != expected:
+        failures.append(f"empty SSIDs reloaded: {snapshot(store)} != {expected}")
+    store.compact()
+    store = reopen(data, store)
+    if snapshot(store) != expected:
+        failures.append(f"empty SSIDs after compaction: {snapshot(store)} != {expected}")
+    if "Empty" not in store or store.is_known("Empty", 0x001122334455):
+        failures.append("an SSID with no BSSIDs should be protected and know no AP")
+    store.close()
+    return failures
+
+
+def case_compaction(data, ops=20000, seed=1):
+    rng = random.Random(seed)
+    store = BaselineStore(os.path.join(data, ".baseline"), compact_min=256)
+    model = {}
+    profiles = {}
+    compactions = []
+    compact = store.compact
+
+    def counted():
+        compactions.append(store._records)
+        compact()
+
+    store.compact = counted
+    for _ in range(ops):
+        ssid = f"Net-{rng.randint(0, 20)}"
+        bssid = 0x001100000000 + rng.randint(0, 200)
+        op = rng.random()
+        if op < 0.5:
+            store.add(ssid, bssid)
+            model.setdefault(ssid, set()).add(bssid)
+        elif op < 0.9:
+            store.remove(ssid, bssid)
+            if ssid in model:
+                model[ssid].discard(bssid)
+        elif op < 0.97:
+            bssids = {0x001100000000 + rng.randint(0, 200) for _ in range(rng.randint(0, 5))}
+            profile = SecurityProfile("WPA2-Personal", "CCMP", [rng.randint(1, 11)]) if rng.random() < 0.5 else None
+            store.replace(ssid, bssids, profile)
+            model[ssid] = bssids
+            profiles.pop(ssid, None)
+            if profile is not None:
+                profiles[ssid] = profile
+        else:
+            profile = SecurityProfile("WPA3-Personal", "GCMP", [rng.randint(1, 11)])
+            store.set_profile(ssid, profile)
+            model.setdefault(ssid, set())
+            profiles[ssid] = profile
+    expected = (model, profiles)
+    failures = []
+    if snapshot(store) != expected:
+        failures.append("compaction: in-memory state differs from the model")
+    store = reopen(data, store)
+    if snapshot(store) != expected:
+        failures.append("compaction: reloaded state differs from the model")
+    with open(store.path, encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+    live = len(store) + len(profiles) + sum(1 for b in model.values() if not b)
+    if lines > max(store.compact_min, 2 * len(store)) + 8:
+        failures.append(f"compaction: journal has {lines} lines for {live} live records")
+    if not compactions:
+        failures.append("compaction never ran")
+    store.close()
+    return failures
+
+
+CASES = (
+    ("torn line", case_torn_line),
+    ("escaping", case_escaping),
+    ("legacy import", case_legacy),
+    ("legacy SSID only", case_legacy_ssid_only),
+    ("empty SSID", case_empty_ssid),
+    ("compaction", case_compaction),
+)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Check baseline journal recovery, escaping, legacy import and compaction")
+    p.add_argument("--case", action="append", help="run only this case (repeatable)")
+    args = p.parse_args()
+
+    failures = []
+    for name, case in CASES:
+        if args.case and name not in args.case:
+            continue
+        data = tempfile.mkdtemp(prefix="baseline-")
+        try:
+            found = case(data)
+        finally:
+            shutil.rmtree(data, ignore_errors=True)
+        print(f"{name:<18} {'FAIL' if found else 'ok'}")
+        failures.extend(found)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Write a synthetic sighting history and time the history queries.
+
+    python bench/history_bench.py --days 14 --aps 100 --max-ms 50
+
+Simulates one scan a minute over --days with --aps access points in range
+(a quarter of them coming and going), an occasional rogue and lookalike
+SSID. Reports the insert rate, the time to compact (downsample everything
+older than 7 days) and each query's latency before and after compaction.
+The run fails (exit 1) when a query takes longer than --max-ms or a
+query's answer about first sightings changes with compaction.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder import alerts
+from roguefinder.engine import Finding
+from roguefinder.history import DAY, History
+from roguefinder.netsh_parser import AP
+
+START = 1.7e9
+
+
+def populate(history, days, n_aps, seed=1):
+    rng = random.Random(seed)
+    aps = [AP("CorpNet" if i < 8 else f"Net-{i % 40}", 0x0011AA000000 + i, signal=rng.randint(20, 99))
+           for i in range(n_aps)]
+    steady = aps[:n_aps * 3 // 4]
+    flaky = aps[n_aps * 3 // 4:]
+    rogue = 0x02DEADBEEF00
+    now = START
+    end = START + days * DAY
+    scans = 0
+    while now < end:
+        seen = steady + [ap for ap in flaky if rng.random() < 0.5]
+        findings = []
+        if rng.random() < 0.002:
+            rogue += 1
+            seen.append(AP("CorpNet", rogue, signal=rng.randint(20, 99)))
+            findings.append(Finding(alerts.ROGUE, "CorpNet", rogue, "rogue"))
+        if rng.random() < 0.001:
+            bssid = 0x06CAFE000000 + scans
+            name = rng.choice(("C0rpNet", "CorpNet-Free", "CorpNet_5G"))
+            seen.append(AP(name, bssid, signal=rng.randint(20, 99)))
+            findings.append(Finding(alerts.SIMILAR, name, bssid, "similar", baseline="CorpNet"))
+        history.record(seen, findings, now)
+        scans += 1
+        now += 60
+    history.flush(now)
+    return scans, end, aps
+
+
+def timed(fn, reps=5):
+    best = None
+    for _ in range(reps):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def run_queries(history, end, aps):
+    week = end - 7 * DAY
+    probe = aps[len(aps) - 1].bssid
+    return [
+        ("first seen", lambda: history.first_seen(probe)),
+        ("bssid summary", lambda: [r["first"] for r in history.bssid(probe)]),
+        ("lookalikes 7d", lambda: len(history.lookalikes(week))),
+        ("rogue alerts 7d", lambda: len(history.alerts(alerts.ROGUE, week))),
+        ("ssid CorpNet 7d", lambda: len(history.ssid("CorpNet", week))),
+    ]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the sighting history database")
+    p.add_argument("--days", type=float, default=14)
+    p.add_argument("--aps", type=int, default=100)
+    p.add_argument("--max-ms", type=float, default=50, help="fail when a query takes longer")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="history-")
+    failures = []
+    try:
+        history = History.open_dir(tmp)
+        started = time.perf_counter()
+        scans, end, aps = populate(history, args.days, args.aps)
+        elapsed = time.perf_counter() - started
+        rows = history.written
+        print(f"{scans} scans, {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s), "
+              f"{history.stats()['bytes'] / 1048576:.0f} MB")
+
+        before = {}
+        for name, query in run_queries(history, end, aps):
+            ms, before[name] = timed(query)
+            print(f"  {name:<16} {ms:8.2f} ms")
+            if ms > args.max_ms:
+                failures.append(f"{name} took {ms:.1f} ms")
+
+        started = time.perf_counter()
+        merged, deleted = history.compact(end)
+        print(f"compacted {merged} rows in {time.perf_counter() - started:.1f}s; "
+              f"{history.stats()['rows']} rows left")
+        for name, query in run_queries(history, end, aps):
+            ms, after = timed(query)
+            print(f"  {name:<16} {ms:8.2f} ms")
+            if ms > args.max_ms:
+                failures.append(f"{name} took {ms:.1f} ms after compaction")
+            if name in ("first seen", "bssid summary", "lookalikes 7d") and after != before[name]:
+                failures.append(f"{name} changed with compaction: {before[name]} -> {after}")
+        history.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Startup cost of the command-line and GUI entry points.
+
+    python bench/import_time.py --runs 10 --max-overhead-ms 60
+
+Runs `--setup` and `--once` against the recorded netsh fixtures, and a
+bare `import rogue_finder_gui`, each in a fresh interpreter with
+`-X importtime`. Reports the median wall time next to a bare interpreter,
+the total import time and the slowest top-level imports. The run fails
+(exit 1) when a scenario imports a module it should load lazily (asyncio,
+sqlite3, multiprocessing, http.client, the tray and toast libraries, ...)
+or its median exceeds the bare interpreter by more than --max-overhead-ms.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FIXTURES = os.path.join(ROOT, "fixtures", "netsh")
+
+# win10toast is left out: an alert in --once loads it on the notifier thread.
+HEAVY = ("asyncio", "sqlite3", "concurrent.futures", "multiprocessing", "http.client", "ssl", "socket",
+         "tkinter", "PIL", "pystray")
+# The GUI needs tkinter up front; the rest, asyncio included, waits until used.
+GUI_HEAVY = ("asyncio", "PIL", "pystray", "win10toast", "sqlite3", "multiprocessing", "http.client", "logging.handlers")
+
+
+def parse_importtime(stderr):
+    """{module: (self us, cumulative us, depth)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[12:].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(own), int(cumulative), depth)
+    return modules
+
+
+def run(argv, cwd, env, runs):
+    times = []
+    modules = {}
+    for i in range(runs + 1):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=cwd, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - started
+        if proc.returncode != 0:
+            tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+            return None, None, "\n".join(tail[-3:])
+        # The first run writes the .pyc files; later runs read them like an installed copy.
+        if i:
+            times.append(elapsed)
+            modules = parse_importtime(proc.stderr)
+    return statistics.median(times) * 1000, modules, None
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure interpreter startup and import cost of RogueFinder")
+    p.add_argument("--runs", type=int, default=10)
+    p.add_argument("--max-overhead-ms", type=float, default=None,
+                   help="fail when a CLI scenario is this much slower than a bare interpreter")
+    p.add_argument("--top", type=int, default=5, help="slowest top-level imports to list per scenario")
+    args = p.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    tmp = tempfile.mkdtemp(prefix="importtime-")
+    cli = [os.path.join(ROOT, "rogue_finder.py"), "--recorded", FIXTURES, "--data-dir", tmp]
+    scenarios = (
+        ("bare", ["-c", "pass"], ()),
+        ("setup", cli + ["--setup"], HEAVY),
+        ("once", cli + ["--once"], HEAVY),
+        ("gui import", ["-c", "import rogue_finder_gui"], GUI_HEAVY),
+    )
+    failures = []
+    bare = None
+    try:
+        for name, argv, forbidden in scenarios:
+            ms, modules, error = run(argv, ROOT, env, args.runs)
+            if ms is None:
+                if name == "gui import":
+                    print(f"{name:<11} skipped: {error.splitlines()[-1] if error else 'failed'}")
+                    continue
+                failures.append(f"{name} failed: {error}")
+                continue
+            if bare is None:
+                bare = ms
+            total = sum(c for _, c, depth in modules.values() if depth == 0)
+            print(f"{name:<11} {ms:7.1f} ms  (+{ms - bare:.1f} ms over bare)  imports {total / 1000:.1f} ms "
+                  f"in {len(modules)} modules")
+            top = sorted(((c, m) for m, (_, c, depth) in modules.items() if depth == 0), reverse=True)
+            for cumulative, module in top[:args.top]:
+                print(f"    {cumulative / 1000:6.1f} ms  {module}")
+            loaded = [m for m in forbidden if m in modules]
+            if loaded:
+                failures.append(f"{name} imports {', '.join(loaded)}")
+            if (args.max_overhead_ms is not None and name in ("setup", "once")
+                    and ms - bare > args.max_overhead_ms):
+                failures.append(f"{name} takes {ms - bare:.1f} ms over a bare interpreter")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Simulate --learn with a fake clock and a stream of transient BSSIDs.
+
+    python bench/learn_sim.py --hours 2 --transients 30
+
+CorpNet has --steady APs seen in almost every scan, --weak ones seen in
+about a third of scans and one that is only switched on half way through.
+Every scan also sees --transients CorpNet BSSIDs that stay in range for a
+few minutes (a busy street, a conference next door), and a rogue AP is up
+for --rogue-for seconds. The run is learned once straight through and once
+stopped at --restart-at and resumed from the checkpoint; it fails (exit 1)
+if a steady AP is not learned, a transient or the rogue is, the candidate
+table grows past --max-entries, or the two runs learn different sets.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder.baseline import BaselineStore
+from roguefinder.bssid import format_bssid
+from roguefinder.learn import PresenceLearner
+from roguefinder.netsh_parser import AP
+
+SSID = "CorpNet"
+ROGUE = 0x02DEADBEEF00
+
+
+def scans(hours, interval, steady, weak, transients, rogue_at, rogue_for, seed=1):
+    """Yield (time, [AP, ...]) and return the BSSIDs that should be learned."""
+    rng = random.Random(seed)
+    legit = [0x0011AA000000 + i for i in range(steady + weak + 1)]
+    late = legit[-1]
+    passing = {}
+    next_transient = 0x06AB00000000
+    duration = hours * 3600
+    now = 0.0
+    while now < duration:
+        aps = []
+        for i, bssid in enumerate(legit):
+            if bssid == late:
+                seen = now >= duration / 2 and rng.random() < 0.9
+            else:
+                seen = rng.random() < (0.95 if i < steady else 0.33)
+            if seen:
+                aps.append(AP(SSID, bssid, "WPA2-Enterprise", "CCMP", 36 if i % 2 else 6))
+        for _ in range(rng.randint(0, 2 * transients // 10)):
+            passing[next_transient] = now + rng.uniform(30, 240)
+            next_transient += 1
+        for bssid, until in list(passing.items()):
+            if now > until:
+                del passing[bssid]
+            elif rng.random() < 0.8:
+                aps.append(AP(SSID, bssid, "WPA2-Personal", "CCMP", 11))
+        if rogue_at <= now < rogue_at + rogue_for:
+            aps.append(AP(SSID, ROGUE, "Open", "None", 1))
+        yield now, aps
+        now += interval
+    return set(legit), next_transient - 0x06AB00000000
+
+
+def learn(args, tmp, name, restart_at=None):
+    data = os.path.join(tmp, name)
+    os.makedirs(data)
+    checkpoint = os.path.join(data, ".learn")
+    store = BaselineStore.open_dir(data)
+    duration = args.hours * 3600
+    learner = PresenceLearner.for_duration(store, [SSID], duration, args.threshold, args.max_entries)
+    source = scans(args.hours, args.interval, args.steady, args.weak, args.transients, args.rogue_at, args.rogue_for)
+    largest = 0
+    restarted = False
+    epoch = 1.7e9
+    while True:
+        try:
+            now, aps = next(source)
+        except StopIteration as stop:
+            legit, transients = stop.value
+            break
+        if restart_at is not None and not restarted and now >= restart_at:
+            learner.save(checkpoint)
+            store.close()
+            store = BaselineStore.open_dir(data)
+            learner = PresenceLearner.for_duration(store, [SSID], duration, args.threshold, args.max_entries)
+            if not learner.resume(checkpoint):
+                raise SystemExit("could not resume from the checkpoint")
+            restarted = True
+        learner.observe(aps, epoch + now)
+        learner.elapsed = now
+        largest = max(largest, len(learner.entries))
+    learned = set(store.bssids(SSID))
+    profile = store.profile(SSID)
+    store.close()
+    return learner, learned, legit, transients, largest, profile
+
+
+def main():
+    p = argparse.ArgumentParser(description="Simulate baseline learning with a fake clock")
+    p.add_argument("--hours", type=float, default=2)
+    p.add_argument("--interval", type=float, default=10)
+    p.add_argument("--steady", type=int, default=6)
+    p.add_argument("--weak", type=int, default=2)
+    p.add_argument("--transients", type=int, default=30, help="new transient BSSIDs per 10 scans")
+    p.add_argument("--rogue-at", type=float, default=1800)
+    p.add_argument("--rogue-for", type=float, default=300)
+    p.add_argument("--threshold", type=float, default=0.25)
+    p.add_argument("--max-entries", type=int, default=4096)
+    p.add_argument("--restart-at", type=float, default=None, help="seconds into the run (default: half way)")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="learnsim-")
+    failures = []
+    try:
+        tracemalloc.start()
+        started = time.perf_counter()
+        learner, learned, legit, transients, largest, profile = learn(args, tmp, "straight")
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        restart_at = args.restart_at if args.restart_at is not None else args.hours * 1800
+        _, resumed, _, _, _, _ = learn(args, tmp, "restarted", restart_at)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    scans_run = int(args.hours * 3600 / args.interval)
+    print(f"{scans_run} scans, {transients} transient BSSIDs in {elapsed:.2f}s "
+          f"({elapsed / scans_run * 1e3:.2f} ms/scan, peak {peak / 1024:.0f} KiB traced)")
+    print(f"learned {len(learned & legit)}/{len(legit)} legit, candidates peaked at {largest}, "
+          f"{learner.evicted} evicted; profile {profile}")
+    missing = legit - learned
+    extra = learned - legit
+    if missing:
+        failures.append(f"not learned: {', '.join(format_bssid(b) for b in sorted(missing))}")
+    if extra:
+        failures.append(f"{len(extra)} BSSIDs learned that should not be, e.g. {format_bssid(min(extra))}")
+    if largest > args.max_entries + 1:
+        failures.append(f"candidate table reached {largest} > {args.max_entries}")
+    if resumed != learned:
+        failures.append(f"restarted run learned {len(resumed ^ learned)} BSSIDs differently")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
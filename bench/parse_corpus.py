@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder.bssid import format_bssid
+from roguefinder.iw_parser import parse_scan
+from roguefinder.netsh_parser import iter_aps
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+PARSERS = {
+    "netsh": lambda out: list(iter_aps(out.splitlines())),
+    "iw": lambda out: parse_scan(out)[0],
+}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Check and time the netsh and iw parsers against the fixture corpora")
+    p.add_argument("--corpus", help="check only this directory")
+    p.add_argument("--format", choices=PARSERS, default="netsh", help="output format of --corpus")
+    p.add_argument("--repeat", type=int, default=1000)
+    args = p.parse_args()
+
+    if args.corpus:
+        corpora = [(args.format, args.corpus)]
+    else:
+        corpora = [(fmt, os.path.join(FIXTURES, fmt, "corpus")) for fmt in PARSERS]
+    failed = 0
+    for fmt, corpus in corpora:
+        failed += check(fmt, corpus, args.repeat)
+    sys.exit(1 if failed else 0)
+
+
+def check(fmt, corpus, repeat):
+    parse = PARSERS[fmt]
+    failed = 0
+    for name in sorted(os.listdir(corpus)):
+        if not name.endswith(".txt"):
+            continue
+        with open(os.path.join(corpus, name), "r", encoding="utf-8") as f:
+            out = f.read()
+        with open(os.path.join(corpus, name[:-4] + ".json"), "r", encoding="utf-8") as f:
+            expected = json.load(f)
+
+        aps = parse(out)
+        got = {}
+        for ap in aps:
+            got.setdefault(ap.ssid, []).append(format_bssid(ap.bssid))
+        # Every BSSID block in the corpus prints all of these.
+        partial = [ap for ap in aps if None in (ap.auth, ap.cipher, ap.channel, ap.radio, ap.signal)]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(out)
+        us = (time.perf_counter() - start) / repeat * 1e6
+        name = f"{fmt}/{name}"
+
+        status = "ok" if got == expected else "MISMATCH"
+        if got == expected and partial:
+            status = "PARTIAL"
+        if status != "ok":
+            failed += 1
+        print(f"{name:30} {status:8} {us:8.1f} us/parse")
+        if got != expected:
+            print(f"  expected {expected}\n  got      {got}")
+        for ap in partial:
+            print(f"  missing attributes: {ap!r} auth={ap.auth} cipher={ap.cipher} channel={ap.channel} "
+                  f"radio={ap.radio} signal={ap.signal}")
+    return failed
+
+
+if __name__ == '__main__':
+    main()
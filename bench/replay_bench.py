@@ -0,0 +1,97 @@
+"""Throughput and determinism of --replay over a synthetic capture tree.
+
+    python bench/replay_bench.py --sensors 8 --scans 500 --bssids 200
+
+Writes --sensors directories of --scans captures each, with APs dropping
+in and out, signal changes and an occasional rogue CorpNet BSSID. The tree
+is replayed once sequentially in a single chunk and once on --jobs
+processes in --chunk sized tasks; the run fails (exit 1) if the two
+outputs differ or the parallel rate is below --min-rate scans/s.
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth
+from roguefinder.baseline import BaselineStore, SecurityProfile
+from roguefinder.replay import Replay
+
+ROGUE = 0x02DEADBEEF00
+SIGNAL = re.compile(r"(Signal\s*: )(\d+)%")
+
+
+def write_tree(root, sensors, scans, n_bssids, n_ssids):
+    networks = synth.layout(n_bssids, n_ssids)
+    for sensor in range(sensors):
+        rng = random.Random(sensor)
+        path = os.path.join(root, f"sensor-{sensor:03d}")
+        os.makedirs(path)
+        for scan in range(scans):
+            # Each AP is missed now and then; a rogue CorpNet AP comes and goes.
+            visible = [(ssid, [b for b in bssids if rng.random() > 0.05]) for ssid, bssids in networks]
+            visible = [(ssid, bssids) for ssid, bssids in visible if bssids]
+            if rng.random() < 0.02:
+                visible.append(("CorpNet", [ROGUE + sensor]))
+            text = synth.render_networks(visible)
+            text = SIGNAL.sub(lambda m: f"{m.group(1)}{min(100, max(1, int(m.group(2)) + rng.randint(-8, 8)))}%", text)
+            with open(os.path.join(path, f"scan-{scan:06d}.txt"), "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+    return networks
+
+
+def replay(root, store_path, jobs, chunk):
+    run = Replay(store_path, jobs=jobs, chunk=chunk)
+    out = [(stream, name, aps, findings) for stream, name, aps, findings in run.run(root)]
+    return run, out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark --replay and check it is independent of how work is split")
+    p.add_argument("--sensors", type=int, default=8)
+    p.add_argument("--scans", type=int, default=250, help="captures per sensor")
+    p.add_argument("--bssids", type=int, default=200)
+    p.add_argument("--ssids", type=int, default=40)
+    p.add_argument("--jobs", type=int, default=os.cpu_count())
+    p.add_argument("--chunk", type=int, default=16, help="scans per task in the parallel run")
+    p.add_argument("--min-rate", type=float, default=0, help="fail below this many scans/s in the parallel run")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="replay-")
+    try:
+        root = os.path.join(tmp, "captures")
+        networks = write_tree(root, args.sensors, args.scans, args.bssids, args.ssids)
+        store = BaselineStore.open_dir(tmp)
+        # Open networks count as downgrades; channel 52 is unexpected.
+        profile = SecurityProfile("WPA-Personal", "TKIP", (1, 6, 11, 36, 44, 100, 149))
+        for ssid, bssids in networks[:5]:
+            if ssid:
+                store.replace(ssid, bssids, profile)
+        store.close()
+
+        seq, expected = replay(root, store.path, 1, args.scans)
+        par, got = replay(root, store.path, args.jobs, args.chunk)
+        for name, run in (("sequential", seq), (f"{par.workers} jobs, chunk {args.chunk}", par)):
+            found = ", ".join(f"{k}={n}" for k, n in sorted(run.findings.items()))
+            print(f"{name:<24} {run.scans} scans {run.aps} APs in {run.elapsed:.2f}s: {run.rate:.0f} scans/s ({found})")
+        failures = []
+        if got != expected:
+            diff = next(i for i, (a, b) in enumerate(zip(expected, got + [None] * len(expected))) if a != b)
+            failures.append(f"parallel output differs from sequential at scan {diff}: {expected[diff][:2]}")
+        if par.rate < args.min_rate:
+            failures.append(f"{par.rate:.0f} scans/s < {args.min_rate}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
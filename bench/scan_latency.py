@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder.aptable import APTable
+from roguefinder.baseline import BaselineStore
+from roguefinder.engine import MonitorEngine
+from roguefinder.scanner import BACKENDS, IwScanner, RecordedRunner, Scanner
+from roguefinder.similarity import SimilarityIndex
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure scan cycle latency against recorded netsh or iw output")
+    p.add_argument("--backend", choices=BACKENDS, default="netsh")
+    p.add_argument("--fixtures", help="recorded output (default: fixtures/<backend>)")
+    p.add_argument("--max-age", type=float, default=30.0,
+                   help="iw: trigger a real scan when the cached results are older than this")
+    p.add_argument("--cycles", type=int, default=200)
+    p.add_argument("--latency", type=float, default=0.0, help="simulated seconds per command")
+    p.add_argument("--max-ms", type=float, default=None, help="fail if mean cycle exceeds this")
+
+    p.add_argument("--mode", choices=("scan", "sequential", "engine"), default="scan",
+                   help="scan only, interface query then scan, or both concurrently through MonitorEngine")
+    args = p.parse_args()
+
+    fixtures = args.fixtures or os.path.join(FIXTURES, args.backend)
+    if args.backend == "iw":
+        scanner = IwScanner.from_dir(fixtures, latency=args.latency, max_age=args.max_age)
+        runner = scanner.runner
+    else:
+        runner = RecordedRunner.from_dir(fixtures, latency=args.latency)
+        scanner = Scanner(runner)
+    tmp = tempfile.TemporaryDirectory()
+    store = BaselineStore.open_dir(tmp.name)
+    aps = scanner.scan()
+    store.replace(next(iter(aps)), next(iter(aps.values())))
+    runner.calls.clear()
+    engine = MonitorEngine(scanner, store, SimilarityIndex(store.ssids()), ap_table=APTable())
+
+    start = time.perf_counter()
+    for _ in range(args.cycles):
+        if args.mode == "engine":
+            engine.cycle()
+        else:
+            if args.mode == "sequential":
+                scanner.interface_info()
+            scanner.scan()
+    elapsed = time.perf_counter() - start
+    engine.close()
+    store.close()
+    tmp.cleanup()
+
+    mean_ms = elapsed / args.cycles * 1000
+    calls = len(runner.calls) / args.cycles
+    triggers = f" triggered_scans={scanner.triggers}" if args.backend == "iw" else ""
+    print(f"mode={args.mode} cycles={args.cycles} mean_ms={mean_ms:.3f} commands_per_cycle={calls:.2f}{triggers}")
+    if args.max_ms is not None and mean_ms > args.max_ms:
+        print(f"FAIL: mean cycle {mean_ms:.3f} ms > {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
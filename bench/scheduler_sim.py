@@ -0,0 +1,139 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from roguefinder import alerts
+from roguefinder.aptable import APTable
+from roguefinder.baseline import BaselineStore
+from roguefinder.bssid import parse_bssid
+from roguefinder.engine import MonitorEngine
+from roguefinder.scanner import INTERFACES_CMD, NETWORKS_CMD, RecordedRunner, Scanner
+from roguefinder.scheduler import HOUR, ScanScheduler
+from roguefinder.similarity import SimilarityIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def scan_source(rogue_at, rogue_for, churn_every):
+    """Return a fake scan: (changed, suspicious) at a given time."""
+    state = {"rogue": False, "last_churn": -1}
+
+    def scan(now):
+        rogue = rogue_at <= now < rogue_at + rogue_for
+        appeared = rogue and not state["rogue"]
+        changed = appeared or rogue != state["rogue"]
+        state["rogue"] = rogue
+        churn = int(now // churn_every) if churn_every else -1
+        if churn != state["last_churn"]:
+            state["last_churn"] = churn
+            changed = True
+        return changed, appeared
+    return scan
+
+
+def check_repeated_finding(interval=10, burst_window=60, duration=300):
+    """Stay connected to an unknown BSSID of a protected SSID on an unchanging
+    scan: the first cycle must start a burst, the repeats must not extend it.
+    `duration` stays within the alert TTL, after which a repeat is news again."""
+    fixtures = os.path.join(ROOT, "fixtures", "netsh")
+    with open(os.path.join(fixtures, "networks_bssid.txt"), encoding="utf-8") as f:
+        networks = f.read()
+    with open(os.path.join(fixtures, "interfaces.txt"), encoding="utf-8") as f:
+        interfaces = f.read()
+    data = tempfile.mkdtemp(prefix="scheduler-")
+    try:
+        store = BaselineStore.open_dir(data)
+        # The connected BSSID (3c:37:86:1a:2b:01) is left out of the baseline.
+        store.replace("CorpNet", [parse_bssid("3c:37:86:1a:2b:02")])
+        runner = RecordedRunner({NETWORKS_CMD: networks, INTERFACES_CMD: interfaces})
+        engine = MonitorEngine(Scanner(runner, ready_timeout=0), store, SimilarityIndex(store.ssids()),
+                               ap_table=APTable())
+        clock = FakeClock()
+        sched = ScanScheduler(interval=interval, burst_window=burst_window, clock=clock, rng=lambda: 0.5)
+        manager = alerts.AlertManager(alerts.Notifier(), clock=clock)
+        modes = []
+        try:
+            while clock.now < duration:
+                result = engine.cycle()
+                fresh = sum(manager.admit(*finding.key) for finding in result.findings)
+                sched.record(result.changed, result.suspicious or fresh > 0)
+                clock.sleep(sched.next_delay())
+                modes.append(sched.mode)
+        finally:
+            engine.close()
+            store.close()
+    finally:
+        shutil.rmtree(data, ignore_errors=True)
+    bursts = modes.count("burst")
+    print(f"repeated finding: {bursts} burst scans, then {modes[-1]} at {sched.describe()}")
+    failures = []
+    if modes[0] != "burst":
+        failures.append("a new finding did not start a burst")
+    if "burst" in modes[bursts:] or bursts > burst_window / sched.burst_interval + 1:
+        failures.append(f"a repeated finding extended the burst: {bursts} burst scans")
+    return failures
+
+
+def main():
+    p = argparse.ArgumentParser(description="Simulate the adaptive scan scheduler with a fake clock")
+    p.add_argument("--hours", type=float, default=2)
+    p.add_argument("--interval", type=float, default=10)
+    p.add_argument("--scan-cost", type=float, default=1.5, help="seconds per simulated scan")
+    p.add_argument("--budget", type=float, default=None, help="scan seconds allowed per hour")
+    p.add_argument("--rogue-at", type=float, default=1800)
+    p.add_argument("--rogue-for", type=float, default=300)
+    p.add_argument("--churn-every", type=float, default=900, help="seconds between benign RF changes")
+    p.add_argument("--fixed", action="store_true")
+    args = p.parse_args()
+
+    failures = check_repeated_finding()
+
+    clock = FakeClock()
+    sched = ScanScheduler(interval=args.interval, budget=args.budget, adaptive=not args.fixed,
+                          clock=clock, rng=lambda: 0.5)
+    scan = scan_source(args.rogue_at, args.rogue_for, args.churn_every)
+    modes = Counter()
+    scans = 0
+    first_detection = None
+    worst_hour = 0.0
+    while clock.now < args.hours * HOUR:
+        changed, suspicious = scan(clock.now)
+        if suspicious and first_detection is None:
+            first_detection = clock.now
+        clock.sleep(args.scan_cost)
+        sched.record(changed, suspicious, args.scan_cost)
+        worst_hour = max(worst_hour, sched.used())
+        delay = sched.next_delay()
+        modes[sched.mode] += 1
+        scans += 1
+        clock.sleep(delay)
+
+    fixed_scans = args.hours * HOUR / (args.interval + args.scan_cost)
+    print(f"scans={scans} (fixed interval would run {fixed_scans:.0f}) modes={dict(modes)}")
+    if first_detection is not None:
+        print(f"rogue visible at {args.rogue_at:.0f}s, detected at {first_detection:.1f}s")
+    print(f"max scan seconds in any hour: {worst_hour:.1f}")
+    if args.budget and worst_hour > args.budget + args.scan_cost:
+        failures.append(f"exceeded budget of {args.budget}s/hour")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
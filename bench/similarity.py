@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from roguefinder.similarity import MATCHERS, SimilarityIndex, edit_similarity, ssid_similarity
+
+# Lookalikes of BASELINE that each matcher should flag.
+ATTACKS = [
+    "xMyNetwork", "MyNetwork2", "MyNetwork ", "MyNetworkX", "MyNetw0rk", "MyNetwоrk",
+    "МyNetwork", "My_Network", "My-Network", "MyNetwrok", "MyNetwok", "Free MyNetwork",
+    "ＭｙＮｅｔｗｏｒｋ", "MyNetw\u200bork", "MyNetvvork", "MyN3tw0rk",
+]
+BENIGN = ["OtherNetwork", "Guest", "HP-Print-3F-LaserJet", "DIRECT-xy-Roku", "eduroam", "Starbucks WiFi"]
+BASELINE = "MyNetwork"
+# Protected SSIDs for the equivalence check: several lengths, case and padding.
+PROTECTED = [BASELINE, "CorpNet", "eduroam", "Guest", " Home-5G ", "ACME Corporate WiFi", "AB"]
+REFERENCE = {"positional": ssid_similarity, "edit": edit_similarity}
+# Names that fold to nothing, or next to nothing: none may match a protected SSID.
+INVISIBLE = ["\u200b", "\u200b\u200c\u200d\ufeff", "   ", "\u200d \u200d", "C", "Co", "\u200bNe\u200b", "ｃｏ"]
+
+
+def neighbours(n, seed=0):
+    rnd = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_ "
+    out = []
+    for _ in range(n):
+        out.append("".join(rnd.choice(alphabet) for _ in range(rnd.randint(4, 32))))
+    return out
+
+
+def mutations(ssids, n, seed=1):
+    """Random edits of `ssids`, so that many candidates score near the threshold."""
+    rnd = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_ 0оі"
+    out = []
+    for _ in range(n):
+        s = list(rnd.choice(ssids))
+        for _ in range(rnd.randint(1, 4)):
+            i = rnd.randint(0, len(s))
+            op = rnd.random()
+            if op < 0.3 and i < len(s):
+                del s[i]
+            elif op < 0.6 and i < len(s):
+                s[i] = rnd.choice(alphabet)
+            else:
+                s.insert(i, rnd.choice(alphabet))
+        out.append("".join(s))
+    return out
+
+
+def check_equivalence(matcher, candidates, threshold=0.7):
+    """Mismatches between SimilarityIndex and the plain scoring function."""
+    reference = REFERENCE[matcher]
+    idx = SimilarityIndex(PROTECTED, threshold=threshold, matcher=matcher, cache_size=64)
+    wrong = []
+    # Twice, so the second pass also goes through (and past) the cache.
+    for candidate in candidates + candidates:
+        expected = {b: reference(b, candidate) for b in PROTECTED if b != candidate}
+        expected = {b: score for b, score in expected.items() if score >= threshold}
+        got = dict(idx.matches(candidate))
+        if got != expected:
+            wrong.append((candidate, got, expected))
+    return wrong
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare SSID matchers for detection and throughput")
+    p.add_argument("--candidates", type=int, default=5000)
+    p.add_argument("--scans", type=int, default=5)
+    args = p.parse_args()
+
+    cands = neighbours(args.candidates) + ATTACKS + BENIGN
+    failures = []
+    checked = cands + mutations(PROTECTED, args.candidates) + PROTECTED + INVISIBLE + ["", " ", "ab", "AB "]
+    for matcher in MATCHERS:
+        wrong = check_equivalence(matcher, checked)
+        print(f"{matcher:11} matches the reference function on {len(checked)} candidates: "
+              f"{'no' if wrong else 'yes'}")
+        for candidate, got, expected in wrong[:5]:
+            failures.append(f"{matcher} {candidate!r}: index {got} != reference {expected}")
+        idx = SimilarityIndex(PROTECTED, matcher=matcher)
+        for candidate in INVISIBLE:
+            if idx.matches(candidate):
+                failures.append(f"{matcher} {candidate!r} matches {idx.matches(candidate)}")
+    for matcher in MATCHERS:
+        idx = SimilarityIndex([BASELINE], matcher=matcher)
+        flagged = [a for a in ATTACKS if idx.similar(BASELINE, a) is not None]
+        false_pos = [b for b in BENIGN if idx.similar(BASELINE, b) is not None]
+
+        idx = SimilarityIndex([BASELINE], matcher=matcher, cache_size=len(cands) * 2)
+        start = time.perf_counter()
+        for c in cands:
+            idx.similar(BASELINE, c)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.scans):
+            for c in cands:
+                idx.similar(BASELINE, c)
+        warm = (time.perf_counter() - start) / args.scans
+
+        print(f"{matcher:11} detected={len(flagged)}/{len(ATTACKS)} false_positives={len(false_pos)} "
+              f"cold={len(cands) / cold:,.0f}/s warm={len(cands) / warm:,.0f}/s")
+        missed = [a for a in ATTACKS if a not in flagged]
+        if missed:
+            print(f"  missed: {missed!r}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Benchmark suite over synthetic netsh output.
+
+    python bench/suite.py --json results.json
+    python bench/suite.py --quick --baseline results.json --tolerance 0.3
+
+Each case is run repeatedly for at least --min-time seconds and reported by
+its median. The run fails (exit 1) when a case's median exceeds its limit
+in --thresholds, or its best time is more than --tolerance slower than the
+same case in a --baseline results file.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth
+from roguefinder.aptable import APTable
+from roguefinder.baseline import BaselineStore, load_state
+from roguefinder.engine import MonitorEngine
+from roguefinder.netsh_parser import parse_networks
+from roguefinder.scanner import INTERFACES_CMD, NETWORKS_CMD, RecordedRunner, Scanner
+from roguefinder.similarity import SimilarityIndex, ssid_similarity, SIMILARITY_THRESHOLD
+
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+# (BSSIDs, SSIDs)
+SIZES = ((10, 5), (100, 20), (1000, 200), (10000, 2000))
+QUICK_SIZES = SIZES[:3]
+
+
+def measure(fn, min_time, min_reps=3, max_reps=1000):
+    times = []
+    total = 0.0
+    while len(times) < min_reps or (total < min_time and len(times) < max_reps):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    return times
+
+
+def result(bench, case, times, items):
+    median = statistics.median(times)
+    return {
+        "name": f"{bench}/{case}",
+        "bench": bench,
+        "case": case,
+        "reps": len(times),
+        "items": items,
+        "median_ms": round(median * 1e3, 4),
+        "mean_ms": round(statistics.fmean(times) * 1e3, 4),
+        "min_ms": round(min(times) * 1e3, 4),
+        "per_item_us": round(median * 1e6 / max(items, 1), 4),
+    }
+
+
+def bench_parse(sizes, variants, min_time):
+    for n_bssids, n_ssids in sizes:
+        for variant in variants:
+            out = synth.networks_output(n_bssids, n_ssids, variant)
+            times = measure(lambda: parse_networks(out), min_time)
+            yield result("parse", f"{variant}/bssids={n_bssids}/ssids={n_ssids}", times, n_bssids)
+
+
+def protected_for(networks, count=5):
+    return [ssid for ssid, _ in networks if ssid][:count]
+
+
+def bench_similarity(sizes, min_time):
+    for n_bssids, n_ssids in sizes:
+        networks = synth.layout(n_bssids, n_ssids)
+        protected = protected_for(networks)
+        scanned = [ssid for ssid, _ in networks if ssid]
+
+        def naive():
+            for candidate in scanned:
+                for baseline in protected:
+                    if candidate != baseline:
+                        ssid_similarity(baseline, candidate) >= SIMILARITY_THRESHOLD
+
+        def cold():
+            index = SimilarityIndex(protected)
+            for candidate in scanned:
+                index.matches(candidate)
+
+        warm_index = SimilarityIndex(protected)
+
+        def warm():
+            for candidate in scanned:
+                warm_index.matches(candidate)
+
+        case = f"bssids={n_bssids}/ssids={n_ssids}"
+        yield result("similarity", f"naive/{case}", measure(naive, min_time), len(scanned))
+        yield result("similarity", f"index_cold/{case}", measure(cold, min_time), len(scanned))
+        yield result("similarity", f"index_warm/{case}", measure(warm, min_time), len(scanned))
+
+
+def bench_baseline(sizes, min_time):
+    for n_bssids, n_ssids in sizes:
+        networks = synth.layout(n_bssids, n_ssids)
+        with tempfile.TemporaryDirectory() as tmp:
+            def save():
+                store = BaselineStore.open_dir(tmp)
+                for ssid, bssids in networks:
+                    store.replace(ssid, bssids)
+                store.compact()
+                store.close()
+
+            def load():
+                BaselineStore.open_dir(tmp).close()
+
+            case = f"bssids={n_bssids}/ssids={n_ssids}"
+            yield result("baseline", f"save/{case}", measure(save, min_time, max_reps=50), n_bssids)
+            yield result("baseline", f"load/{case}", measure(load, min_time), n_bssids)
+
+            legacy = os.path.join(tmp, "legacy")
+            ssid, bssids = max(networks, key=lambda n: len(n[1]))
+            with open(legacy, "w", encoding="utf-8") as f:
+                f.write(ssid + "\n" + "".join(synth.fmt_mac(b) + "\n" for b in bssids))
+            yield result("baseline", f"legacy_load/{case}", measure(lambda: load_state(legacy), min_time),
+                         len(bssids))
+
+
+def bench_cycle(sizes, min_time):
+    for n_bssids, n_ssids in sizes:
+        networks = synth.layout(n_bssids, n_ssids)
+        protected = protected_for(networks)
+        connected_ssid, connected = networks[0]
+        runner = RecordedRunner({
+            NETWORKS_CMD: synth.networks_output(n_bssids, n_ssids),
+            INTERFACES_CMD: synth.interfaces_output(connected_ssid, connected[0]),
+        })
+        scanner = Scanner(runner)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = BaselineStore.open_dir(tmp)
+            for ssid, bssids in networks:
+                if ssid in protected:
+                    # Leave one BSSID out so every cycle has a rogue to report.
+                    store.replace(ssid, bssids[:-1] or bssids)
+            similarity = SimilarityIndex(store.ssids())
+            full = MonitorEngine(scanner, store, similarity)
+            delta = MonitorEngine(scanner, store, similarity, ap_table=APTable())
+            delta.cycle()
+            case = f"bssids={n_bssids}/ssids={n_ssids}"
+            yield result("cycle", f"full/{case}", measure(full.cycle, min_time), n_bssids)
+            yield result("cycle", f"delta/{case}", measure(delta.cycle, min_time), n_bssids)
+            runner.calls.clear()
+            full.close()
+            delta.close()
+            store.close()
+
+
+BENCHES = ("parse", "similarity", "baseline", "cycle")
+
+
+def check(results, thresholds, baseline, tolerance):
+    failures = []
+    for r in results:
+        for pattern, limit in thresholds.items():
+            if fnmatch.fnmatchcase(r["name"], pattern) and r["median_ms"] > limit:
+                failures.append(f"{r['name']}: {r['median_ms']:.3f} ms > limit {limit} ms ({pattern})")
+        # Best-of-N is far less sensitive to a noisy CI neighbour than the median.
+        prev = baseline.get(r["name"])
+        if prev is not None and r["min_ms"] > prev["min_ms"] * (1 + tolerance):
+            failures.append(f"{r['name']}: best {r['min_ms']:.3f} ms vs baseline {prev['min_ms']:.3f} ms "
+                            f"(+{(r['min_ms'] / prev['min_ms'] - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark parsing, similarity, baseline I/O and detection cycles")
+    p.add_argument("--bench", action="append", choices=BENCHES, help="run only this benchmark (repeatable)")
+    p.add_argument("--quick", action="store_true", help="skip the 10,000-BSSID cases")
+    p.add_argument("--min-time", type=float, default=0.2, help="seconds to spend on each case")
+    p.add_argument("--json", help="write results to this file ('-' for stdout)")
+    p.add_argument("--thresholds", default=THRESHOLDS, help="JSON {name glob: max median ms}")
+    p.add_argument("--baseline", help="results file from an earlier run to compare against")
+    p.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown against --baseline")
+    args = p.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    benches = args.bench or BENCHES
+    runs = {
+        "parse": lambda: bench_parse(sizes, synth.VARIANTS, args.min_time),
+        "similarity": lambda: bench_similarity(sizes, args.min_time),
+        "baseline": lambda: bench_baseline(sizes, args.min_time),
+        "cycle": lambda: bench_cycle(sizes, args.min_time),
+    }
+    results = []
+    for name in benches:
+        for r in runs[name]():
+            results.append(r)
+            print(f"{r['name']:<48} {r['median_ms']:>10.3f} ms  {r['per_item_us']:>8.2f} us/item  x{r['reps']}",
+                  file=sys.stderr if args.json == "-" else sys.stdout)
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+    failures = check(results, thresholds, baseline, args.tolerance)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+        "failures": failures,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
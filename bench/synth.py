@@ -0,0 +1,162 @@
+"""Synthetic `netsh wlan` output for benchmarks.
+
+    python bench/synth.py --bssids 1000 --ssids 200 --variant de --out /tmp/netsh
+
+writes networks_bssid.txt and interfaces.txt, which RecordedRunner.from_dir
+(and bench/scan_latency.py --fixtures) can replay.
+"""
+import argparse
+import os
+import random
+
+# Label sets as printed by localized Windows builds.
+LABELS = {
+    "en": {
+        "iface": "Interface name", "visible": "There are {n} networks currently visible.",
+        "type": "Network type", "infra": "Infrastructure", "auth": "Authentication",
+        "enc": "Encryption", "signal": "Signal", "radio": "Radio type", "channel": "Channel",
+        "basic": "Basic rates (Mbps)", "other": "Other rates (Mbps)",
+        "name": "Name", "state": "State", "connected": "connected", "profile": "Profile",
+    },
+    "de": {
+        "iface": "Schnittstellenname", "visible": "Zurzeit sind {n} Netzwerke sichtbar.",
+        "type": "Netzwerktyp", "infra": "Infrastruktur", "auth": "Authentifizierung",
+        "enc": "Verschlüsselung", "signal": "Signal", "radio": "Funktyp", "channel": "Kanal",
+        "basic": "Basisraten (MBit/s)", "other": "Andere Raten (MBit/s)",
+        "name": "Name", "state": "Status", "connected": "Verbunden", "profile": "Profil",
+    },
+    "fr": {
+        "iface": "Nom de l'interface", "visible": "{n} réseaux actuellement visibles.",
+        "type": "Type de réseau", "infra": "Infrastructure", "auth": "Authentification",
+        "enc": "Chiffrement", "signal": "Signal", "radio": "Type de radio", "channel": "Canal",
+        "basic": "Taux de base (Mbits/s)", "other": "Autres taux (Mbits/s)",
+        "name": "Nom", "state": "État", "connected": "connecté", "profile": "Profil",
+    },
+}
+# "odd": English labels, CRLF line endings, a BOM, and SSIDs that went
+# through a UTF-8 -> cp1252 mis-decode the way an OEM console mangles them.
+VARIANTS = ("en", "de", "fr", "odd")
+
+WORDS = ("Corp", "Guest", "Home", "Cafe", "Office", "Lab", "IoT", "Printer", "FRITZ!Box",
+         "TP-Link", "NETGEAR", "Vodafone", "eduroam", "Hotel", "Airport", "Lobby", "Staff",
+         "Müller", "Straße", "Café", "北京", "📶", "Ｃｏｒｐ", "Ro0m", "5G", "Mesh")
+PROTECTED = ("CorpNet", "CorpNet-Guest", "Lab-Secure", "Warehouse", "Exec-WiFi")
+LOOKALIKES = ("C0rpNet", "CorpNet ", "CorpNet-Guests", "Lab-Secur3", "Warehous", "ExecWiFi")
+AUTH = (("WPA2-Enterprise", "CCMP"), ("WPA2-Personal", "CCMP"), ("WPA3-Personal", "GCMP"),
+        ("Open", "None"), ("WPA-Personal", "TKIP"))
+RADIOS = (("802.11n", (1, 6, 11)), ("802.11ac", (36, 44, 100, 149)), ("802.11ax", (36, 52, 1, 6)))
+
+
+def ssid_names(n_ssids, rng):
+    """Protected SSIDs, a few lookalikes and random neighbours; a few are hidden."""
+    names = list(PROTECTED[:n_ssids])
+    names += LOOKALIKES[:max(0, min(len(LOOKALIKES), n_ssids - len(names)) // 2)]
+    while len(names) < n_ssids:
+        if rng.random() < 0.03:
+            names.append("")
+            continue
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        names.append("-".join(words) + (f"-{rng.randrange(16 ** 4):x}" if rng.random() < 0.7 else ""))
+    return names
+
+
+def bssid_for(i):
+    # Distinct per i; the first 64 share one OUI, the rest spread over
+    # globally administered unicast OUIs.
+    oui = 0x3C3786 if i < 64 else ((i // 8) * 2654435761) & 0xFCFFFF
+    return (oui << 24) | (i & 0xFFFFFF)
+
+
+def fmt_mac(value):
+    return ":".join(f"{(value >> s) & 0xFF:02x}" for s in range(40, -8, -8))
+
+
+def mangle(text):
+    return text.encode("utf-8").decode("cp1252", errors="replace")
+
+
+def layout(n_bssids, n_ssids, seed=0):
+    """Return [(ssid, [bssid, ...])] with every SSID owning at least one BSSID."""
+    rng = random.Random(seed)
+    n_ssids = max(1, min(n_ssids, n_bssids))
+    names = ssid_names(n_ssids, rng)
+    groups = [[bssid_for(i)] for i in range(n_ssids)]
+    for i in range(n_ssids, n_bssids):
+        groups[rng.randrange(n_ssids) if i % 4 else i % n_ssids].append(bssid_for(i))
+    return list(zip(names, groups))
+
+
+def networks_output(n_bssids, n_ssids, variant="en", seed=0):
+    return render_networks(layout(n_bssids, n_ssids, seed), variant, seed)
+
+
+def render_networks(networks, variant="en", seed=0):
+    """netsh `mode=bssid` output for [(ssid, [bssid, ...])]."""
+    rng = random.Random(seed + 1)
+    labels = LABELS.get(variant, LABELS["en"])
+    out = ["", f"{labels['iface']} : Wi-Fi", labels["visible"].format(n=len(networks)), ""]
+    for n, (ssid, bssids) in enumerate(networks, 1):
+        auth, enc = rng.choice(AUTH)
+        out.append(f"SSID {n} : {mangle(ssid) if variant == 'odd' else ssid}")
+        out.append(f"    {labels['type']:<24}: {labels['infra']}")
+        out.append(f"    {labels['auth']:<24}: {auth}")
+        out.append(f"    {labels['enc']:<24}: {enc}")
+        for b, bssid in enumerate(bssids, 1):
+            radio, channels = rng.choice(RADIOS)
+            out.append(f"    {'BSSID ' + str(b):<24}: {fmt_mac(bssid)}")
+            out.append(f"         {labels['signal']:<19}: {rng.randint(5, 100)}%")
+            out.append(f"         {labels['radio']:<19}: {radio}")
+            out.append(f"         {labels['channel']:<19}: {rng.choice(channels)}")
+            out.append(f"         {labels['basic']:<19}: 6 12 24")
+            out.append(f"         {labels['other']:<19}: 9 18 36 48 54")
+        out.append("")
+    return _finish(out, variant)
+
+
+def interfaces_output(ssid, bssid, variant="en"):
+    labels = LABELS.get(variant, LABELS["en"])
+    out = [
+        "", "There is 1 interface on the system:", "",
+        f"    {labels['name']:<23}: Wi-Fi",
+        f"    {'Description':<23}: Synthetic Wi-Fi Adapter",
+        f"    {labels['state']:<23}: {labels['connected']}",
+        f"    {'SSID':<23}: {mangle(ssid) if variant == 'odd' else ssid}",
+        f"    {'BSSID':<23}: {fmt_mac(bssid)}",
+        f"    {labels['radio']:<23}: 802.11ax",
+        f"    {labels['channel']:<23}: 36",
+        f"    {labels['signal']:<23}: 92%",
+        f"    {labels['profile']:<23}: {ssid}",
+        "",
+    ]
+    return _finish(out, variant)
+
+
+def _finish(lines, variant):
+    if variant == "odd":
+        return "\ufeff" + "\r\n".join(lines) + "\r\n"
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    p = argparse.ArgumentParser(description="Write synthetic netsh output for RecordedRunner")
+    p.add_argument("--bssids", type=int, default=1000)
+    p.add_argument("--ssids", type=int, default=200)
+    p.add_argument("--variant", choices=VARIANTS, default="en")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", required=True, help="directory to write networks_bssid.txt and interfaces.txt to")
+    args = p.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    ssid, bssids = layout(args.bssids, args.ssids, args.seed)[0]
+    files = {
+        "networks_bssid.txt": networks_output(args.bssids, args.ssids, args.variant, args.seed),
+        "interfaces.txt": interfaces_output(ssid, bssids[0], args.variant),
+    }
+    for name, text in files.items():
+        with open(os.path.join(args.out, name), "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    print(f"wrote {', '.join(files)} to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
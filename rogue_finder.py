@@ -1,232 +1,301 @@
-import subprocess
-import time
-import os
-import sys
-import argparse
-import locale
-
-def get_wifi_info():
-    try:
-        encoding = locale.getpreferredencoding() or 'utf-8'
-        out = subprocess.check_output(["netsh","wlan","show","interfaces"], encoding=encoding, errors="ignore")
-    except Exception:
-        return None, None
-    ssid = None
-    bssid = None
-    for line in out.splitlines():
-        if ":" not in line:
-            continue
-        key, val = [s.strip() for s in line.split(":", 1)]
-        kl = key.lower()
-        if kl.startswith("ssid") and ssid is None:
-            ssid = val
-        elif kl.startswith("bssid"):
-            bssid = val
-    return ssid, bssid
-
-def normalize_bssid(bssid):
-    if not bssid:
-        return None
-    bssid_str = bssid.split(",")[0].strip()
-    bssid_str = bssid_str.replace(" ", "").replace("-", ":").upper()
-    return bssid_str if bssid_str else None
-
-def ssid_similarity(ssid1, ssid2):
-    if not ssid1 or not ssid2:
-        return 0.0
-    s1 = ssid1.strip().lower()
-    s2 = ssid2.strip().lower()
-    if s1 == s2:
-        return 1.0
-    if s1 in s2 or s2 in s1:
-        return 0.9
-    len1, len2 = len(s1), len(s2)
-    if len1 == 0 or len2 == 0:
-        return 0.0
-    max_len = max(len1, len2)
-    matches = sum(c1 == c2 for c1, c2 in zip(s1, s2))
-    base_similarity = matches / max_len
-    if abs(len1 - len2) <= 2:
-        base_similarity += 0.1
-    return min(base_similarity, 1.0)
-
-def scan_all_aps():
-    try:
-        encoding = locale.getpreferredencoding() or 'utf-8'
-        try:
-            subprocess.run(["powershell", "-Command", "(netsh wlan show networks mode=bssid | Out-String)"], 
-                          encoding=encoding, errors="ignore", capture_output=True, timeout=10)
-        except:
-            pass
-        time.sleep(1)
-        try:
-            subprocess.run(["netsh","wlan","show","networks"], encoding=encoding, errors="ignore", capture_output=True, timeout=3)
-        except:
-            pass
-        time.sleep(0.5)
-        out = subprocess.check_output(["netsh","wlan","show","networks","mode=bssid"], encoding=encoding, errors="ignore")
-    except Exception:
-        return {}
-    
-    ap_dict = {}
-    current_ssid = None
-    
-    for line in out.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        
-        if line.upper().startswith("SSID"):
-            if ":" in line:
-                parts = line.split(":", 1)
-                if len(parts) == 2:
-                    ssid_name = parts[1].strip()
-                    if ssid_name and ssid_name.upper() != "NONE":
-                        current_ssid = ssid_name
-                        if current_ssid not in ap_dict:
-                            ap_dict[current_ssid] = []
-        
-        elif ":" in line:
-            key, val = [s.strip() for s in line.split(":", 1)]
-            kl = key.lower()
-            if kl.startswith("bssid") and val and current_ssid:
-                bssid_str = val.split(",")[0].strip()
-                bssid = normalize_bssid(bssid_str)
-                if bssid and bssid not in ap_dict[current_ssid]:
-                    ap_dict[current_ssid].append(bssid)
-    
-    return ap_dict
-
-def notify(title, message):
-    try:
-        from win10toast import ToastNotifier
-        ToastNotifier().show_toast(title, message, duration=8, threaded=True)
-    except Exception:
-        print(title, message)
-
-def load_state(path):
-    if not os.path.exists(path):
-        return None, set()
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            lines = [l.rstrip("\n") for l in f.readlines()]
-        if not lines:
-            return None, set()
-        ssid = lines[0] if len(lines) > 0 and lines[0] else None
-        bssids = set()
-        for line in lines[1:]:
-            if line.strip():
-                bssid_str = line.strip().split(",")[0].strip()
-                bssid = normalize_bssid(bssid_str)
-                if bssid:
-                    bssids.add(bssid)
-        return ssid or None, bssids
-    except Exception:
-        return None, set()
-
-def save_state(path, ssid, bssids):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write((ssid or "") + "\n")
-            for bssid in sorted(bssids):
-                if bssid:
-                    f.write(bssid + "\n")
-    except Exception:
-        pass
-
-def main():
-    p = argparse.ArgumentParser()
-    p.add_argument("--interval", "-i", type=int, default=10)
-    p.add_argument("--once", action="store_true")
-    p.add_argument("--setup", action="store_true")
-    args = p.parse_args()
-    base = os.path.abspath(os.path.dirname(__file__))
-    state_path = os.path.join(base, ".last_bssid")
-    baseline_ssid, baseline_bssids = load_state(state_path)
-    
-    ssid, bssid = get_wifi_info()
-    if bssid:
-        bssid = normalize_bssid(bssid)
-    
-    if args.setup:
-        if ssid:
-            baseline_ssid = ssid
-            all_aps = scan_all_aps()
-            if baseline_ssid in all_aps:
-                baseline_bssids = {normalize_bssid(b) for b in all_aps[baseline_ssid] if normalize_bssid(b)}
-            else:
-                baseline_bssids = {bssid} if bssid else set()
-            save_state(state_path, baseline_ssid, baseline_bssids)
-        else:
-            all_aps = scan_all_aps()
-            if all_aps:
-                baseline_ssid = list(all_aps.keys())[0]
-                baseline_bssids = {normalize_bssid(b) for b in all_aps[baseline_ssid] if normalize_bssid(b)}
-                save_state(state_path, baseline_ssid, baseline_bssids)
-        sys.exit(0)
-    
-    if args.once:
-        rogue_detected = False
-        if ssid and baseline_ssid and ssid == baseline_ssid and bssid:
-            if bssid not in baseline_bssids:
-                notify("Rogue AP detected", f"SSID {ssid} has unknown BSSID {bssid}")
-                rogue_detected = True
-        
-        all_aps = scan_all_aps()
-        if baseline_ssid in all_aps:
-            for ap_bssid in all_aps[baseline_ssid]:
-                normalized_ap_bssid = normalize_bssid(ap_bssid)
-                if normalized_ap_bssid and normalized_ap_bssid not in baseline_bssids:
-                    notify("Rogue AP detected", f"Found unknown AP: SSID {baseline_ssid} with BSSID {normalized_ap_bssid}")
-                    rogue_detected = True
-        for found_ssid in all_aps:
-            if found_ssid != baseline_ssid:
-                similarity = ssid_similarity(baseline_ssid, found_ssid)
-                if similarity >= 0.7:
-                    notify("Similar SSID detected", f"Found similar SSID: '{found_ssid}' (similar to '{baseline_ssid}')")
-                    rogue_detected = True
-        
-        sys.exit(0)
-    
-    try:
-        while True:
-            ssid, bssid = get_wifi_info()
-            if bssid:
-                bssid = normalize_bssid(bssid)
-            
-            if ssid and baseline_ssid and ssid == baseline_ssid:
-                if bssid and bssid not in baseline_bssids:
-                    notify("Rogue AP detected", f"SSID {ssid} changed BSSID to {bssid}")
-                    if args.setup:
-                        baseline_bssids.add(bssid)
-                        save_state(state_path, baseline_ssid, baseline_bssids)
-                elif bssid and bssid in baseline_bssids:
-                    pass
-            elif ssid and baseline_ssid is None:
-                if args.setup:
-                    baseline_ssid = ssid
-                    baseline_bssids = {bssid} if bssid else set()
-                    save_state(state_path, baseline_ssid, baseline_bssids)
-            
-            if baseline_ssid:
-                all_aps = scan_all_aps()
-                if baseline_ssid in all_aps:
-                    for ap_bssid in all_aps[baseline_ssid]:
-                        normalized_ap_bssid = normalize_bssid(ap_bssid)
-                        if normalized_ap_bssid and normalized_ap_bssid not in baseline_bssids:
-                            notify("Rogue AP detected", f"Found unknown AP: SSID {baseline_ssid} with BSSID {normalized_ap_bssid}")
-                            if args.setup:
-                                baseline_bssids.add(normalized_ap_bssid)
-                                save_state(state_path, baseline_ssid, baseline_bssids)
-                for found_ssid in all_aps:
-                    if found_ssid != baseline_ssid:
-                        similarity = ssid_similarity(baseline_ssid, found_ssid)
-                        if similarity >= 0.7:
-                            notify("Similar SSID detected", f"Found similar SSID: '{found_ssid}' (similar to '{baseline_ssid}')")
-            
-            time.sleep(args.interval)
-    except KeyboardInterrupt:
-        pass
-
-if __name__ == '__main__':
-    main()
+import time
+import os
+import sys
+import argparse
+from roguefinder import alerts, metrics
+from roguefinder.aptable import APTable
+from roguefinder.baseline import BaselineStore
+from roguefinder.bssid import format_bssid
+from roguefinder.engine import SIGNAL_JUMP, MonitorEngine
+from roguefinder.oui import OuiTable
+from roguefinder.scanner import (BACKENDS, capture_baseline, default_scanner, get_wifi_info, open_scanner,
+                                 scan_records, set_default_scanner)
+from roguefinder.similarity import MATCHERS, SimilarityIndex
+
+# History, learning, replay, the uplink, the event stream and the scan
+# scheduler pull in sqlite3, multiprocessing, http.client, socket and
+# random; they are imported by the modes that use them so --once and
+# --setup start quickly.
+
+TITLES = {
+    alerts.ROGUE: "Rogue AP detected",
+    alerts.BSSID_CHANGE: "Rogue AP detected",
+    alerts.VENDOR: "Vendor mismatch",
+    alerts.SIMILAR: "Similar SSID detected",
+    alerts.DOWNGRADE: "Security downgrade detected",
+    alerts.CHANNEL: "Unexpected channel",
+    alerts.SIGNAL_JUMP: "Signal jump detected",
+}
+
+def report_stats(args):
+    stats = metrics.timings()
+    if args.stats:
+        print(f"Stage timings:\n{stats.summary() or '(no samples yet)'}")
+    if args.prom_file:
+        try:
+            stats.write_prometheus(args.prom_file)
+        except OSError as e:
+            print(f"Could not write {args.prom_file}: {e}")
+
+def publish(result, alert_manager, stream):
+    """Report the cycle's findings; returns how many were not repeats."""
+    fresh = 0
+    for finding in result.findings:
+        if stream is None:
+            fresh += alert_manager.add(*finding.key, TITLES[finding.kind], finding.message)
+        elif alert_manager.admit(*finding.key):
+            fresh += 1
+            stream.emit(finding.kind, **finding.as_dict())
+    if stream is None:
+        alert_manager.flush()
+    return fresh
+
+def aggregator_auth(args):
+    from roguefinder.uplink import load_token
+    return {"token": load_token(args.token_file), "cafile": args.aggregator_ca}
+
+def replay(args, store, base):
+    import json
+    from roguefinder import events
+    from roguefinder.replay import Replay
+    if not store.ssids():
+        print("No baseline configured; run --setup first", file=sys.stderr)
+        return 1
+    sink = events.open_sink(args.events, args.events_max_bytes, args.events_backups)
+    run = Replay(store.path, base, args.matcher, args.signal_jump, jobs=args.jobs)
+    try:
+        for stream, name, aps, findings in run.run(args.replay):
+            if findings:
+                sink.write("".join(
+                    json.dumps({"stream": stream, "file": name, "event": kind, **fields},
+                               ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for kind, fields in findings).encode("utf-8"))
+    finally:
+        sink.close()
+    found = ", ".join(f"{kind}={n}" for kind, n in sorted(run.findings.items())) or "none"
+    print(f"Replayed {run.scans} scans ({run.aps} APs) in {run.elapsed:.2f}s with {run.workers} "
+          f"{'job' if run.workers == 1 else 'jobs'}: {run.rate:.0f} scans/s; findings: {found}", file=sys.stderr)
+    return 0
+
+def learn(args, store, data_dir):
+    from roguefinder.learn import CHECKPOINT_INTERVAL, LEARN_NAME, PresenceLearner, format_duration, parse_duration
+    duration = parse_duration(args.learn)
+    if duration is None:
+        print(f"Bad --learn duration {args.learn!r}; use e.g. 45m, 2h or 1d", file=sys.stderr)
+        return 2
+    ssid, _ = get_wifi_info()
+    targets = args.ssid or ([ssid] if ssid else [])
+    if not targets:
+        print("Not connected to WiFi; pass --ssid to choose what to learn", file=sys.stderr)
+        return 1
+    path = os.path.join(data_dir, LEARN_NAME)
+    learner = PresenceLearner.for_duration(store, targets, duration, args.learn_threshold)
+    if learner.resume(path):
+        print(f"Resuming: {format_duration(learner.elapsed)} of {format_duration(duration)} learned, "
+              f"{learner.promoted} BSSIDs promoted, {len(learner.entries)} candidates")
+    else:
+        print(f"Learning {', '.join(targets)} for {format_duration(duration)}")
+    last = time.monotonic()
+    next_checkpoint = last + CHECKPOINT_INTERVAL
+    try:
+        while learner.elapsed < duration:
+            for target, bssid in learner.observe(scan_records(), time.time()):
+                print(f"Learned {target} {format_bssid(bssid)}")
+            now = time.monotonic()
+            learner.elapsed += now - last
+            last = now
+            if now >= next_checkpoint:
+                next_checkpoint = now + CHECKPOINT_INTERVAL
+                learner.save(path)
+            time.sleep(max(0.0, min(args.interval, duration - learner.elapsed)))
+            now = time.monotonic()
+            learner.elapsed += now - last
+            last = now
+    except KeyboardInterrupt:
+        learner.elapsed += time.monotonic() - last
+        learner.save(path)
+        print(f"Stopped after {format_duration(learner.elapsed)} of {format_duration(duration)}; run again to resume")
+        return 0
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    now = time.time()
+    pending = [(c, e) for c, e in learner.candidates(now) if c >= args.learn_threshold / 2]
+    print(f"Learned {learner.promoted} BSSIDs; {len(learner.entries)} candidates left, "
+          f"{learner.evicted} transient BSSIDs dropped")
+    for confidence, entry in pending[:10]:
+        print(f"  not promoted: {entry.ap.ssid} {format_bssid(entry.ap.bssid)} "
+              f"seen in {confidence:.0%} of recent scans ({entry.sightings} sightings)")
+    if args.aggregator:
+        from roguefinder.uplink import push_baseline
+        auth = aggregator_auth(args)
+        for target in targets:
+            if target in store and not push_baseline(args.aggregator, target, store.bssids(target), replace=False, **auth):
+                print(f"Could not upload the baseline for {target} to {args.aggregator}")
+    return 0
+
+def main():
+    if sys.argv[1:2] == ["history"]:
+        from roguefinder.history import main as history_main
+        sys.exit(history_main(sys.argv[2:], os.path.abspath(os.path.dirname(__file__))))
+    p = argparse.ArgumentParser()
+    p.add_argument("--interval", "-i", type=int, default=10)
+    p.add_argument("--once", action="store_true")
+    p.add_argument("--setup", action="store_true")
+    p.add_argument("--matcher", choices=MATCHERS, default="positional")
+    p.add_argument("--signal-jump", type=int, default=SIGNAL_JUMP,
+                   help="alert when a known AP's signal moves by this many points between scans (0 disables)")
+    p.add_argument("--max-interval", type=float, default=60, help="longest delay when nothing changes")
+    p.add_argument("--burst-interval", type=float, default=2, help="delay after a new finding")
+    p.add_argument("--burst-window", type=float, default=60, help="seconds to keep burst scanning")
+    p.add_argument("--scan-budget", type=float, default=None, help="seconds of scanning allowed per hour")
+    p.add_argument("--fixed-interval", action="store_true", help="always wait --interval between scans")
+    p.add_argument("--ssid", action="append", help="with --setup or --learn, protect this SSID instead of the current one (repeatable)")
+    p.add_argument("--learn", metavar="DURATION", help="scan for DURATION (e.g. 2h) and add the BSSIDs seen steadily to the baseline")
+    p.add_argument("--learn-threshold", type=float, default=0.25, help="share of recent scans a BSSID must appear in to be learned")
+    p.add_argument("--stats", action="store_true", help="print per-stage timing summaries")
+    p.add_argument("--stats-interval", type=float, default=60, help="seconds between timing summaries")
+    p.add_argument("--prom-file", help="write timing histograms to this file in Prometheus text format")
+    p.add_argument("--daemon", action="store_true", help="emit JSON-lines events instead of notifications")
+    p.add_argument("--events", default="-", help="event sink: - (stdout), a file path, unix:PATH or tcp:HOST:PORT")
+    p.add_argument("--events-max-bytes", type=int, default=10 << 20, help="rotate the events file at this size")
+    p.add_argument("--events-backups", type=int, default=5, help="rotated events files to keep")
+    p.add_argument("--aggregator", help="aggregator URL to upload scan deltas to and share the baseline with")
+    p.add_argument("--sensor-id", help="name of this sensor at the aggregator (default: host name)")
+    p.add_argument("--site", default="default", help="site this sensor belongs to")
+    p.add_argument("--upload-interval", type=float, default=5, help="seconds between uploads to the aggregator")
+    p.add_argument("--token-file", help="file holding the aggregator's shared secret (default: $ROGUEFINDER_TOKEN)")
+    p.add_argument("--aggregator-ca", help="CA certificate (PEM) to verify an https:// aggregator with")
+    p.add_argument("--data-dir", help="directory for .baseline (default: next to this script)")
+    p.add_argument("--backend", choices=BACKENDS, help="scan with netsh (Windows) or iw (Linux); default: by platform")
+    p.add_argument("--interface", help="iw: wireless interface (default: the first one `iw dev` lists)")
+    p.add_argument("--recorded", help="replay netsh or iw output recorded in this directory instead of scanning")
+    p.add_argument("--replay", metavar="DIR", help="run every recorded scan under DIR through detection, write findings to --events and exit")
+    p.add_argument("--jobs", type=int, help="worker processes for --replay (default: one per CPU)")
+    p.add_argument("--history", action="store_true", help="record sightings and findings in history.db (query with the history command)")
+    args = p.parse_args()
+    base = os.path.abspath(os.path.dirname(__file__))
+    store = BaselineStore.open_dir(args.data_dir or base)
+    if args.backend or args.recorded or args.interface:
+        set_default_scanner(open_scanner(args.backend, args.recorded, args.interface))
+    
+    if args.setup:
+        _, configured = capture_baseline(store, args.ssid, any_ssid=True)
+        if args.aggregator:
+            from roguefinder.uplink import push_baseline
+            auth = aggregator_auth(args)
+            for target in args.ssid or configured:
+                if target in store and not push_baseline(args.aggregator, target, store.bssids(target), **auth):
+                    print(f"Could not upload the baseline for {target} to {args.aggregator}")
+        store.close()
+        sys.exit(0)
+    
+    if args.learn:
+        status = learn(args, store, args.data_dir or base)
+        store.close()
+        sys.exit(status)
+    
+    if args.replay:
+        status = replay(args, store, base)
+        store.close()
+        sys.exit(status)
+    
+    similarity = SimilarityIndex(store.ssids(), matcher=args.matcher)
+    vendors = OuiTable.open_default(base)
+    alert_manager = alerts.AlertManager()
+    stream = None
+    if args.daemon:
+        from roguefinder import events
+        stream = events.EventStream(events.open_sink(args.events, args.events_max_bytes, args.events_backups))
+        # stdout may be the event stream; keep human-readable output off it.
+        sys.stdout = sys.stderr
+        stream.emit(events.START, ssids=store.ssids(), known=len(store))
+    history = None
+    if args.history:
+        from roguefinder.history import History
+        history = History.open_dir(args.data_dir or base)
+    
+    if args.once:
+        engine = MonitorEngine(default_scanner(), store, similarity, vendors,
+                               APTable() if history is not None else None, args.signal_jump)
+        result = engine.cycle_blocking()
+        publish(result, alert_manager, stream)
+        engine.close()
+        if history is not None:
+            history.record(engine.ap_table.seen(), result.findings)
+            history.close()
+        if stream is not None:
+            stream.emit(events.SCAN, **result.as_dict())
+            stream.close()
+        else:
+            alert_manager.notifier.stop()
+        report_stats(args)
+        sys.exit(0)
+    
+    from roguefinder.scheduler import ScanScheduler
+    engine = MonitorEngine(default_scanner(), store, similarity, vendors, APTable(), args.signal_jump)
+    scheduler = ScanScheduler(interval=args.interval, max_interval=args.max_interval,
+                              burst_interval=args.burst_interval, burst_window=args.burst_window,
+                              budget=args.scan_budget, adaptive=not args.fixed_interval)
+    uplink = None
+    if args.aggregator:
+        import socket
+        from roguefinder.uplink import Uplink
+        uplink = Uplink(args.aggregator, args.sensor_id or socket.gethostname(), args.site,
+                        interval=args.upload_interval, **aggregator_auth(args))
+    mode = None
+    next_report = time.monotonic() + args.stats_interval
+    try:
+        while True:
+            result = engine.cycle()
+            fresh = publish(result, alert_manager, stream)
+            if history is not None:
+                history.record(engine.ap_table.seen(), result.findings)
+                if history.compact_due():
+                    history.compact()
+            if uplink is not None and uplink.rejected:
+                print(f"Uploads stopped: {uplink.rejected}", file=sys.stderr)
+                uplink.close()
+                uplink = None
+            if uplink is not None:
+                uplink.record(result.new_aps, result.lost_aps, engine.ap_table.present)
+                shared = uplink.take_baseline()
+                if shared:
+                    ssids = set(store.ssids())
+                    added = sum(store.add_many(ssid, bssids) for ssid, bssids in shared.items())
+                    if added:
+                        print(f"Shared baseline: {added} BSSIDs added")
+                    if set(store.ssids()) != ssids:
+                        # APs already in the table were never checked against the new SSIDs.
+                        similarity = SimilarityIndex(store.ssids(), matcher=args.matcher)
+                        engine.similarity = similarity
+                        engine.ap_table = APTable()
+                        uplink.resync()
+            scheduler.record(result.changed, result.suspicious or fresh > 0, result.duration)
+            delay = scheduler.next_delay()
+            if stream is not None:
+                stream.emit(events.SCAN, next_scan_s=round(delay, 1), mode=scheduler.mode, **result.as_dict())
+            if scheduler.mode != mode:
+                mode = scheduler.mode
+                print(f"Scan cadence: {scheduler.describe()}")
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + args.stats_interval
+                report_stats(args)
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if uplink is not None:
+            uplink.close()
+        if history is not None:
+            history.close()
+        engine.close()
+        store.close()
+        report_stats(args)
+        if stream is not None:
+            stream.emit(events.STOP)
+            stream.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import queue
+import time
+from collections import deque
+
+LOG_NAME = "activity.log"
+
+
+class ActivityLog:
+    """Bounded activity log fed from any thread and drained on the UI thread.
+
+    `put()` only enqueues, so worker threads never touch widgets. `drain()`
+    moves up to `batch` queued lines into a ring buffer of `max_lines`; lines
+    pushed out of the buffer are appended to a rotating file at `path`
+    (`max_bytes` per file, `backups` old files kept). If the queue fills up
+    because the UI is not draining, new lines are dropped and counted.
+    """
+
+    def __init__(self, path=None, max_lines=1000, max_bytes=1 << 20, backups=3, batch=200):
+        self.path = path
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch = batch
+        self.lines = deque()
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max(max_lines, batch))
+        self._spill = None
+
+    @classmethod
+    def open_dir(cls, base, **kwargs):
+        return cls(os.path.join(base, LOG_NAME), **kwargs)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def put(self, message):
+        line = f"[{time.strftime('%H:%M:%S')}] {' '.join(str(message).splitlines())}"
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def drain(self):
+        """Move queued lines into the buffer; returns the new lines to display."""
+        new = []
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            new.append(f"[{time.strftime('%H:%M:%S')}] ({dropped} log lines dropped)")
+        while len(new) < self.batch:
+            try:
+                new.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not new:
+            return new
+        lines = self.lines
+        lines.extend(new)
+        excess = len(lines) - self.max_lines
+        if excess > 0:
+            self._write([lines.popleft() for _ in range(excess)])
+        return new[-self.max_lines:]
+
+    def close(self):
+        """Drain what is left and write the whole buffer out to the file."""
+        while self.drain():
+            pass
+        self._write(self.lines)
+        self.lines.clear()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _write(self, lines):
+        if not self.path or not lines:
+            return
+        # logging.handlers pulls in socket and pickle; only pay for it once
+        # something actually spills to the file.
+        import logging.handlers
+        if self._spill is None:
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._spill = handler
+        for line in lines:
+            self._spill.emit(logging.makeLogRecord({"msg": line}))
@@ -0,0 +1,394 @@
+"""Aggregator for many RogueFinder sensors.
+
+    python -m roguefinder.aggregator --listen 0.0.0.0:8470 --dir /var/lib/roguefinder --token-file secret
+
+Sensors started with `--aggregator http://host:8470` upload their scan
+deltas here and pull the shared baseline from here. Every request must
+carry the shared token (`Authorization: Bearer ...`); without a token only
+clients on this host are served.
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from roguefinder import events
+from roguefinder.baseline import BaselineStore
+from roguefinder.bssid import format_bssid
+from roguefinder.uplink import API, load_token, unpack
+
+SINGLE_SITE = "single_site"
+SENSOR_LOST = "sensor_lost"
+MAX_BODY = 64 << 20
+_TYPE_NAMES = {bool: "true or false", int: "an integer", str: "a string", list: "a list", dict: "an object"}
+
+
+def expect(msg, name, kind, default=None):
+    """msg[name], or `default` when it is absent or null; ValueError unless it is a `kind`."""
+    value = msg.get(name)
+    if value is None:
+        return default
+    # bool is an int subclass, but true is not a sequence number.
+    if not isinstance(value, kind) or (isinstance(value, bool) and kind is not bool):
+        raise ValueError(f"'{name}' must be {_TYPE_NAMES[kind]}")
+    return value
+
+
+def expect_groups(msg, name):
+    """The {ssid: [bssid, ...]} object in msg[name], checked before anything is applied."""
+    value = expect(msg, name, dict, {})
+    if not all(isinstance(bssids, list) for bssids in value.values()):
+        raise ValueError(f"'{name}' must map SSIDs to lists of BSSIDs")
+    return value
+
+
+class SensorState:
+    __slots__ = ("site", "seq", "last_seen", "seen")
+
+    def __init__(self, site, now):
+        self.site = site
+        self.seq = 0
+        self.last_seen = now
+        self.seen = set()
+
+
+class SensorIndex:
+    """Merged SSID -> BSSID -> sensors view over every sensor's current scan.
+
+    Sensors send numbered deltas; a gap in the sequence (or an unknown
+    sensor, e.g. after an aggregator restart) is answered with a resync
+    request and the sensor sends a full snapshot next. A repeated sequence
+    number is acknowledged without being applied, so retried uploads are
+    harmless. Sensors silent for `stale_after` seconds are dropped.
+
+    A BSSID on a protected SSID that is not in the shared baseline and is
+    seen from exactly one site raises a `single_site` alert, once, until it
+    is no longer seen anywhere.
+    """
+
+    def __init__(self, baseline, on_alert=None, stale_after=60, clock=time.monotonic):
+        self.baseline = baseline
+        self.on_alert = on_alert
+        self.stale_after = stale_after
+        self.clock = clock
+        self.index = {}
+        self.sensors = {}
+        self.alerted = set()
+        self.version = int(time.time())
+        self.lock = threading.Lock()
+        self._next_expiry = 0.0
+
+    def ingest(self, msg):
+        """Apply one upload; returns the reply for the sensor."""
+        sensor = expect(msg, "sensor", str)
+        if not sensor:
+            raise ValueError("missing sensor id")
+        site = expect(msg, "site", str)
+        seq = expect(msg, "seq", int, 0)
+        full = expect(msg, "full", bool, False)
+        add, remove = expect_groups(msg, "add"), expect_groups(msg, "remove")
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
+            state = self.sensors.get(sensor)
+            if full:
+                if state is None:
+                    state = self.sensors[sensor] = SensorState(site or "default", now)
+                state.site = site or state.site
+                new = set(unpack(add))
+                added, removed = new - state.seen, state.seen - new
+            elif state is None or seq > state.seq + 1:
+                return {"resync": True}
+            elif seq <= state.seq:
+                state.last_seen = now
+                return {"baseline": self.version}
+            else:
+                added = set(unpack(add)) - state.seen
+                removed = set(unpack(remove)) & state.seen
+            state.seq = seq
+            state.last_seen = now
+            for key in removed:
+                self._unsee(sensor, key)
+                state.seen.discard(key)
+            for key in added:
+                self.index.setdefault(key[0], {}).setdefault(key[1], set()).add(sensor)
+                state.seen.add(key)
+            self._check(added)
+            return {"baseline": self.version}
+
+    def baseline_changed(self):
+        with self.lock:
+            self.version += 1
+            # Newly trusted BSSIDs no longer warrant an alert.
+            self.alerted = {k for k in self.alerted if not self.baseline.is_known(*k)}
+
+    def sites(self, ssid, bssid):
+        sensors = self.index.get(ssid, {}).get(bssid, ())
+        return {self.sensors[s].site for s in sensors if s in self.sensors}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                ssid: {format_bssid(b): sorted(sensors) for b, sensors in bssids.items()}
+                for ssid, bssids in self.index.items()
+            }
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sensors": len(self.sensors),
+                "sites": len({s.site for s in self.sensors.values()}),
+                "ssids": len(self.index),
+                "bssids": sum(len(b) for b in self.index.values()),
+                "alerted": len(self.alerted),
+                "baseline_version": self.version,
+            }
+
+    def _unsee(self, sensor, key):
+        ssid, bssid = key
+        bssids = self.index.get(ssid)
+        if bssids is None:
+            return
+        sensors = bssids.get(bssid)
+        if sensors is not None:
+            sensors.discard(sensor)
+            if not sensors:
+                del bssids[bssid]
+                self.alerted.discard(key)
+        if not bssids:
+            del self.index[ssid]
+
+    def _check(self, keys):
+        baseline = self.baseline
+        for key in keys:
+            ssid, bssid = key
+            if key in self.alerted or ssid not in baseline or baseline.is_known(ssid, bssid):
+                continue
+            sites = self.sites(ssid, bssid)
+            if len(sites) == 1:
+                self.alerted.add(key)
+                if self.on_alert is not None:
+                    self.on_alert(SINGLE_SITE, ssid=ssid, bssid=format_bssid(bssid), site=next(iter(sites)),
+                                  sensors=sorted(self.index[ssid][bssid]))
+
+    def _expire(self, now):
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + min(5.0, self.stale_after / 4)
+        for sensor, state in list(self.sensors.items()):
+            if now - state.last_seen > self.stale_after:
+                for key in state.seen:
+                    self._unsee(sensor, key)
+                del self.sensors[sensor]
+                if self.on_alert is not None:
+                    self.on_alert(SENSOR_LOST, sensor=sensor, site=state.site)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "RogueFinderAggregator"
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if not self._authorized():
+            return self._refuse()
+        try:
+            msg = self._read_json()
+        except ValueError as e:
+            return self._reply(400, {"error": str(e)})
+        app = self.server.app
+        if path == API + "/deltas":
+            try:
+                reply = app.index.ingest(msg)
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            app.requests += 1
+            return self._reply(200, reply)
+        if path == API + "/baseline":
+            try:
+                ssid = expect(msg, "ssid", str)
+                bssids = [b for _, b in unpack({ssid: expect(msg, "bssids", list, [])})]
+                replace = expect(msg, "replace", bool, False)
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            if not ssid:
+                return self._reply(400, {"error": "missing ssid"})
+            with app.store_lock:
+                if not replace:
+                    changed = app.store.add_many(ssid, bssids) > 0
+                elif ssid not in app.store or set(app.store.bssids(ssid)) != set(bssids):
+                    app.store.replace(ssid, bssids)
+                    changed = True
+                else:
+                    changed = False
+            # Sensors refetch the baseline whenever the version moves.
+            if changed:
+                app.index.baseline_changed()
+            return self._reply(200, {"baseline": app.index.version})
+        self._reply(404, {"error": "not found"})
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if not self._authorized():
+            return self._refuse()
+        app = self.server.app
+        if path == API + "/baseline":
+            version = str(app.index.version)
+            if self.headers.get("If-None-Match") == version:
+                return self._reply(304, None, etag=version)
+            with app.store_lock:
+                ssids = {ssid: sorted(app.store.bssids(ssid)) for ssid in app.store.ssids()}
+            return self._reply(200, {"version": app.index.version, "ssids": ssids}, etag=version)
+        if path == API + "/index":
+            return self._reply(200, app.index.snapshot())
+        if path == API + "/stats":
+            stats = app.index.stats()
+            stats["requests"] = app.requests
+            return self._reply(200, stats)
+        self._reply(404, {"error": "not found"})
+
+    def _authorized(self):
+        token = self.server.app.token
+        if token is None:
+            try:
+                return ipaddress.ip_address(self.client_address[0]).is_loopback
+            except ValueError:
+                return False
+        given = self.headers.get("Authorization", "").encode("utf-8", "replace")
+        return hmac.compare_digest(given, b"Bearer " + token.encode("utf-8"))
+
+    def _refuse(self):
+        # The request body is left unread, so the connection cannot be reused.
+        self.close_connection = True
+        self._reply(401, {"error": "missing or wrong token"})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ValueError("body too large")
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":
+            # MAX_BODY applies to what the body inflates to, not just what was sent.
+            inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                body = inflate.decompress(body, MAX_BODY)
+            except zlib.error as e:
+                raise ValueError(f"bad gzip body: {e}")
+            if inflate.unconsumed_tail:
+                raise ValueError("body too large")
+        try:
+            msg = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"bad JSON: {e}")
+        if not isinstance(msg, dict):
+            raise ValueError("expected a JSON object")
+        return msg
+
+    def _reply(self, status, obj, etag=None):
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8") if obj is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.app.verbose:
+            sys.stderr.write("%s - %s\n" % (self.address_string(), format % args))
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of sensors may (re)connect at once; the default backlog of 5
+    # turns that into refused connections.
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Failed TLS handshakes and dropped connections are routine.
+        if isinstance(sys.exc_info()[1], OSError) and not self.app.verbose:
+            return
+        super().handle_error(request, client_address)
+
+
+class Aggregator:
+    def __init__(self, data_dir, listen=("127.0.0.1", 8470), stream=None, stale_after=60, verbose=False,
+                 token=None, tls=None):
+        self.store = BaselineStore.open_dir(data_dir)
+        self.store_lock = threading.Lock()
+        self.stream = stream
+        self.verbose = verbose
+        self.token = token
+        self.requests = 0
+        self.index = SensorIndex(self.store, on_alert=stream.emit if stream else None, stale_after=stale_after)
+        self.server = Server(listen, Handler)
+        self.server.app = self
+        if tls is not None:
+            import ssl
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*tls)
+            # The handshake runs on the request thread, not in accept().
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True,
+                                                     do_handshake_on_connect=False)
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def serve_forever(self):
+        self.server.serve_forever(poll_interval=0.5)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.store.close()
+        if self.stream is not None:
+            self.stream.close()
+
+
+def parse_listen(value):
+    host, _, port = value.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Collect scan deltas from RogueFinder sensors and serve a shared baseline")
+    p.add_argument("--listen", default="127.0.0.1:8470", help="HOST:PORT to listen on (port 0 picks a free one)")
+    p.add_argument("--dir", default=".", help="directory for the shared .baseline")
+    p.add_argument("--events", default="-", help="alert sink: - (stdout), a file path, unix:PATH or tcp:HOST:PORT")
+    p.add_argument("--stale-after", type=float, default=60, help="drop sensors silent for this many seconds")
+    p.add_argument("--verbose", action="store_true", help="log every request to stderr")
+    p.add_argument("--token-file", help="file holding the secret sensors must send (default: $ROGUEFINDER_TOKEN)")
+    p.add_argument("--tls-cert", help="certificate (PEM) to serve HTTPS with")
+    p.add_argument("--tls-key", help="private key for --tls-cert, if not in the same file")
+    args = p.parse_args()
+
+    token = load_token(args.token_file)
+    if token is None:
+        print("no token configured: only clients on this host will be served", file=sys.stderr)
+    tls = (args.tls_cert, args.tls_key) if args.tls_cert else None
+    os.makedirs(args.dir, exist_ok=True)
+    stream = events.EventStream(events.open_sink(args.events))
+    app = Aggregator(args.dir, parse_listen(args.listen), stream, args.stale_after, args.verbose, token, tls)
+    host, port = app.address
+    print(f"listening on {host}:{port}", file=sys.stderr, flush=True)
+    stream.emit(events.START, listen=f"{host}:{port}", ssids=app.store.ssids())
+    try:
+        app.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.emit(events.STOP)
+        app.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from roguefinder import metrics
+
+ROGUE = "rogue"
+SIMILAR = "similar"
+VENDOR = "vendor"
+BSSID_CHANGE = "bssid_change"
+DOWNGRADE = "downgrade"
+CHANNEL = "channel"
+SIGNAL_JUMP = "signal_jump"
+
+
+class Notifier:
+    """One long-lived worker thread that delivers desktop notifications in order.
+
+    win10toast is imported once, on the worker, and each toast is shown
+    synchronously there instead of spawning a thread per alert. Without it
+    notifications are printed. When the queue is full new notifications are
+    dropped rather than blocking the caller.
+    """
+
+    def __init__(self, duration=8, maxsize=16):
+        self.duration = duration
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def send(self, title, message):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((title, message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            self._queue.put((None, None))
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            from win10toast import ToastNotifier
+            toast = ToastNotifier()
+        except Exception:
+            toast = None
+        while True:
+            title, message = self._queue.get()
+            if title is None:
+                break
+            try:
+                with metrics.timer(metrics.NOTIFY):
+                    if toast is None:
+                        print(title, message)
+                    else:
+                        toast.show_toast(title, message, duration=self.duration, threaded=False)
+            except Exception:
+                print(title, message)
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = Notifier()
+        return _notifier
+
+
+class AlertManager:
+    """Deduplicates, rate-limits and batches alerts before they reach the notifier.
+
+    An alert is identified by (kind, ssid, bssid) and is not repeated for
+    `ttl` seconds after it was last admitted, whether or not its
+    notification has gone out yet. Alerts raised between two `flush()`
+    calls (one scan) are coalesced into a single notification, and at most
+    `rate_limit` notifications go out per `rate_window` seconds. A flush
+    over the limit keeps its alerts queued, so they go out with the next
+    flush that is allowed; past `max_entries` queued alerts the oldest are
+    dropped, counted and mentioned in that summary, and since they were
+    never shown they may be raised again straight away.
+    """
+
+    def __init__(self, notifier=None, ttl=600, rate_limit=3, rate_window=60,
+                 max_entries=4096, clock=time.monotonic):
+        self.notifier = notifier or get_notifier()
+        self.ttl = ttl
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.max_entries = max_entries
+        self.clock = clock
+        self._seen = {}
+        self._pending = []
+        self._sent = []
+        self.suppressed = 0
+
+    def add(self, kind, ssid, bssid, title, message):
+        """Queue an alert for the next flush; returns False if it is a repeat."""
+        if not self.admit(kind, ssid, bssid):
+            return False
+        self._pending.append(((kind, ssid, bssid), title, message))
+        return True
+
+    def admit(self, kind, ssid, bssid):
+        """Record an alert without queuing a notification; returns False if it is a repeat."""
+        now = self.clock()
+        key = (kind, ssid, bssid)
+        last = self._seen.get(key)
+        if last is not None and now - last < self.ttl:
+            return False
+        self._seen[key] = now
+        if len(self._seen) > self.max_entries:
+            self._expire(now)
+        return True
+
+    def forget(self, kind, ssid, bssid):
+        self._seen.pop((kind, ssid, bssid), None)
+
+    def flush(self):
+        pending = self._pending
+        if not pending:
+            return None
+        now = self.clock()
+        self._sent = [t for t in self._sent if now - t < self.rate_window]
+        if len(self._sent) >= self.rate_limit:
+            excess = len(pending) - self.max_entries
+            if excess > 0:
+                self.suppressed += excess
+                for key, _, _ in pending[:excess]:
+                    self._seen.pop(key, None)
+                del pending[:excess]
+            return None
+        self._sent.append(now)
+        self._pending = []
+        title, message = summarize([(title, message) for _, title, message in pending], self.suppressed)
+        self.suppressed = 0
+        self.notifier.send(title, message)
+        return title, message
+
+    def _expire(self, now):
+        self._seen = {k: t for k, t in self._seen.items() if now - t < self.ttl}
+        while len(self._seen) > self.max_entries:
+            self._seen.pop(next(iter(self._seen)))
+
+
+def summarize(alerts, suppressed=0, max_lines=5):
+    if len(alerts) == 1 and not suppressed:
+        return alerts[0]
+    total = len(alerts) + suppressed
+    lines = [message for _, message in alerts[:max_lines]]
+    more = total - len(lines)
+    if more:
+        lines.append(f"...and {more} more")
+    return f"RogueFinder: {total} alerts", "\n".join(lines)
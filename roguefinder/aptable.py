@@ -0,0 +1,144 @@
+import operator
+import time
+
+APPEARED = "appeared"
+CHANGED = "changed"
+DISAPPEARED = "disappeared"
+
+
+class APState:
+    __slots__ = ("ap", "details", "first_seen", "last_seen", "misses", "scan")
+
+    def __init__(self, ap, now, details=(), scan=0):
+        self.ap = ap
+        self.details = details
+        self.first_seen = now
+        self.last_seen = now
+        self.misses = 0
+        self.scan = scan
+
+
+class ScanDelta:
+    __slots__ = ("appeared", "changed", "disappeared")
+
+    def __init__(self):
+        self.appeared = []
+        self.changed = []
+        self.disappeared = []
+
+    def __bool__(self):
+        return bool(self.appeared or self.changed or self.disappeared)
+
+    def __repr__(self):
+        return f"ScanDelta(appeared={len(self.appeared)}, changed={len(self.changed)}, disappeared={len(self.disappeared)})"
+
+
+_getters = {}
+
+
+def _details_getter(cls):
+    # Everything after the (ssid, bssid) identity counts as a change, unless
+    # the record names its tracked attributes.
+    getter = _getters.get(cls)
+    if getter is None:
+        fields = tuple(getattr(cls, "DETAILS", cls.__slots__[2:]))
+        get = operator.attrgetter(*fields) if fields else (lambda ap: ())
+        getter = _getters[cls] = get if len(fields) != 1 else (lambda ap: (get(ap),))
+    return getter
+
+
+def _details(ap):
+    return _details_getter(type(ap))(ap)
+
+
+class APTable:
+    """Per-AP state across scans, keyed by (ssid, bssid).
+
+    Feed each scan through `begin_scan()`, `observe(ap)` for every record and
+    `end_scan()`. `observe` returns APPEARED or CHANGED for records that need
+    checking and None for APs that were already known and unchanged, so
+    detection only runs on the delta; the record it replaced is left in
+    `previous` (None for a new AP). An AP is only reported as disappeared
+    after `miss_threshold` consecutive scans without it, which keeps a flaky
+    scan from producing disappear/reappear churn.
+    """
+
+    def __init__(self, miss_threshold=3, clock=time.time):
+        self.miss_threshold = miss_threshold
+        self.clock = clock
+        self.states = {}
+        self.previous = None
+        self._now = None
+        self._scan = 0
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, key):
+        return key in self.states
+
+    def get(self, ssid, bssid):
+        return self.states.get((ssid, bssid))
+
+    def present(self):
+        return [s.ap for s in self.states.values()]
+
+    def seen(self):
+        """APs seen in the last scan (present() also has recently missed ones)."""
+        return [s.ap for s in self.states.values() if s.scan == self._scan]
+
+    def forget(self, ap):
+        self.states.pop((ap.ssid, ap.bssid), None)
+
+    def begin_scan(self):
+        # States stamped with an older scan number were not seen in this one.
+        self._now = self.clock()
+        self._scan += 1
+
+    def observe(self, ap):
+        if self._now is None:
+            self.begin_scan()
+        key = (ap.ssid, ap.bssid)
+        state = self.states.get(key)
+        if state is None:
+            self.states[key] = APState(ap, self._now, _details(ap), self._scan)
+            self.previous = None
+            return APPEARED
+        self.previous = state.ap
+        state.ap = ap
+        state.scan = self._scan
+        # The tracked attributes are kept with the state, so an unchanged AP
+        # costs one lookup and one tuple comparison.
+        details = (_getters.get(type(ap)) or _details_getter(type(ap)))(ap)
+        if details != state.details:
+            state.details = details
+            return CHANGED
+        return None
+
+    def end_scan(self):
+        """Age APs missing from this scan; return the records that just disappeared."""
+        gone = []
+        scan, now = self._scan, self._now
+        for key, state in self.states.items():
+            if state.scan == scan:
+                state.last_seen = now
+                state.misses = 0
+            else:
+                state.misses += 1
+                if state.misses >= self.miss_threshold:
+                    gone.append(key)
+        disappeared = [self.states.pop(key).ap for key in gone]
+        self._now = None
+        return disappeared
+
+    def update(self, aps):
+        delta = ScanDelta()
+        self.begin_scan()
+        for ap in aps:
+            event = self.observe(ap)
+            if event == APPEARED:
+                delta.appeared.append(ap)
+            elif event == CHANGED:
+                delta.changed.append(ap)
+        delta.disappeared = self.end_scan()
+        return delta
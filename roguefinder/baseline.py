@@ -0,0 +1,349 @@
+import functools
+import os
+
+from roguefinder.bssid import bssid_oui, format_bssid, parse_bssid
+
+STORE_NAME = ".baseline"
+LEGACY_NAME = ".last_bssid"
+
+
+def _escape(ssid):
+    if "\\" in ssid or "\t" in ssid or "\n" in ssid or "\r" in ssid:
+        ssid = ssid.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return ssid
+
+
+def _unescape(field):
+    if "\\" not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        c = field[i]
+        if c == "\\" and i + 1 < len(field):
+            i += 1
+            c = {"t": "\t", "n": "\n", "r": "\r"}.get(field[i], field[i])
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def _record(op, ssid, value):
+    if op == "=":
+        return f"=\t{_escape(ssid)}\t{value.encode()}\n"
+    return f"{op}\t{_escape(ssid)}\t{format_bssid(value) if value is not None else ''}\n"
+
+
+# Matched as substrings of the (possibly localized) netsh value, most
+# specific first. Anything else (Open, Offen, Ouvrir, Shared, WEP) ranks 0.
+AUTH_RANKS = (("WPA3-ENTERPRISE", 7), ("WPA3", 6), ("WPA2-ENTERPRISE", 5), ("WPA2", 4),
+              ("WPA-ENTERPRISE", 3), ("WPA", 2), ("OWE", 1))
+CIPHER_RANKS = (("GCMP-256", 4), ("GCMP", 3), ("CCMP", 2), ("TKIP", 1))
+
+
+@functools.lru_cache(maxsize=64)
+def _rank(ranks, value):
+    upper = value.upper()
+    for token, rank in ranks:
+        if token in upper:
+            return rank
+    return 0
+
+
+def auth_rank(auth):
+    return _rank(AUTH_RANKS, auth) if auth else None
+
+
+def cipher_rank(cipher):
+    return _rank(CIPHER_RANKS, cipher) if cipher else None
+
+
+class SecurityProfile:
+    """How a protected SSID's baseline APs look on air: the weakest
+    authentication and cipher among them and every channel they use."""
+
+    __slots__ = ("auth", "cipher", "channels")
+
+    def __init__(self, auth=None, cipher=None, channels=()):
+        self.auth = auth
+        self.cipher = cipher
+        self.channels = frozenset(channels)
+
+    @classmethod
+    def from_aps(cls, aps):
+        auth = cipher = None
+        channels = set()
+        for ap in aps:
+            if ap.auth and (auth is None or auth_rank(ap.auth) < auth_rank(auth)):
+                auth = ap.auth
+            if ap.cipher and (cipher is None or cipher_rank(ap.cipher) < cipher_rank(cipher)):
+                cipher = ap.cipher
+            if ap.channel is not None:
+                channels.add(ap.channel)
+        if auth is None and cipher is None and not channels:
+            return None
+        return cls(auth, cipher, channels)
+
+    def merge(self, other):
+        """The profile covering both: weaker auth and cipher, all channels."""
+        auth, cipher = self.auth, self.cipher
+        if other.auth and (auth is None or auth_rank(other.auth) < auth_rank(auth)):
+            auth = other.auth
+        if other.cipher and (cipher is None or cipher_rank(other.cipher) < cipher_rank(cipher)):
+            cipher = other.cipher
+        return SecurityProfile(auth, cipher, self.channels | other.channels)
+
+    @classmethod
+    def decode(cls, field):
+        auth, _, rest = field.partition("\t")
+        cipher, _, channels = rest.partition("\t")
+        return cls(_unescape(auth) or None, _unescape(cipher) or None,
+                   [int(c) for c in channels.split(",") if c.isdigit()])
+
+    def encode(self):
+        return "\t".join((_escape(self.auth or ""), _escape(self.cipher or ""),
+                          ",".join(str(c) for c in sorted(self.channels))))
+
+    def downgrade(self, ap):
+        """True if `ap` offers weaker authentication or encryption than the baseline."""
+        if ap.auth and self.auth and auth_rank(ap.auth) < auth_rank(self.auth):
+            return True
+        return bool(ap.cipher and self.cipher and cipher_rank(ap.cipher) < cipher_rank(self.cipher))
+
+    def unexpected_channel(self, ap):
+        return ap.channel is not None and bool(self.channels) and ap.channel not in self.channels
+
+    def __eq__(self, other):
+        return (isinstance(other, SecurityProfile) and self.auth == other.auth
+                and self.cipher == other.cipher and self.channels == other.channels)
+
+    def __repr__(self):
+        return f"SecurityProfile({self.auth!r}, {self.cipher!r}, {sorted(self.channels)})"
+
+
+def load_state(path):
+    """Read the legacy single-SSID `.last_bssid` file; BSSIDs come back as ints."""
+    if not os.path.exists(path):
+        return None, set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [l.rstrip("\n") for l in f.readlines()]
+        if not lines:
+            return None, set()
+        ssid = lines[0] if lines[0] else None
+        bssids = set()
+        for line in lines[1:]:
+            if line.strip():
+                bssid = parse_bssid(line)
+                if bssid is not None:
+                    bssids.add(bssid)
+        return ssid or None, bssids
+    except Exception:
+        return None, set()
+
+
+class BaselineStore:
+    """Known-good BSSIDs for any number of protected SSIDs.
+
+    BSSIDs are 48-bit ints (see roguefinder.bssid). They are held in memory as
+    two hash indexes (SSID -> BSSIDs, BSSID -> SSIDs) and
+    persisted as an append-only journal of `+`/`-` records, one per line. The
+    journal is rewritten atomically (temp file + os.replace) only when dead
+    records outnumber live ones. A torn trailing line from a crash is ignored.
+    If no journal exists yet, a legacy `.last_bssid` next to it is imported.
+    An SSID's SecurityProfile is kept in `=` records, which older versions
+    skip. An SSID stays protected when it has no known BSSIDs (every AP
+    using it is then unknown); compaction keeps it as a bare `!` record.
+    """
+
+    def __init__(self, path, legacy_path=None, compact_min=1024):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_min = compact_min
+        self.by_ssid = {}
+        self.by_bssid = {}
+        self.profiles = {}
+        self._ouis = {}
+        self._records = 0
+        self._journal = None
+        self.load()
+
+    @classmethod
+    def open_dir(cls, base):
+        return cls(os.path.join(base, STORE_NAME), legacy_path=os.path.join(base, LEGACY_NAME))
+
+    def __len__(self):
+        return sum(len(b) for b in self.by_ssid.values())
+
+    def __contains__(self, ssid):
+        return ssid in self.by_ssid
+
+    def ssids(self):
+        return list(self.by_ssid)
+
+    def bssids(self, ssid):
+        return self.by_ssid.get(ssid, set())
+
+    def ssids_for(self, bssid):
+        return self.by_bssid.get(bssid, set())
+
+    def is_known(self, ssid, bssid):
+        return bssid in self.by_ssid.get(ssid, ())
+
+    def profile(self, ssid):
+        return self.profiles.get(ssid)
+
+    def ouis(self, ssid):
+        ouis = self._ouis.get(ssid)
+        if ouis is None:
+            ouis = self._ouis[ssid] = {bssid_oui(b) for b in self.by_ssid.get(ssid, ())}
+        return ouis
+
+    def load(self):
+        self.by_ssid = {}
+        self.by_bssid = {}
+        self.profiles = {}
+        self._ouis = {}
+        self._records = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8", newline="\n") as f:
+                data = f.read()
+            lines = data.split("\n")
+            # Anything after the last newline is a partially written record.
+            for line in lines[:-1]:
+                op, sep, rest = line.partition("\t")
+                ssid, sep2, bssid = rest.partition("\t")
+                if not sep2:
+                    continue
+                ssid = _unescape(ssid)
+                self._records += 1
+                if op == "+" or op == "-":
+                    bssid = parse_bssid(bssid)
+                    if bssid is None:
+                        continue
+                    if op == "+":
+                        self._index(ssid, bssid)
+                    else:
+                        self._unindex(ssid, bssid)
+                elif op == "!":
+                    for b in list(self.by_ssid.get(ssid, ())):
+                        self._unindex(ssid, b)
+                    self.profiles.pop(ssid, None)
+                    self.by_ssid.setdefault(ssid, set())
+                elif op == "=":
+                    self.profiles[ssid] = SecurityProfile.decode(bssid)
+                    self.by_ssid.setdefault(ssid, set())
+            if lines[-1]:
+                self.compact()
+        elif self.legacy_path and os.path.exists(self.legacy_path):
+            ssid, bssids = load_state(self.legacy_path)
+            if ssid:
+                self.by_ssid.setdefault(ssid, set())
+                for bssid in bssids:
+                    self._index(ssid, bssid)
+                self.compact()
+
+    def add(self, ssid, bssid):
+        bssid = parse_bssid(bssid)
+        if not ssid or bssid is None or self.is_known(ssid, bssid):
+            return False
+        self._index(ssid, bssid)
+        self._append([("+", ssid, bssid)])
+        return True
+
+    def add_many(self, ssid, bssids):
+        new = []
+        for bssid in bssids:
+            bssid = parse_bssid(bssid)
+            if ssid and bssid is not None and not self.is_known(ssid, bssid):
+                self._index(ssid, bssid)
+                new.append(("+", ssid, bssid))
+        self._append(new)
+        return len(new)
+
+    def remove(self, ssid, bssid):
+        if not self.is_known(ssid, bssid):
+            return False
+        self._unindex(ssid, bssid)
+        self._append([("-", ssid, bssid)])
+        return True
+
+    def replace(self, ssid, bssids, profile=None):
+        """Make `bssids` the complete known set for `ssid`."""
+        records = [("!", ssid, None)]
+        for b in list(self.by_ssid.get(ssid, ())):
+            self._unindex(ssid, b)
+        self.profiles.pop(ssid, None)
+        if ssid:
+            self.by_ssid.setdefault(ssid, set())
+        for bssid in bssids:
+            bssid = parse_bssid(bssid)
+            if bssid is not None and not self.is_known(ssid, bssid):
+                self._index(ssid, bssid)
+                records.append(("+", ssid, bssid))
+        if profile is not None:
+            self.profiles[ssid] = profile
+            records.append(("=", ssid, profile))
+        self._append(records)
+
+    def set_profile(self, ssid, profile):
+        if profile is None or self.profiles.get(ssid) == profile:
+            return False
+        self.profiles[ssid] = profile
+        self.by_ssid.setdefault(ssid, set())
+        self._append([("=", ssid, profile)])
+        return True
+
+    def compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            count = 0
+            for ssid, bssids in self.by_ssid.items():
+                if not bssids:
+                    f.write(_record("!", ssid, None))
+                    count += 1
+                for bssid in sorted(bssids):
+                    f.write(_record("+", ssid, bssid))
+                    count += 1
+                profile = self.profiles.get(ssid)
+                if profile is not None:
+                    f.write(_record("=", ssid, profile))
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp, self.path)
+        self._records = count
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _index(self, ssid, bssid):
+        self.by_ssid.setdefault(ssid, set()).add(bssid)
+        self.by_bssid.setdefault(bssid, set()).add(ssid)
+        self._ouis.pop(ssid, None)
+
+    def _unindex(self, ssid, bssid):
+        self._ouis.pop(ssid, None)
+        bssids = self.by_ssid.get(ssid)
+        if bssids is not None:
+            bssids.discard(bssid)
+        ssids = self.by_bssid.get(bssid)
+        if ssids is not None:
+            ssids.discard(ssid)
+            if not ssids:
+                del self.by_bssid[bssid]
+
+    def _append(self, records):
+        if not records:
+            return
+        if self._journal is None:
+            self._journal = open(self.path, "a", encoding="utf-8", newline="\n")
+        self._journal.write("".join(_record(op, ssid, value) for op, ssid, value in records))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._records += len(records)
+        if self._records > max(self.compact_min, 2 * len(self)):
+            self.compact()
@@ -0,0 +1,28 @@
+_HEX = frozenset("0123456789abcdefABCDEF")
+
+
+def parse_bssid(value):
+    """Parse a MAC/BSSID string ("aa:bb:cc:dd:ee:ff", "AA-BB-...", "aabb.ccdd.eeff") into a 48-bit int."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    s = value.split(",", 1)[0].strip()
+    s = s.replace(":", "").replace("-", "").replace(".", "").replace(" ", "")
+    if len(s) != 12 or not _HEX.issuperset(s):
+        return None
+    return int(s, 16)
+
+
+def format_bssid(n):
+    h = "%012X" % n
+    return f"{h[0:2]}:{h[2:4]}:{h[4:6]}:{h[6:8]}:{h[8:10]}:{h[10:12]}"
+
+
+def bssid_oui(n):
+    return n >> 24
+
+
+def is_locally_administered(n):
+    # Randomized and virtual interface MACs set the U/L bit and have no vendor.
+    return bool((n >> 40) & 0x02)
@@ -0,0 +1,277 @@
+import threading
+import time
+
+from roguefinder import alerts, metrics
+from roguefinder.aptable import APPEARED
+from roguefinder.bssid import format_bssid, parse_bssid
+from roguefinder.oui import vendor_mismatch
+
+# Percentage points of netsh signal quality (about 2 per dB) between two
+# scans that count as a sudden jump for a known BSSID.
+SIGNAL_JUMP = 40
+
+
+class Finding:
+    __slots__ = ("kind", "ssid", "bssid", "baseline", "message")
+
+    def __init__(self, kind, ssid, bssid, message, baseline=None):
+        self.kind = kind
+        self.ssid = ssid
+        self.bssid = bssid
+        self.baseline = baseline
+        self.message = message
+
+    @property
+    def key(self):
+        # Similar-SSID findings are per (lookalike, protected SSID), not per AP.
+        if self.kind == alerts.SIMILAR:
+            return self.kind, self.ssid, self.baseline
+        return self.kind, self.ssid, self.bssid
+
+    def as_dict(self):
+        d = {"ssid": self.ssid, "bssid": format_bssid(self.bssid), "message": self.message}
+        if self.baseline is not None:
+            d["baseline"] = self.baseline
+        return d
+
+    def __repr__(self):
+        return f"Finding({self.kind!r}, {self.message!r})"
+
+
+class CycleResult:
+    # appeared/vanished only hold APs of protected SSIDs; new_aps/lost_aps
+    # are the complete delta against the AP table. suspicious is set when a
+    # finding is news this cycle: it came from an AP that appeared or
+    # changed, or the host just moved to an unknown BSSID.
+    __slots__ = ("ssid", "bssid", "findings", "appeared", "vanished", "new_aps", "lost_aps",
+                 "changed", "suspicious", "aps", "duration")
+
+    def __init__(self):
+        self.ssid = None
+        self.bssid = None
+        self.findings = []
+        self.appeared = []
+        self.vanished = []
+        self.new_aps = []
+        self.lost_aps = []
+        self.changed = False
+        self.suspicious = False
+        self.aps = 0
+        self.duration = 0.0
+
+    def as_dict(self):
+        return {
+            "ssid": self.ssid,
+            "bssid": format_bssid(self.bssid) if self.bssid is not None else None,
+            "aps": self.aps,
+            "changed": self.changed,
+            "findings": len(self.findings),
+            "appeared": len(self.appeared),
+            "vanished": len(self.vanished),
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+
+class MonitorEngine:
+    """One detection cycle: interface query and network scan run concurrently.
+
+    Both `netsh` calls are asyncio subprocesses with their own timeouts, so a
+    cycle takes as long as the slower of the two and a hung call is killed
+    instead of stalling monitoring. Scan records are checked as they stream
+    in. With an `ap_table`, only APs that appeared or changed are checked.
+
+    `cycle()` runs one cycle on an event loop owned by the engine, for the
+    blocking CLI loop and the GUI worker thread; `run_cycle()` is the
+    coroutine itself. `cancel()` aborts a running `cycle()` from another
+    thread; it then raises asyncio.CancelledError and APs it had already
+    checked are forgotten so the next cycle checks them again.
+    `cycle_blocking()` gives the same result without an event loop, with
+    the interface query on a thread, for single-shot runs that should not
+    pay for importing asyncio.
+
+    Besides unknown BSSIDs, APs of protected SSIDs are checked against the
+    SSID's SecurityProfile (auth/cipher downgrade, known BSSID on an
+    unexpected channel) and, with an `ap_table`, a known BSSID whose signal
+    moved by `signal_jump` points or more since the previous scan is
+    reported (0 disables).
+    """
+
+    def __init__(self, scanner, store, similarity, vendors=None, ap_table=None, signal_jump=SIGNAL_JUMP):
+        self.scanner = scanner
+        self.store = store
+        self.similarity = similarity
+        self.vendors = vendors
+        self.ap_table = ap_table
+        self.signal_jump = signal_jump
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+        self._connected = None
+
+    async def run_cycle(self):
+        import asyncio
+        started = time.monotonic()
+        result = CycleResult()
+        iface = asyncio.ensure_future(self.scanner.interface_info_async())
+        try:
+            if self.store.ssids():
+                await self._scan(result)
+        except BaseException:
+            iface.cancel()
+            await asyncio.gather(iface, return_exceptions=True)
+            raise
+        ssid, bssid = await iface
+        return self._finish(result, started, ssid, bssid)
+
+    def cycle_blocking(self):
+        started = time.monotonic()
+        result = CycleResult()
+        info = []
+        iface = threading.Thread(target=lambda: info.append(self.scanner.interface_info()),
+                                 name="interface", daemon=True)
+        iface.start()
+        if self.store.ssids():
+            checked_ssids = set()
+            if self.ap_table is not None:
+                self.ap_table.begin_scan()
+            for ap in self.scanner.iter_aps():
+                self._observe(ap, result, checked_ssids)
+            self._end_scan(result)
+        iface.join()
+        ssid, bssid = info[0] if info else (None, None)
+        return self._finish(result, started, ssid, bssid)
+
+    def _finish(self, result, started, ssid, bssid):
+        result.ssid = ssid
+        result.bssid = bssid = parse_bssid(bssid)
+        # With an AP table, scan findings only come from APs that appeared or changed.
+        result.suspicious = len(result.findings) > 0
+        if ssid and ssid in self.store and bssid is not None and not self.store.is_known(ssid, bssid):
+            result.findings.insert(0, Finding(alerts.BSSID_CHANGE, ssid, bssid,
+                                              f"SSID {ssid} changed BSSID to {format_bssid(bssid)}"))
+            # Raised again every cycle while the host stays connected; only
+            # the move itself is news.
+            if (ssid, bssid) != self._connected:
+                result.suspicious = True
+        self._connected = (ssid, bssid)
+        result.duration = time.monotonic() - started
+        metrics.timings().observe(metrics.CYCLE, result.duration)
+        return result
+
+    def cycle(self):
+        import asyncio
+        if self._cancelled:
+            raise asyncio.CancelledError()
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        self._task = self._loop.create_task(self.run_cycle())
+        # cancel() sets the flag before it looks at _task, and we set _task
+        # before looking at the flag, so one of us sees the other.
+        if self._cancelled:
+            self._task.cancel()
+        try:
+            return self._loop.run_until_complete(self._task)
+        finally:
+            self._task = None
+
+    def cancel(self):
+        """Abort the cycle in progress, or the next one if it has not started
+        yet; cycles keep aborting until `resume()`."""
+        self._cancelled = True
+        task, loop = self._task, self._loop
+        if task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+
+    def resume(self):
+        self._cancelled = False
+
+    def close(self):
+        if self._loop is not None and not self._loop.is_running():
+            self._loop.close()
+            self._loop = None
+        self._task = None
+
+    async def _scan(self, result):
+        import asyncio
+        table = self.ap_table
+        checked_ssids = set()
+        observed = []
+        if table is not None:
+            table.begin_scan()
+        try:
+            async for ap in self.scanner.iter_aps_async():
+                if self._observe(ap, result, checked_ssids) and table is not None:
+                    observed.append(ap)
+        except asyncio.CancelledError:
+            # The findings die with this cycle, so the APs must be checked again.
+            for ap in observed:
+                table.forget(ap)
+            raise
+        self._end_scan(result)
+
+    def _observe(self, ap, result, checked_ssids):
+        """Track and check one scan record; False if it was unchanged and skipped."""
+        result.aps += 1
+        table = self.ap_table
+        if table is not None:
+            event = table.observe(ap)
+            previous = table.previous
+            if previous is not None and previous.signal != ap.signal and previous.signal is not None and self.signal_jump:
+                self.check_signal(ap, previous.signal, result.findings)
+            if event is None:
+                return False
+            result.changed = True
+            if event == APPEARED:
+                result.new_aps.append(ap)
+                if ap.ssid in self.store:
+                    result.appeared.append(ap)
+        self.check(ap, checked_ssids, result.findings)
+        return True
+
+    def _end_scan(self, result):
+        if self.ap_table is not None:
+            vanished = self.ap_table.end_scan()
+            if vanished:
+                result.changed = True
+                result.lost_aps = vanished
+                result.vanished = [ap for ap in vanished if ap.ssid in self.store]
+
+    def check_signal(self, ap, previous, findings):
+        if ap.signal is None or abs(ap.signal - previous) < self.signal_jump:
+            return
+        if ap.ssid in self.store and self.store.is_known(ap.ssid, ap.bssid):
+            findings.append(Finding(alerts.SIGNAL_JUMP, ap.ssid, ap.bssid,
+                                    f"Known AP {format_bssid(ap.bssid)} of SSID {ap.ssid} signal jumped "
+                                    f"from {previous}% to {ap.signal}%"))
+
+    def check(self, ap, checked_ssids, findings):
+        store = self.store
+        if ap.ssid in store:
+            if not store.is_known(ap.ssid, ap.bssid):
+                findings.append(Finding(alerts.ROGUE, ap.ssid, ap.bssid,
+                                        f"Found unknown AP: SSID {ap.ssid} with BSSID {format_bssid(ap.bssid)}"))
+                mismatch = vendor_mismatch(self.vendors, store.ouis(ap.ssid), ap.bssid)
+                if mismatch:
+                    vendor, expected = mismatch
+                    findings.append(Finding(alerts.VENDOR, ap.ssid, ap.bssid,
+                                            f"SSID {ap.ssid} BSSID {format_bssid(ap.bssid)} is from "
+                                            f"{vendor or 'an unregistered vendor'}, baseline APs are {', '.join(expected)}"))
+            profile = store.profile(ap.ssid)
+            if profile is not None:
+                if profile.downgrade(ap):
+                    findings.append(Finding(alerts.DOWNGRADE, ap.ssid, ap.bssid,
+                                            f"SSID {ap.ssid} BSSID {format_bssid(ap.bssid)} offers {ap.auth}/{ap.cipher}, "
+                                            f"baseline is {profile.auth}/{profile.cipher}"))
+                if profile.unexpected_channel(ap) and store.is_known(ap.ssid, ap.bssid):
+                    findings.append(Finding(alerts.CHANNEL, ap.ssid, ap.bssid,
+                                            f"Known AP {format_bssid(ap.bssid)} of SSID {ap.ssid} is on channel {ap.channel}, "
+                                            f"baseline channels are {', '.join(map(str, sorted(profile.channels)))}"))
+        elif ap.ssid not in checked_ssids:
+            checked_ssids.add(ap.ssid)
+            for baseline_ssid, score in self.similarity.matches(ap.ssid):
+                findings.append(Finding(alerts.SIMILAR, ap.ssid, ap.bssid,
+                                        f"Found similar SSID: '{ap.ssid}' (similar to '{baseline_ssid}')",
+                                        baseline=baseline_ssid))
@@ -0,0 +1,177 @@
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+SCAN = "scan"
+START = "start"
+STOP = "stop"
+DROPPED = "dropped"
+
+
+class StdoutSink:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout.buffer
+
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class RotatingFileSink:
+    """Appends to `path`; past `max_bytes` it is renamed to path.1 (path.1 to path.2 ...)."""
+
+    def __init__(self, path, max_bytes=10 << 20, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def write(self, data):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class SocketSink:
+    """Writes to a Unix socket path or (host, port) TCP address, reconnecting on failure."""
+
+    def __init__(self, address, family, timeout=5.0, retry=1.0, max_retry=30.0):
+        self.address = address
+        self.family = family
+        self.timeout = timeout
+        self.retry = retry
+        self.max_retry = max_retry
+        self._sock = None
+        self._delay = retry
+
+    def write(self, data):
+        # Blocks (the writer thread, never the scanner) until the consumer
+        # takes the batch; meanwhile new events queue up behind it.
+        while True:
+            try:
+                if self._sock is None:
+                    self._sock = socket.socket(self.family, socket.SOCK_STREAM)
+                    self._sock.settimeout(self.timeout)
+                    self._sock.connect(self.address)
+                    self._delay = self.retry
+                self._sock.sendall(data)
+                return
+            except OSError:
+                self.close()
+                time.sleep(self._delay)
+                self._delay = min(self._delay * 2, self.max_retry)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def open_sink(spec, max_bytes=10 << 20, backups=5):
+    """'-' for stdout, 'unix:/path', 'tcp:host:port', or a file path ('file:' optional)."""
+    if spec in (None, "", "-"):
+        return StdoutSink()
+    if spec.startswith("unix:"):
+        return SocketSink(spec[5:], socket.AF_UNIX)
+    if spec.startswith("tcp:"):
+        host, _, port = spec[4:].rpartition(":")
+        return SocketSink((host.strip("[]") or "127.0.0.1", int(port)), socket.AF_INET6 if ":" in host else socket.AF_INET)
+    if spec.startswith("file:"):
+        spec = spec[5:]
+    return RotatingFileSink(spec, max_bytes=max_bytes, backups=backups)
+
+
+class EventStream:
+    """Emits JSON-lines events through one writer thread.
+
+    `emit()` serialises the event and hands it to a bounded queue without
+    ever blocking. The writer takes whatever is queued (up to `batch`
+    events) and writes it to the sink in one call, so a busy scan costs one
+    write rather than one per event. If the sink is slow or unreachable the
+    queue fills and further events are dropped and counted; the count is
+    reported in a `dropped` event once the sink catches up.
+    """
+
+    def __init__(self, sink, maxsize=4096, batch=256, host=None):
+        self.sink = sink
+        self.batch = batch
+        self.host = host or socket.gethostname()
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="events", daemon=True)
+        self._thread.start()
+
+    def emit(self, event, **fields):
+        record = {"ts": round(time.time(), 3), "host": self.host, "event": event}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def close(self, timeout=5.0):
+        self._closing.set()
+        self._thread.join(timeout)
+        self.sink.close()
+
+    def _run(self):
+        get = self._queue.get
+        while True:
+            try:
+                lines = [get(timeout=0.5)]
+            except queue.Empty:
+                if self._closing.is_set():
+                    return
+                continue
+            while len(lines) < self.batch:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                lines.append(json.dumps({"ts": round(time.time(), 3), "host": self.host,
+                                         "event": DROPPED, "count": dropped}, separators=(",", ":")) + "\n")
+            try:
+                self.sink.write("".join(lines).encode("utf-8"))
+                self.written += len(lines)
+            except Exception:
+                with self._lock:
+                    self.dropped += len(lines)
@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from roguefinder import alerts
+from roguefinder.bssid import format_bssid, parse_bssid
+from roguefinder.learn import parse_duration
+
+HISTORY_NAME = "history.db"
+DAY = 86400
+# (age in seconds, bucket in seconds): sightings older than `age` are
+# merged into one row per AP per bucket. Alerts are never merged.
+TIERS = ((7 * DAY, 3600), (90 * DAY, DAY))
+RETENTION = 365 * DAY
+COMPACT_INTERVAL = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sightings (
+    t INTEGER NOT NULL,
+    ssid TEXT NOT NULL,
+    bssid INTEGER NOT NULL,
+    signal INTEGER,
+    kind TEXT,
+    baseline TEXT,
+    n INTEGER NOT NULL DEFAULT 1,
+    res INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sightings_bssid ON sightings (bssid, t);
+CREATE INDEX IF NOT EXISTS sightings_t ON sightings (t);
+CREATE INDEX IF NOT EXISTS sightings_alerts ON sightings (kind, t) WHERE kind IS NOT NULL;
+CREATE TABLE IF NOT EXISTS aps (
+    ssid TEXT NOT NULL,
+    bssid INTEGER NOT NULL,
+    first INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    signal_min INTEGER,
+    signal_max INTEGER,
+    PRIMARY KEY (ssid, bssid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS aps_bssid ON aps (bssid);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+"""
+INSERT = "INSERT INTO sightings (t, ssid, bssid, signal, kind, baseline) VALUES (?, ?, ?, ?, ?, ?)"
+UPSERT = """INSERT INTO aps (ssid, bssid, first, last, n, signal_min, signal_max) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (ssid, bssid) DO UPDATE SET
+    first = MIN(first, excluded.first), last = MAX(last, excluded.last), n = n + excluded.n,
+    signal_min = COALESCE(MIN(signal_min, excluded.signal_min), signal_min, excluded.signal_min),
+    signal_max = COALESCE(MAX(signal_max, excluded.signal_max), signal_max, excluded.signal_max)"""
+
+
+class History:
+    """SQLite record of what the monitor saw.
+
+    One row per sighting: (time, SSID, BSSID, signal) and, for findings, the
+    alert kind. An AP that stays in range is written when it appears and
+    then at most once per `sample` seconds, so a quiet network costs one
+    row per AP per minute rather than per scan. Rows are buffered and
+    written in one transaction every `batch_interval` seconds or
+    `max_batch` rows; the same transaction folds them into `aps`, one
+    row per (SSID, BSSID) with first and last sighting, so "first seen"
+    and "what was on this SSID lately" are key lookups however long the
+    history. The database is in WAL mode, so `history` queries run while a
+    monitor is writing.
+
+    `compact()` applies the retention policy: sightings older than each
+    TIERS age are merged into one row per AP per bucket (first time,
+    average signal, `n` sightings), and every row older than `retention`
+    is deleted.
+    """
+
+    def __init__(self, path, sample=60.0, batch_interval=30.0, max_batch=20000, clock=time.time):
+        self.path = path
+        self.sample = sample
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.clock = clock
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.written = 0
+        self._rows = []
+        self._last = {}
+        self._flushed = clock()
+        self._compacted = None
+
+    @classmethod
+    def open_dir(cls, base, **kwargs):
+        return cls(os.path.join(base, HISTORY_NAME), **kwargs)
+
+    def record(self, aps, findings=(), now=None):
+        """Buffer one scan's APs and findings; writes the batch when it is due."""
+        now = self.clock() if now is None else now
+        t = int(now)
+        rows = self._rows
+        last = self._last
+        signals = {}
+        for ap in aps:
+            key = (ap.ssid, ap.bssid)
+            signals[key] = ap.signal
+            seen = last.get(key)
+            if seen is None or now - seen >= self.sample:
+                last[key] = now
+                rows.append((t, ap.ssid, ap.bssid, ap.signal, None, None))
+        for finding in findings:
+            rows.append((t, finding.ssid, finding.bssid, signals.get((finding.ssid, finding.bssid)),
+                         finding.kind, finding.baseline))
+        if len(rows) >= self.max_batch or now - self._flushed >= self.batch_interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        now = self.clock() if now is None else now
+        rows, self._rows = self._rows, []
+        self._flushed = now
+        if rows:
+            summary = {}
+            for t, ssid, bssid, signal, kind, _ in rows:
+                if kind is not None:
+                    continue
+                entry = summary.get((ssid, bssid))
+                if entry is None:
+                    summary[(ssid, bssid)] = [t, t, 1, signal, signal]
+                else:
+                    entry[1] = t
+                    entry[2] += 1
+                    if signal is not None:
+                        entry[3] = signal if entry[3] is None else min(entry[3], signal)
+                        entry[4] = signal if entry[4] is None else max(entry[4], signal)
+            with self._transaction():
+                self.db.executemany(INSERT, rows)
+                self.db.executemany(UPSERT, [key + tuple(entry) for key, entry in summary.items()])
+            self.written += len(rows)
+        # APs out of range for a while get a fresh row when they come back.
+        stale = [key for key, seen in self._last.items() if now - seen >= 2 * self.sample]
+        for key in stale:
+            del self._last[key]
+        return len(rows)
+
+    def compact_due(self, now=None):
+        now = self.clock() if now is None else now
+        if self._compacted is None or now - self._compacted >= COMPACT_INTERVAL:
+            self._compacted = now
+            return True
+        return False
+
+    def compact(self, now=None, tiers=TIERS, retention=RETENTION):
+        """Downsample and expire old rows; returns (rows merged, rows deleted)."""
+        now = int(self.clock() if now is None else now)
+        merged = 0
+        with self._transaction():
+            for age, bucket in tiers:
+                cutoff = (now - age) // bucket * bucket
+                key = f"compacted_{bucket}"
+                row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                start = row[0] if row else 0
+                if cutoff <= start:
+                    continue
+                where = "t >= ? AND t < ? AND kind IS NULL AND res < ?"
+                params = (start, cutoff, bucket)
+                self.db.execute(
+                    f"INSERT INTO sightings (t, ssid, bssid, signal, n, res) "
+                    f"SELECT MIN(t), ssid, bssid, "
+                    f"CAST(ROUND(1.0 * SUM(signal * n) / SUM(CASE WHEN signal IS NULL THEN 0 ELSE n END)) AS INTEGER), "
+                    f"SUM(n), ? FROM sightings WHERE {where} GROUP BY t / ?, ssid, bssid",
+                    (bucket,) + params + (bucket,))
+                merged += self.db.execute(f"DELETE FROM sightings WHERE {where}", params).rowcount
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, cutoff))
+            deleted = self.db.execute("DELETE FROM sightings WHERE t < ?", (now - retention,)).rowcount
+            self.db.execute("DELETE FROM aps WHERE last < ?", (now - retention,))
+        return merged, deleted
+
+    def first_seen(self, bssid):
+        row = self.db.execute("SELECT MIN(first) FROM aps WHERE bssid = ?", (bssid,)).fetchone()
+        return row[0]
+
+    def bssid(self, bssid):
+        """Per SSID a BSSID was seen with: {ssid, first, last, sightings, signal_min, signal_max}."""
+        rows = self.db.execute(
+            "SELECT ssid, first, last, n, signal_min, signal_max FROM aps WHERE bssid = ? ORDER BY first", (bssid,))
+        return [{"ssid": ssid, "first": first, "last": last, "sightings": n, "signal_min": lo, "signal_max": hi}
+                for ssid, first, last, n, lo, hi in rows]
+
+    def ssid(self, ssid, since=0):
+        """BSSIDs of `ssid` seen since `since`, with their first and last sighting ever."""
+        rows = self.db.execute(
+            "SELECT bssid, first, last, n FROM aps WHERE ssid = ? AND last >= ? ORDER BY first", (ssid, since))
+        return [{"bssid": format_bssid(bssid), "first": first, "last": last, "sightings": n}
+                for bssid, first, last, n in rows]
+
+    def alerts(self, kind=None, since=0, bssid=None, limit=None):
+        query = "SELECT t, kind, ssid, bssid, signal, baseline FROM sightings WHERE "
+        if kind:
+            query += "kind = ? AND t >= ?"
+            params = [kind, since]
+        else:
+            query += "kind IS NOT NULL AND t >= ?"
+            params = [since]
+        if bssid is not None:
+            query += " AND bssid = ?"
+            params.append(bssid)
+        query += " ORDER BY t DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [{"t": t, "event": kind, "ssid": ssid, "bssid": format_bssid(b), "signal": signal,
+                 "baseline": baseline}
+                for t, kind, ssid, b, signal, baseline in self.db.execute(query, params)]
+
+    def lookalikes(self, since=0):
+        rows = self.db.execute(
+            "SELECT ssid, baseline, MIN(t), MAX(t), COUNT(DISTINCT bssid) FROM sightings "
+            "WHERE kind = ? AND t >= ? GROUP BY ssid, baseline ORDER BY MIN(t)", (alerts.SIMILAR, since))
+        return [{"ssid": ssid, "baseline": baseline, "first": first, "last": last, "bssids": n}
+                for ssid, baseline, first, last, n in rows]
+
+    def stats(self):
+        rows, alerted, first, last = self.db.execute(
+            "SELECT COUNT(*), COUNT(kind), MIN(t), MAX(t) FROM sightings").fetchone()
+        return {"rows": rows, "alerts": alerted, "first": first, "last": last,
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.db.close()
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+
+class _Transaction:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+def _when(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) if t is not None else "-"
+
+
+def _since(value):
+    seconds = parse_duration(value)
+    if seconds is None:
+        raise argparse.ArgumentTypeError(f"bad duration {value!r}; use e.g. 12h or 7d")
+    return seconds
+
+
+def _print(rows, as_json, fmt):
+    for row in rows:
+        if as_json:
+            print(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        else:
+            print(fmt(row))
+
+
+def main(argv=None, default_dir="."):
+    p = argparse.ArgumentParser(prog="rogue_finder.py history", description="Query the sighting history")
+    p.add_argument("--data-dir", default=default_dir, help=f"directory holding {HISTORY_NAME}")
+    p.add_argument("--json", action="store_true", help="print JSON lines")
+    sub = p.add_subparsers(dest="query", required=True)
+    q = sub.add_parser("bssid", help="when and as what a BSSID was seen, and its alerts")
+    q.add_argument("bssid")
+    q = sub.add_parser("ssid", help="BSSIDs seen for an SSID")
+    q.add_argument("ssid")
+    q.add_argument("--since", type=_since, default=7 * DAY, help="look back this far (default: 7d)")
+    q = sub.add_parser("alerts", help="recorded findings, newest first")
+    q.add_argument("--kind", help="only this finding kind (rogue, similar, vendor, ...)")
+    q.add_argument("--since", type=_since, default=7 * DAY, help="look back this far (default: 7d)")
+    q.add_argument("--limit", type=int, default=100)
+    q = sub.add_parser("lookalikes", help="SSIDs reported as similar to a protected one")
+    q.add_argument("--since", type=_since, default=7 * DAY, help="look back this far (default: 7d)")
+    sub.add_parser("stats", help="row counts and time range")
+    sub.add_parser("compact", help="apply downsampling and retention now")
+    args = p.parse_args(argv)
+
+    path = os.path.join(args.data_dir, HISTORY_NAME)
+    if not os.path.exists(path):
+        print(f"No history at {path}; run the monitor with --history first", file=sys.stderr)
+        return 1
+    history = History(path)
+    now = time.time()
+    try:
+        if args.query == "bssid":
+            bssid = parse_bssid(args.bssid)
+            if bssid is None:
+                print(f"Not a BSSID: {args.bssid}", file=sys.stderr)
+                return 2
+            seen = history.bssid(bssid)
+            found = history.alerts(bssid=bssid, limit=20)
+            if not seen and not found:
+                print(f"{format_bssid(bssid)} was never seen", file=sys.stderr)
+                return 1
+            _print(seen, args.json, lambda r: f"{format_bssid(bssid)}  {r['ssid']}  first {_when(r['first'])}  "
+                                              f"last {_when(r['last'])}  {r['sightings']} sightings  "
+                                              f"signal {r['signal_min']}-{r['signal_max']}%")
+            _print(found, args.json, lambda r: f"  {_when(r['t'])}  {r['event']}  {r['ssid']}")
+        elif args.query == "ssid":
+            _print(history.ssid(args.ssid, now - args.since), args.json,
+                   lambda r: f"{r['bssid']}  first {_when(r['first'])}  last {_when(r['last'])}  "
+                             f"{r['sightings']} sightings")
+        elif args.query == "alerts":
+            _print(history.alerts(args.kind, now - args.since, limit=args.limit), args.json,
+                   lambda r: f"{_when(r['t'])}  {r['event']:<12} {r['ssid']}  {r['bssid']}"
+                             + (f"  (like {r['baseline']})" if r["baseline"] else ""))
+        elif args.query == "lookalikes":
+            _print(history.lookalikes(now - args.since), args.json,
+                   lambda r: f"'{r['ssid']}' like '{r['baseline']}'  first {_when(r['first'])}  "
+                             f"last {_when(r['last'])}  {r['bssids']} BSSIDs")
+        elif args.query == "stats":
+            s = history.stats()
+            _print([s], args.json, lambda r: f"{r['rows']} rows ({r['alerts']} alerts) from {_when(r['first'])} "
+                                             f"to {_when(r['last'])}, {r['bytes'] / 1048576:.1f} MB")
+        elif args.query == "compact":
+            merged, deleted = history.compact()
+            print(f"Merged {merged} old sightings, deleted {deleted} expired rows")
+    finally:
+        history.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import sys
+
+from roguefinder.baseline import cipher_rank
+from roguefinder.bssid import parse_bssid
+from roguefinder.netsh_parser import AP
+
+
+def freq_channel(freq):
+    if freq == 2484:
+        return 14
+    if 2412 <= freq < 2484:
+        return (freq - 2407) // 5
+    if 5955 <= freq <= 7115:
+        return (freq - 5950) // 5
+    if 4910 <= freq < 5950:
+        return (freq - 5000) // 5 if freq >= 5000 else (freq - 4000) // 5
+    return None
+
+
+def dbm_quality(dbm):
+    # The mapping Windows uses for netsh's "Signal" percentage.
+    return max(0, min(100, int(round(2 * (dbm + 100)))))
+
+
+def unescape_ssid(text):
+    """iw prints SSID bytes outside printable ASCII as \\xNN."""
+    if "\\x" not in text:
+        return text
+    out = bytearray()
+    i = 0
+    while i < len(text):
+        if text.startswith("\\x", i) and i + 4 <= len(text):
+            try:
+                out.append(int(text[i + 2:i + 4], 16))
+                i += 4
+                continue
+            except ValueError:
+                pass
+        out += text[i].encode("utf-8")
+        i += 1
+    return out.decode("utf-8", errors="replace")
+
+
+def auth_name(suites, rsn):
+    """netsh-style authentication name for an RSN/WPA "Authentication suites" value."""
+    s = suites.upper()
+    # Transition modes accept the weaker suite, so that one is reported.
+    if "PSK" in s:
+        return "WPA2-Personal" if rsn else "WPA-Personal"
+    if "SAE" in s:
+        return "WPA3-Personal"
+    if "802.1X" in s:
+        if s.count("SUITE-B") == s.count("802.1X"):
+            return "WPA3-Enterprise"
+        return "WPA2-Enterprise" if rsn else "WPA-Enterprise"
+    if "OWE" in s:
+        return "OWE"
+    return suites.strip() or None
+
+
+class _Entry:
+    __slots__ = ("bssid", "ssid", "freq", "dbm", "privacy", "rsn", "wpa", "radio", "age", "section")
+
+    def __init__(self, bssid):
+        self.bssid = bssid
+        self.ssid = None
+        self.freq = None
+        self.dbm = None
+        self.privacy = False
+        self.rsn = None
+        self.wpa = None
+        self.radio = None
+        self.age = None
+        self.section = None
+
+
+RADIO_CAPS = {"EHT capabilities": "802.11be", "HE capabilities": "802.11ax",
+              "VHT capabilities": "802.11ac", "HT capabilities": "802.11n"}
+RADIO_ORDER = ("802.11n", "802.11ac", "802.11ax", "802.11be")
+
+
+class IwParser:
+    """Push parser for `iw dev <if> scan` / `scan dump` output.
+
+    Same contract as NetshParser: `feed()` takes one line and returns an AP
+    once its BSS block has ended, `close()` returns the last one. Records
+    carry the same netsh-style attributes (signal as a percentage, auth
+    names such as WPA2-Personal) so baselines and profiles work across
+    backends. `freshest` is the age in ms of the most recently seen BSS.
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.current = None
+        self.freshest = None
+
+    def feed(self, line):
+        if line.startswith("BSS "):
+            done = self._finish()
+            bssid = parse_bssid(line[4:21])
+            self.current = _Entry(bssid) if bssid is not None else None
+            return done
+        entry = self.current
+        if entry is None:
+            return None
+        if line.startswith("\t\t"):
+            if entry.section is not None:
+                key, sep, val = line.strip().lstrip("* ").partition(":")
+                if sep:
+                    entry.section[key.strip()] = val.strip()
+            return None
+        key, sep, val = line.strip().partition(":")
+        if not sep:
+            return None
+        key = key.strip()
+        entry.section = None
+        if key == "SSID":
+            entry.ssid = unescape_ssid(val.strip())
+        elif key == "signal":
+            try:
+                entry.dbm = float(val.split()[0])
+            except (ValueError, IndexError):
+                pass
+        elif key == "freq":
+            try:
+                entry.freq = int(float(val))
+            except ValueError:
+                pass
+        elif key == "last seen":
+            if val.endswith("ms ago"):
+                try:
+                    entry.age = int(val.split()[0])
+                except ValueError:
+                    pass
+        elif key == "capability":
+            entry.privacy = "Privacy" in val
+        elif key == "RSN" or key == "WPA":
+            section = entry.section = {}
+            if key == "RSN":
+                entry.rsn = section
+            else:
+                entry.wpa = section
+            # The first item shares the line: "RSN:\t * Version: 1".
+            k, s, v = val.strip().lstrip("* ").partition(":")
+            if s:
+                section[k.strip()] = v.strip()
+        elif key in RADIO_CAPS:
+            radio = RADIO_CAPS[key]
+            if entry.radio is None or RADIO_ORDER.index(radio) > RADIO_ORDER.index(entry.radio):
+                entry.radio = radio
+        return None
+
+    def close(self):
+        return self._finish()
+
+    def _finish(self):
+        entry, self.current = self.current, None
+        if entry is None:
+            return None
+        if entry.age is not None and (self.freshest is None or entry.age < self.freshest):
+            self.freshest = entry.age
+        ssid = entry.ssid
+        # Hidden networks print an empty or all-NUL SSID.
+        if not ssid or not ssid.strip("\x00"):
+            return None
+        key = (ssid, entry.bssid)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        security = entry.rsn if entry.rsn is not None else entry.wpa
+        if security is not None:
+            auth = auth_name(security.get("Authentication suites", ""), entry.rsn is not None)
+            ciphers = security.get("Pairwise ciphers", "").split()
+            cipher = max(ciphers, key=cipher_rank) if ciphers else None
+        elif entry.privacy:
+            auth, cipher = "Open", "WEP"
+        else:
+            auth, cipher = "Open", "None"
+        radio = entry.radio
+        if radio is None and entry.freq is not None:
+            radio = "802.11a" if entry.freq >= 4900 else "802.11g"
+        return AP(ssid, entry.bssid,
+                  sys.intern(auth) if auth else None,
+                  sys.intern(cipher) if cipher else None,
+                  freq_channel(entry.freq) if entry.freq is not None else None,
+                  radio,
+                  dbm_quality(entry.dbm) if entry.dbm is not None else None)
+
+
+def parse_scan(out):
+    """Return ([AP, ...], age in ms of the freshest BSS or None)."""
+    parser = IwParser()
+    feed = parser.feed
+    aps = []
+    for line in out.splitlines():
+        ap = feed(line)
+        if ap is not None:
+            aps.append(ap)
+    ap = parser.close()
+    if ap is not None:
+        aps.append(ap)
+    return aps, parser.freshest
+
+
+def parse_link(out):
+    """(ssid, bssid string) of the current association from `iw dev <if> link`."""
+    ssid = bssid = None
+    for line in out.splitlines():
+        if line.startswith("Connected to "):
+            bssid = line[13:30]
+        elif line.startswith("\tSSID:"):
+            ssid = unescape_ssid(line[6:].strip())
+    if bssid is None:
+        return None, None
+    return ssid or None, bssid
+
+
+def parse_dev(out):
+    """First wireless interface listed by `iw dev`."""
+    for line in out.splitlines():
+        key, _, name = line.strip().partition(" ")
+        if key == "Interface" and name.strip():
+            return name.strip()
+    return None
@@ -0,0 +1,199 @@
+import json
+import os
+import re
+
+from roguefinder.baseline import SecurityProfile
+from roguefinder.netsh_parser import AP
+
+LEARN_NAME = ".learn"
+CHECKPOINT_INTERVAL = 60.0
+UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+DURATION = re.compile(r"(\d+(?:\.\d*)?)\s*([smhd]?)")
+
+
+def parse_duration(text):
+    """Seconds in "90", "90s", "30m", "2h", "1d" or "1h30m"; None if malformed."""
+    text = text.strip().lower()
+    total = 0.0
+    pos = 0
+    while pos < len(text):
+        m = DURATION.match(text, pos)
+        if m is None:
+            return None
+        total += float(m.group(1)) * UNITS[m.group(2)]
+        pos = m.end()
+    return total if text and total > 0 else None
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s" if seconds % 60 else f"{seconds // 60}m"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class Presence:
+    __slots__ = ("score", "error", "stamp", "first_seen", "sightings", "ap")
+
+    def __init__(self, score, error, stamp, first_seen, sightings, ap):
+        self.score = score
+        self.error = error
+        self.stamp = stamp
+        self.first_seen = first_seen
+        self.sightings = sightings
+        self.ap = ap
+
+
+class PresenceLearner:
+    """Learns which BSSIDs of the target SSIDs are permanent fixtures.
+
+    Each scan adds 1 to a presence score for every target AP seen and to a
+    scan score shared by all of them; both halve every `half_life` seconds,
+    so the ratio is the weighted share of recent scans an AP was seen in.
+    An AP is promoted into the baseline once that ratio reaches `threshold`
+    after at least `min_sightings` scans spread over `min_span` seconds; a
+    neighbour that is in range for a few minutes never gets there. The
+    table holds at most `max_entries` candidates: past that the weakest
+    quarter is dropped, which keeps memory flat however many transient
+    BSSIDs go by. As in the Space-Saving algorithm, an AP that enters after
+    a drop starts from the best score dropped (`floor`), so a newcomer is
+    not evicted ahead of the transients it arrived with; that head start is
+    kept as `error` and subtracted before promotion. Scores decay on the
+    wall clock, so time a sensor spends stopped between checkpoints ages
+    every score alike and the ratios hold.
+    """
+
+    def __init__(self, store, ssids, half_life=900.0, threshold=0.25, min_sightings=3, min_span=600.0,
+                 max_entries=4096, elapsed=0.0):
+        self.store = store
+        self.ssids = frozenset(ssids)
+        self.half_life = half_life
+        self.threshold = threshold
+        self.min_sightings = min_sightings
+        self.min_span = min_span
+        self.max_entries = max_entries
+        self.elapsed = elapsed
+        self.entries = {}
+        self.scans = 0.0
+        self.scans_at = None
+        self.floor = 0.0
+        self.floor_at = None
+        self.promoted = 0
+        self.evicted = 0
+
+    @classmethod
+    def for_duration(cls, store, ssids, duration, threshold=0.25, max_entries=4096):
+        return cls(store, ssids, half_life=max(60.0, duration / 4), threshold=threshold,
+                   min_span=min(1800.0, duration / 4), max_entries=max_entries)
+
+    def _decay(self, value, stamp, now):
+        return value * 0.5 ** ((now - stamp) / self.half_life) if now > stamp else value
+
+    def observe(self, aps, now):
+        """Count one scan; return the (ssid, bssid) pairs it promoted."""
+        self.scans = (self._decay(self.scans, self.scans_at, now) if self.scans_at is not None else 0.0) + 1
+        self.scans_at = now
+        entries = self.entries
+        ready = []
+        for ap in aps:
+            if ap.ssid not in self.ssids or self.store.is_known(ap.ssid, ap.bssid):
+                continue
+            key = (ap.ssid, ap.bssid)
+            entry = entries.get(key)
+            if entry is None:
+                floor = self._decay(self.floor, self.floor_at, now) if self.floor_at is not None else 0.0
+                entry = entries[key] = Presence(floor + 1, floor, now, now, 1, ap)
+            else:
+                factor = self._decay(1.0, entry.stamp, now)
+                entry.score = entry.score * factor + 1
+                entry.error *= factor
+                entry.stamp = now
+                entry.sightings += 1
+                entry.ap = ap
+            if (entry.sightings >= self.min_sightings and now - entry.first_seen >= self.min_span
+                    and entry.score - entry.error >= self.threshold * self.scans):
+                ready.append(key)
+        if ready:
+            self._promote(ready)
+        if len(entries) > self.max_entries:
+            self._prune(now)
+        return ready
+
+    def confidence(self, entry, now):
+        if not self.scans:
+            return 0.0
+        return (self._decay(entry.score - entry.error, entry.stamp, now)
+                / self._decay(self.scans, self.scans_at, now))
+
+    def candidates(self, now):
+        """[(confidence, Presence), ...], most confident first."""
+        return sorted(((self.confidence(e, now), e) for e in self.entries.values()),
+                      key=lambda c: c[0], reverse=True)
+
+    def _promote(self, keys):
+        by_ssid = {}
+        for key in keys:
+            by_ssid.setdefault(key[0], []).append(self.entries.pop(key).ap)
+        for ssid, aps in by_ssid.items():
+            self.promoted += self.store.add_many(ssid, [ap.bssid for ap in aps])
+            learned = SecurityProfile.from_aps(aps)
+            current = self.store.profile(ssid)
+            self.store.set_profile(ssid, current.merge(learned) if current and learned else current or learned)
+
+    def _prune(self, now):
+        ranked = sorted(self.entries.items(), key=lambda kv: self._decay(kv[1].score, kv[1].stamp, now))
+        drop = len(ranked) - self.max_entries * 3 // 4
+        for key, _ in ranked[:drop]:
+            del self.entries[key]
+        last = ranked[drop - 1][1]
+        self.floor = max(self._decay(self.floor, self.floor_at, now) if self.floor_at is not None else 0.0,
+                         self._decay(last.score, last.stamp, now))
+        self.floor_at = now
+        self.evicted += drop
+
+    def save(self, path):
+        state = {
+            "ssids": sorted(self.ssids), "elapsed": round(self.elapsed, 3),
+            "scans": self.scans, "scans_at": self.scans_at,
+            "floor": self.floor, "floor_at": self.floor_at,
+            "promoted": self.promoted, "evicted": self.evicted,
+            "entries": [[e.ap.ssid, e.ap.bssid, e.score, e.error, e.stamp, e.first_seen, e.sightings,
+                         e.ap.auth, e.ap.cipher, e.ap.channel]
+                        for e in self.entries.values()],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def resume(self, path):
+        """Pick up a checkpoint written by `save()` for the same SSIDs.
+
+        Returns False, leaving the learner empty, if there is none or it
+        belongs to a different set of SSIDs or cannot be read.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if frozenset(state["ssids"]) != self.ssids:
+                return False
+            entries = {}
+            for ssid, bssid, score, error, stamp, first_seen, sightings, auth, cipher, channel in state["entries"]:
+                if not self.store.is_known(ssid, bssid):
+                    entries[(ssid, bssid)] = Presence(score, error, stamp, first_seen, sightings,
+                                                      AP(ssid, bssid, auth, cipher, channel))
+            self.elapsed = float(state["elapsed"])
+            self.scans = float(state["scans"])
+            self.scans_at = state["scans_at"]
+            self.floor = float(state["floor"])
+            self.floor_at = state["floor_at"]
+            self.promoted = state.get("promoted", 0)
+            self.evicted = state.get("evicted", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.entries = entries
+        return True
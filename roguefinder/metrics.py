@@ -0,0 +1,141 @@
+import bisect
+import os
+import threading
+import time
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+INTERFACE = "interface"
+SCAN = "scan"
+PARSE = "parse"
+SIMILARITY = "similarity"
+NOTIFY = "notify"
+CYCLE = "cycle"
+STAGES = (INTERFACE, SCAN, PARSE, SIMILARITY, NOTIFY, CYCLE)
+
+METRIC = "roguefinder_stage_seconds"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observing is a bisect and a few adds."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max", "_lock")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum, self.max
+
+    def quantile(self, q):
+        counts, count, _, top = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else top
+                return min(top, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return top
+
+
+class Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class StageTimings:
+    """Per-stage histograms for the monitoring hot path."""
+
+    def __init__(self, stages=STAGES):
+        self.started = time.time()
+        self.stages = {stage: Histogram() for stage in stages}
+
+    def __getitem__(self, stage):
+        return self.stages[stage]
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def timer(self, stage):
+        return Timer(self.stages[stage])
+
+    def summary(self):
+        lines = []
+        for stage, hist in self.stages.items():
+            _, count, total, top = hist.snapshot()
+            if not count:
+                continue
+            lines.append(f"{stage:<11} n={count:<6} mean={fmt_seconds(total / count):>8} "
+                         f"p50={fmt_seconds(hist.quantile(0.5)):>8} p95={fmt_seconds(hist.quantile(0.95)):>8} "
+                         f"max={fmt_seconds(top):>8}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        out = [f"# HELP {METRIC} Time spent per RogueFinder monitoring stage.",
+               f"# TYPE {METRIC} histogram"]
+        for stage, hist in self.stages.items():
+            counts, count, total, _ = hist.snapshot()
+            cumulative = 0
+            for le, n in zip(hist.buckets, counts):
+                cumulative += n
+                out.append(f'{METRIC}_bucket{{stage="{stage}",le="{le:g}"}} {cumulative}')
+            out.append(f'{METRIC}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            out.append(f'{METRIC}_sum{{stage="{stage}"}} {total:.6f}')
+            out.append(f'{METRIC}_count{{stage="{stage}"}} {count}')
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path):
+        # node-exporter reads the directory at any time, so never expose a partial file.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def fmt_seconds(seconds):
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+_timings = StageTimings()
+
+
+def timings():
+    return _timings
+
+
+def timer(stage):
+    return Timer(_timings.stages[stage])
@@ -0,0 +1,150 @@
+import sys
+
+from roguefinder.bssid import format_bssid, parse_bssid
+
+# Labels of the per-SSID and per-BSSID attribute lines, upper-cased, as
+# printed by English, German, French, Spanish, Italian and Portuguese builds.
+FIELDS = {
+    "AUTHENTICATION": "auth", "AUTHENTIFIZIERUNG": "auth", "AUTHENTIFICATION": "auth",
+    "AUTENTICACIÓN": "auth", "AUTENTICAZIONE": "auth", "AUTENTICAÇÃO": "auth",
+    "ENCRYPTION": "cipher", "VERSCHLÜSSELUNG": "cipher", "CHIFFREMENT": "cipher",
+    "CIFRADO": "cipher", "CRITTOGRAFIA": "cipher", "CRIPTOGRAFIA": "cipher",
+    "SIGNAL": "signal", "SEÑAL": "signal", "SEGNALE": "signal", "SINAL": "signal",
+    "RADIO TYPE": "radio", "FUNKTYP": "radio", "TYPE DE RADIO": "radio", "TIPO DE RADIO": "radio",
+    "TIPO FREQUENZA RADIO": "radio", "TIPO DE RÁDIO": "radio",
+    "CHANNEL": "channel", "KANAL": "channel", "CANAL": "channel", "CANALE": "channel",
+}
+
+
+def _int(val):
+    # Signal carries a "%" suffix, with a space before it in some locales.
+    val = val.strip().rstrip("%").rstrip()
+    return int(val) if val.isdigit() else None
+
+
+class AP:
+    """One BSSID from a scan.
+
+    Signal (percent) and channel are ints; auth, cipher and radio type are
+    interned, so thousands of records share a handful of strings. Equality
+    and hashing only use the (ssid, bssid) identity.
+    """
+
+    __slots__ = ("ssid", "bssid", "auth", "cipher", "channel", "radio", "signal")
+    # Attributes whose change makes the AP table report the AP as changed;
+    # signal strength moves on every scan.
+    DETAILS = ("auth", "cipher", "channel", "radio")
+
+    def __init__(self, ssid, bssid, auth=None, cipher=None, channel=None, radio=None, signal=None):
+        self.ssid = ssid
+        self.bssid = bssid
+        self.auth = auth
+        self.cipher = cipher
+        self.channel = channel
+        self.radio = radio
+        self.signal = signal
+
+    def __repr__(self):
+        return f"AP({self.ssid!r}, {format_bssid(self.bssid)!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, AP) and self.ssid == other.ssid and self.bssid == other.bssid
+
+    def __hash__(self):
+        return hash((self.ssid, self.bssid))
+
+
+class NetshParser:
+    """Push parser for `netsh wlan show networks mode=bssid`.
+
+    `feed()` takes one line at a time and returns an AP once its BSSID block
+    has ended, so it works on output that is still being written, from a
+    pipe or an asyncio stream. `close()` returns the final block.
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.current_ssid = None
+        self.auth = None
+        self.cipher = None
+        self.pending = None
+
+    def feed(self, line):
+        key, sep, val = line.partition(":")
+        if not sep:
+            return None
+        ku = key.strip().upper()
+
+        # Attribute lines outnumber SSID/BSSID lines, so look them up first.
+        field = FIELDS.get(ku)
+        if field is not None:
+            if field == "auth":
+                self.auth = sys.intern(val.strip()) or None
+            elif field == "cipher":
+                self.cipher = sys.intern(val.strip()) or None
+            elif self.pending is not None:
+                if field == "signal":
+                    self.pending.signal = _int(val)
+                elif field == "channel":
+                    self.pending.channel = _int(val)
+                else:
+                    self.pending.radio = sys.intern(val.strip()) or None
+            return None
+
+        if ku.startswith("SSID"):
+            done = self.pending
+            self.pending = None
+            name = val.strip()
+            # Hidden networks print an empty name; their BSSIDs must not be
+            # attributed to the previous SSID.
+            self.current_ssid = name if name and name.upper() != "NONE" else None
+            self.auth = self.cipher = None
+            return done
+
+        if ku.startswith("BSSID"):
+            done = self.pending
+            self.pending = None
+            if self.current_ssid is None:
+                return done
+            bssid = parse_bssid(val)
+            if bssid is None:
+                return done
+            k = (self.current_ssid, bssid)
+            if k not in self.seen:
+                self.seen.add(k)
+                self.pending = AP(self.current_ssid, bssid, self.auth, self.cipher)
+            return done
+
+        return None
+
+    def close(self):
+        done = self.pending
+        self.pending = None
+        return done
+
+
+def iter_aps(lines):
+    """Yield one AP per BSSID block; `lines` may be a pipe still being written."""
+    parser = NetshParser()
+    feed = parser.feed
+    for line in lines:
+        ap = feed(line)
+        if ap is not None:
+            yield ap
+    ap = parser.close()
+    if ap is not None:
+        yield ap
+
+
+def group_by_ssid(aps):
+    ap_dict = {}
+    for ap in aps:
+        bssids = ap_dict.get(ap.ssid)
+        if bssids is None:
+            ap_dict[ap.ssid] = bssids = []
+        bssids.append(ap.bssid)
+    return ap_dict
+
+
+def parse_networks(out):
+    return group_by_ssid(iter_aps(out.splitlines()))
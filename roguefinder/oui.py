@@ -0,0 +1,140 @@
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+
+from roguefinder.bssid import bssid_oui, is_locally_administered
+
+OUI_NAME = "oui.bin"
+
+# File layout: magic, record count, then `count` sorted (oui, name offset)
+# pairs of little-endian uint32, then NUL-terminated UTF-8 vendor names.
+MAGIC = b"RFOUI\x00\x00\x01"
+_HEADER = struct.Struct("<8sI4x")
+_RECORD = struct.Struct("<II")
+_TXT_LINE = re.compile(r"^\s*([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})\s+\(hex\)\s+(.+?)\s*$")
+
+
+class OuiTable:
+    """Memory-mapped IEEE MA-L vendor table with binary-search lookup.
+
+    Only the pages touched by a lookup are read; no Python objects are built
+    for the registry itself.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"not an OUI index: {path}")
+        self._names = _HEADER.size + self.count * _RECORD.size
+
+    @classmethod
+    def open_default(cls, base):
+        path = os.path.join(base, OUI_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception:
+            return None
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, bssid):
+        if bssid is None or is_locally_administered(bssid):
+            return None
+        key = bssid_oui(bssid)
+        mm = self._mm
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            oui, off = _RECORD.unpack_from(mm, _HEADER.size + mid * _RECORD.size)
+            if oui < key:
+                lo = mid + 1
+            elif oui > key:
+                hi = mid
+            else:
+                start = self._names + off
+                end = mm.find(b"\x00", start)
+                return mm[start:end].decode("utf-8", "replace")
+        return None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+def vendor_mismatch(table, baseline_ouis, bssid):
+    """Return (vendor, baseline_vendors) when `bssid` comes from a vendor not in the baseline."""
+    if table is None or not baseline_ouis or bssid_oui(bssid) in baseline_ouis:
+        return None
+    baseline_vendors = {table.lookup(oui << 24) for oui in baseline_ouis}
+    baseline_vendors.discard(None)
+    if not baseline_vendors:
+        return None
+    vendor = table.lookup(bssid)
+    if vendor in baseline_vendors:
+        return None
+    return vendor, sorted(baseline_vendors)
+
+
+def read_registry(path):
+    """Yield (oui, vendor) from IEEE `oui.csv` or `oui.txt`."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        first = f.readline()
+        f.seek(0)
+        if first.startswith("Registry,"):
+            for row in csv.DictReader(f):
+                if row.get("Registry") == "MA-L" and row.get("Assignment"):
+                    yield int(row["Assignment"], 16), row["Organization Name"].strip()
+        else:
+            for line in f:
+                m = _TXT_LINE.match(line)
+                if m:
+                    yield int(m.group(1) + m.group(2) + m.group(3), 16), m.group(4)
+
+
+def build(src, dest):
+    entries = dict(read_registry(src))
+    names = {}
+    blob = bytearray()
+    records = []
+    for oui in sorted(entries):
+        name = entries[oui]
+        off = names.get(name)
+        if off is None:
+            off = names[name] = len(blob)
+            blob += name.encode("utf-8") + b"\x00"
+        records.append(_RECORD.pack(oui, off))
+    tmp = dest + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(records)))
+        f.write(b"".join(records))
+        f.write(bytes(blob))
+    os.replace(tmp, dest)
+    return len(records)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Build the memory-mapped OUI vendor index")
+    p.add_argument("source", help="IEEE oui.csv or oui.txt")
+    p.add_argument("dest", nargs="?", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), OUI_NAME))
+    args = p.parse_args()
+    count = build(args.source, args.dest)
+    print(f"{count} vendors written to {args.dest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from roguefinder.aptable import APTable
+from roguefinder.baseline import BaselineStore
+from roguefinder.engine import SIGNAL_JUMP, MonitorEngine
+from roguefinder.oui import OuiTable
+from roguefinder.scanner import COMMAND_FILES, INTERFACES_CMD, NETWORKS_CMD, RecordedRunner, Scanner
+from roguefinder.similarity import SimilarityIndex
+
+SCAN_SUFFIXES = (".txt", ".txt.gz")
+
+
+def discover(root):
+    """Map each directory under `root` to its scan files, in name order.
+
+    Every `.txt` (or `.txt.gz`) file holds one `netsh ... mode=bssid`
+    capture; a directory is one sensor's or survey's sequence of scans, so
+    captures should be named to sort chronologically. Recorded interface
+    output (`interfaces*.txt`) is skipped.
+    """
+    skip = COMMAND_FILES[INTERFACES_CMD]
+    streams = []
+    for path, dirs, files in os.walk(root):
+        dirs.sort()
+        scans = sorted(f for f in files if f.endswith(SCAN_SUFFIXES) and not f.startswith(skip))
+        if scans:
+            rel = os.path.relpath(path, root)
+            streams.append((rel if rel != "." else "", [os.path.join(path, f) for f in scans]))
+    return streams
+
+
+def plan(streams, chunk=64, warmup=3):
+    """Split streams into independent tasks of `chunk` scans.
+
+    Each task also replays the `warmup` scans before it without reporting
+    them. The AP table forgets an AP after that many missed scans, so the
+    table a task starts reporting with is the one a sequential replay would
+    have had at that point, and the merged findings do not depend on how
+    the work was split.
+    """
+    tasks = []
+    for name, files in streams:
+        for start in range(0, len(files), chunk):
+            tasks.append((name, start - min(start, warmup), start, files[start - min(start, warmup):start + chunk]))
+    return tasks
+
+
+def read_scan(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8-sig", errors="replace") as f:
+        return f.read()
+
+
+_context = None
+
+
+def _init(store_path, oui_base, matcher, signal_jump):
+    global _context
+    store = BaselineStore(store_path)
+    vendors = OuiTable.open_default(oui_base) if oui_base else None
+    _context = store, SimilarityIndex(store.ssids(), matcher=matcher), vendors, signal_jump
+
+
+def _run(task):
+    name, first, start, files = task
+    store, similarity, vendors, signal_jump = _context
+    runner = RecordedRunner({NETWORKS_CMD: [read_scan(path) for path in files]})
+    # No retries: an empty recorded scan is a result, not a slow adapter.
+    engine = MonitorEngine(Scanner(runner, ready_timeout=0), store, similarity, vendors, APTable(), signal_jump)
+    results = []
+    try:
+        for i, path in enumerate(files, first):
+            result = engine.cycle()
+            if i >= start:
+                results.append((name, os.path.basename(path), result.aps,
+                                [(f.kind, f.as_dict()) for f in result.findings]))
+    finally:
+        engine.close()
+    return results
+
+
+class Replay:
+    """Runs recorded scans through MonitorEngine on a process pool.
+
+    Workers open the baseline store read-only, once each. Results come back
+    in task order (stream, then file name) regardless of which worker
+    finished first, so output is identical for any `jobs`. `workers` is the
+    number of processes the last run actually used: never more than there
+    are tasks, and a single task runs in this process.
+    """
+
+    def __init__(self, store_path, oui_base=None, matcher="positional", signal_jump=SIGNAL_JUMP,
+                 jobs=None, chunk=64):
+        self.init_args = (store_path, oui_base, matcher, signal_jump)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk = chunk
+        self.workers = 0
+        self.scans = 0
+        self.aps = 0
+        self.findings = {}
+        self.elapsed = 0.0
+
+    def run(self, root):
+        """Yield (stream, file, aps, [(kind, finding dict), ...]) for every scan."""
+        tasks = plan(discover(root), self.chunk)
+        started = time.perf_counter()
+        try:
+            self.workers = max(1, min(self.jobs, len(tasks)))
+            if self.workers == 1:
+                _init(*self.init_args)
+                batches = map(_run, tasks)
+                yield from self._count(batches)
+            else:
+                with ProcessPoolExecutor(self.workers, initializer=_init, initargs=self.init_args) as pool:
+                    yield from self._count(pool.map(_run, tasks))
+        finally:
+            self.elapsed = time.perf_counter() - started
+
+    @property
+    def rate(self):
+        return self.scans / self.elapsed if self.elapsed else 0.0
+
+    def _count(self, batches):
+        for batch in batches:
+            for stream, name, aps, findings in batch:
+                self.scans += 1
+                self.aps += aps
+                for kind, _ in findings:
+                    self.findings[kind] = self.findings.get(kind, 0) + 1
+                yield stream, name, aps, findings
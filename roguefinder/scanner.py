@@ -0,0 +1,511 @@
+import subprocess
+import sys
+import threading
+import time
+import os
+import locale
+from roguefinder import metrics
+from roguefinder.baseline import SecurityProfile
+from roguefinder.bssid import parse_bssid
+from roguefinder.iw_parser import parse_dev, parse_link, parse_scan
+from roguefinder.netsh_parser import NetshParser, group_by_ssid
+
+# asyncio is imported inside the async methods: they only run under an event
+# loop, which has imported it already, and at module level it would cost a
+# --setup or --once run more than everything else they load.
+
+NETWORKS_CMD = ("netsh", "wlan", "show", "networks", "mode=bssid")
+INTERFACES_CMD = ("netsh", "wlan", "show", "interfaces")
+
+# File name stems used by RecordedRunner.from_dir for each command.
+COMMAND_FILES = {
+    NETWORKS_CMD: "networks_bssid",
+    INTERFACES_CMD: "interfaces",
+}
+
+BACKENDS = ("netsh", "iw")
+IW_DEV_CMD = ("iw", "dev")
+
+
+def iw_commands(interface):
+    """(scan dump, scan, link) commands for `interface`."""
+    base = ("iw", "dev", interface)
+    return base + ("scan", "dump"), base + ("scan",), base + ("link",)
+
+
+def iw_files(interface):
+    dump, scan, link = iw_commands(interface)
+    return {IW_DEV_CMD: "dev", dump: "scan_dump", scan: "scan_trigger", link: "link"}
+
+
+class SubprocessRunner:
+    def __init__(self, encoding=None):
+        self.encoding = encoding or locale.getpreferredencoding() or 'utf-8'
+
+    def run(self, args, timeout=None):
+        proc = subprocess.run(list(args), encoding=self.encoding, errors="ignore",
+                              capture_output=True, timeout=timeout)
+        return proc.stdout or ""
+
+    def stream(self, args, timeout=None):
+        proc = subprocess.Popen(list(args), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                encoding=self.encoding, errors="ignore")
+        timer = None
+        if timeout:
+            timer = threading.Timer(timeout, proc.kill)
+            timer.daemon = True
+            timer.start()
+        try:
+            for line in proc.stdout:
+                yield line
+        finally:
+            if timer:
+                timer.cancel()
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+    async def run_async(self, args, timeout=None):
+        import asyncio
+        proc = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.DEVNULL)
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        finally:
+            await _reap(proc)
+        return out.decode(self.encoding, errors="ignore")
+
+    async def stream_async(self, args, timeout=None):
+        import asyncio
+        proc = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.DEVNULL)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        try:
+            while True:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+                if not line:
+                    break
+                yield line.decode(self.encoding, errors="ignore")
+        finally:
+            await _reap(proc)
+
+
+async def _reap(proc):
+    # Kill on timeout or cancellation so a hung netsh never outlives its cycle.
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    await proc.wait()
+
+
+class RecordedRunner:
+    """Stand-in runner replaying captured command output, for machines without Wi-Fi."""
+
+    def __init__(self, responses, latency=0.0):
+        self.responses = {}
+        for args, outputs in responses.items():
+            if isinstance(outputs, str):
+                outputs = [outputs]
+            self.responses[tuple(args)] = list(outputs)
+        self.latency = latency
+        self.calls = []
+        self._pos = {}
+
+    @classmethod
+    def from_dir(cls, path, latency=0.0, files=None):
+        responses = {}
+        names = sorted(os.listdir(path))
+        for args, stem in (files or COMMAND_FILES).items():
+            outputs = []
+            for name in names:
+                if name.startswith(stem) and name.endswith(".txt"):
+                    with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                        outputs.append(f.read())
+            if outputs:
+                responses[args] = outputs
+        return cls(responses, latency=latency)
+
+    def run(self, args, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next(args)
+
+    def stream(self, args, timeout=None):
+        return iter(self.run(args, timeout).splitlines(True))
+
+    async def run_async(self, args, timeout=None):
+        if self.latency:
+            import asyncio
+            await asyncio.wait_for(asyncio.sleep(self.latency), timeout)
+        return self._next(args)
+
+    async def stream_async(self, args, timeout=None):
+        for line in (await self.run_async(args, timeout)).splitlines(True):
+            yield line
+
+    def _next(self, args):
+        args = tuple(args)
+        self.calls.append(args)
+        outputs = self.responses.get(args)
+        if not outputs:
+            raise FileNotFoundError(" ".join(args))
+        i = self._pos.get(args, 0)
+        self._pos[args] = i + 1
+        return outputs[i % len(outputs)]
+
+
+class Scanner:
+    """One `netsh ... mode=bssid` collection per cycle.
+
+    The old pipeline spawned PowerShell and an extra `netsh` with fixed sleeps
+    in between to coax the WLAN service into refreshing. Here the cached list
+    is streamed straight away and only re-polled, with a growing backoff, while
+    it comes back empty, for at most `ready_timeout` seconds.
+    """
+
+    def __init__(self, runner=None, timeout=10, interface_timeout=5, ready_timeout=1.5, poll_interval=0.1):
+        self.runner = runner or SubprocessRunner()
+        self.timeout = timeout
+        self.interface_timeout = interface_timeout
+        self.ready_timeout = ready_timeout
+        self.poll_interval = poll_interval
+        self.last_latency = 0.0
+
+    def collect(self):
+        """Yield AP records while `netsh` is still writing its output."""
+        parser = NetshParser()
+        clock = time.perf_counter
+        parsing = 0.0
+        try:
+            for line in self.runner.stream(NETWORKS_CMD, timeout=self.timeout):
+                t = clock()
+                ap = parser.feed(line)
+                parsing += clock() - t
+                if ap is not None:
+                    yield ap
+            ap = parser.close()
+            if ap is not None:
+                yield ap
+        except Exception:
+            return
+        finally:
+            metrics.timings().observe(metrics.PARSE, parsing)
+
+    def iter_aps(self):
+        start = time.monotonic()
+        deadline = start + self.ready_timeout
+        delay = self.poll_interval
+        while True:
+            found = False
+            for ap in self.collect():
+                found = True
+                yield ap
+            if found or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay *= 2
+        self.last_latency = time.monotonic() - start
+        metrics.timings().observe(metrics.SCAN, self.last_latency)
+
+    def scan(self):
+        return group_by_ssid(self.iter_aps())
+
+    def interface_info(self):
+        try:
+            with metrics.timer(metrics.INTERFACE):
+                out = self.runner.run(INTERFACES_CMD, timeout=self.interface_timeout)
+        except Exception:
+            return None, None
+        return parse_interfaces(out)
+
+    async def collect_async(self):
+        parser = NetshParser()
+        clock = time.perf_counter
+        parsing = 0.0
+        try:
+            async for line in self.runner.stream_async(NETWORKS_CMD, timeout=self.timeout):
+                t = clock()
+                ap = parser.feed(line)
+                parsing += clock() - t
+                if ap is not None:
+                    yield ap
+        except Exception:
+            return
+        finally:
+            metrics.timings().observe(metrics.PARSE, parsing)
+        ap = parser.close()
+        if ap is not None:
+            yield ap
+
+    async def iter_aps_async(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.ready_timeout
+        delay = self.poll_interval
+        while True:
+            found = False
+            async for ap in self.collect_async():
+                found = True
+                yield ap
+            if found or loop.time() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+            delay *= 2
+        self.last_latency = loop.time() - start
+        metrics.timings().observe(metrics.SCAN, self.last_latency)
+
+    async def interface_info_async(self):
+        try:
+            with metrics.timer(metrics.INTERFACE):
+                out = await self.runner.run_async(INTERFACES_CMD, timeout=self.interface_timeout)
+        except Exception:
+            return None, None
+        return parse_interfaces(out)
+
+
+class IwScanner:
+    """Linux backend reading nl80211 scan results through `iw`.
+
+    Each cycle reads the kernel's cached BSS list (`iw dev <if> scan dump`),
+    which costs no airtime and returns at once. Only when the freshest
+    cached entry is older than `max_age` seconds, or the cache is empty, is
+    a real scan run (`iw dev <if> scan`, which needs CAP_NET_ADMIN). If that
+    fails or finds nothing, the cached list is used and no scan is
+    triggered again for `retry_after` seconds. Records are the same AP
+    objects the netsh backend produces.
+    """
+
+    def __init__(self, runner=None, interface=None, timeout=5, interface_timeout=5, scan_timeout=15,
+                 max_age=30.0, retry_after=300.0, clock=time.monotonic):
+        self.runner = runner or SubprocessRunner()
+        self.interface = interface
+        self.timeout = timeout
+        self.interface_timeout = interface_timeout
+        self.scan_timeout = scan_timeout
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self.clock = clock
+        self.triggers = 0
+        self.cache_age = None
+        self.last_latency = 0.0
+        self._next_trigger = 0.0
+
+    @classmethod
+    def from_dir(cls, path, interface=None, latency=0.0, **kwargs):
+        """Replay `iw` output recorded as dev*.txt, scan_dump*.txt, scan_trigger*.txt and link*.txt."""
+        if interface is None:
+            for name in sorted(os.listdir(path)):
+                if name.startswith("dev") and name.endswith(".txt"):
+                    with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                        interface = parse_dev(f.read())
+                    break
+        interface = interface or "wlan0"
+        return cls(RecordedRunner.from_dir(path, latency, files=iw_files(interface)), interface, **kwargs)
+
+    def collect(self):
+        iface = self._interface()
+        if iface is None:
+            return []
+        dump, scan, _ = iw_commands(iface)
+        try:
+            out = self.runner.run(dump, timeout=self.timeout)
+        except Exception:
+            out = ""
+        aps = self._parse(out)
+        if self._stale(aps):
+            try:
+                out = self.runner.run(scan, timeout=self.scan_timeout)
+            except Exception:
+                out = ""
+            aps = self._triggered(self._parse(out), aps)
+        return aps
+
+    def iter_aps(self):
+        start = time.monotonic()
+        yield from self.collect()
+        self.last_latency = time.monotonic() - start
+        metrics.timings().observe(metrics.SCAN, self.last_latency)
+
+    def scan(self):
+        return group_by_ssid(self.iter_aps())
+
+    def interface_info(self):
+        iface = self._interface()
+        if iface is None:
+            return None, None
+        try:
+            with metrics.timer(metrics.INTERFACE):
+                out = self.runner.run(iw_commands(iface)[2], timeout=self.interface_timeout)
+        except Exception:
+            return None, None
+        return parse_link(out)
+
+    async def collect_async(self):
+        iface = await self._interface_async()
+        if iface is None:
+            return []
+        dump, scan, _ = iw_commands(iface)
+        try:
+            out = await self.runner.run_async(dump, timeout=self.timeout)
+        except Exception:
+            out = ""
+        aps = self._parse(out)
+        if self._stale(aps):
+            try:
+                out = await self.runner.run_async(scan, timeout=self.scan_timeout)
+            except Exception:
+                out = ""
+            aps = self._triggered(self._parse(out), aps)
+        return aps
+
+    async def iter_aps_async(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for ap in await self.collect_async():
+            yield ap
+        self.last_latency = loop.time() - start
+        metrics.timings().observe(metrics.SCAN, self.last_latency)
+
+    async def interface_info_async(self):
+        iface = await self._interface_async()
+        if iface is None:
+            return None, None
+        try:
+            with metrics.timer(metrics.INTERFACE):
+                out = await self.runner.run_async(iw_commands(iface)[2], timeout=self.interface_timeout)
+        except Exception:
+            return None, None
+        return parse_link(out)
+
+    def _parse(self, out):
+        with metrics.timer(metrics.PARSE):
+            aps, age = parse_scan(out)
+        self.cache_age = age / 1000 if age is not None else None
+        return aps
+
+    def _stale(self, aps):
+        if aps and self.cache_age is not None and self.cache_age <= self.max_age:
+            return False
+        return self.clock() >= self._next_trigger
+
+    def _triggered(self, fresh, cached):
+        self.triggers += 1
+        self._next_trigger = self.clock() + (self.max_age if fresh else self.retry_after)
+        return fresh or cached
+
+    def _interface(self):
+        if self.interface is None:
+            try:
+                self.interface = parse_dev(self.runner.run(IW_DEV_CMD, timeout=self.interface_timeout))
+            except Exception:
+                return None
+        return self.interface
+
+    async def _interface_async(self):
+        if self.interface is None:
+            try:
+                self.interface = parse_dev(await self.runner.run_async(IW_DEV_CMD, timeout=self.interface_timeout))
+            except Exception:
+                return None
+        return self.interface
+
+
+def parse_interfaces(out):
+    ssid = None
+    bssid = None
+    for line in out.splitlines():
+        if ":" not in line:
+            continue
+        key, val = [s.strip() for s in line.split(":", 1)]
+        kl = key.lower()
+        if kl.startswith("ssid") and ssid is None:
+            ssid = val
+        elif kl.startswith("bssid"):
+            bssid = val
+    return ssid, bssid
+
+
+_default_scanner = None
+
+
+def default_backend():
+    return "iw" if sys.platform.startswith("linux") else "netsh"
+
+
+def open_scanner(backend=None, recorded=None, interface=None):
+    """A scanner for `backend`; with `recorded`, replaying captured output from that directory."""
+    if backend is None:
+        if recorded is not None:
+            is_iw = any(name.startswith("scan_dump") for name in os.listdir(recorded))
+            backend = "iw" if is_iw else "netsh"
+        else:
+            backend = default_backend()
+    if backend == "iw":
+        if recorded is not None:
+            return IwScanner.from_dir(recorded, interface)
+        return IwScanner(interface=interface)
+    return Scanner(RecordedRunner.from_dir(recorded) if recorded is not None else None)
+
+
+def default_scanner():
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = open_scanner()
+    return _default_scanner
+
+
+def set_default_scanner(scanner):
+    global _default_scanner
+    _default_scanner = scanner
+
+
+def scan_all_aps():
+    return default_scanner().scan()
+
+
+def scan_records():
+    """Every AP record of one scan, with its signal, channel and security attributes."""
+    return list(default_scanner().iter_aps())
+
+
+def get_wifi_info():
+    """(ssid, bssid string) of the current connection, or (None, None)."""
+    return default_scanner().interface_info()
+
+
+def capture_baseline(store, targets=None, any_ssid=False):
+    """Scan once and make what is on air the baseline of each SSID in `targets`.
+
+    Without `targets` the connected SSID is used or, with `any_ssid` and no
+    connection, the first SSID in the scan. An SSID that the scan missed
+    but that we are connected to gets the BSSID we are associated with.
+    Returns (connected SSID, [SSIDs whose baseline was set]).
+    """
+    ssid, bssid = get_wifi_info()
+    bssid = parse_bssid(bssid)
+    records = scan_records()
+    all_aps = group_by_ssid(records)
+    if not targets:
+        targets = [ssid] if ssid else list(all_aps)[:1] if any_ssid else []
+    configured = []
+    for target in targets:
+        if target in all_aps:
+            profile = SecurityProfile.from_aps(ap for ap in records if ap.ssid == target)
+            store.replace(target, all_aps[target], profile)
+        elif target == ssid and bssid is not None:
+            store.replace(target, [bssid])
+        else:
+            continue
+        configured.append(target)
+    return ssid, configured
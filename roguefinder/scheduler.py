@@ -0,0 +1,97 @@
+import random
+import time
+from collections import deque
+
+HOUR = 3600.0
+
+
+class ScanScheduler:
+    """Chooses the delay before the next scan.
+
+    - Every scan that changes nothing multiplies the delay by `backoff`, up to
+      `max_interval`; any change drops it back to `interval`.
+    - A new finding switches to `burst_interval` for `burst_window` seconds;
+      a finding that repeats one already reported does not extend the burst.
+    - With `budget` set (seconds of scanning allowed per hour), the delay is
+      stretched so that average scan time keeps within it.
+    - `jitter` spreads scans by +/- that fraction so a fleet of sensors does
+      not scan in lockstep.
+
+    `clock` and `rng` can be replaced for deterministic tests.
+    """
+
+    def __init__(self, interval=10, max_interval=60, backoff=1.5, burst_interval=2,
+                 burst_window=60, jitter=0.1, budget=None, adaptive=True,
+                 clock=time.monotonic, rng=random.random):
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.burst_interval = min(burst_interval, interval)
+        self.burst_window = burst_window
+        self.jitter = jitter
+        self.budget = budget
+        self.adaptive = adaptive
+        self.clock = clock
+        self.rng = rng
+        self.current = interval
+        self.burst_until = None
+        self.unchanged = 0
+        self.mode = "normal"
+        self.last_delay = interval
+        self._history = deque()
+        self._used = 0.0
+
+    def record(self, changed, suspicious=False, duration=0.0):
+        now = self.clock()
+        self._history.append((now, duration))
+        self._used += duration
+        self._trim(now)
+        if not self.adaptive:
+            return
+        if suspicious:
+            self.burst_until = now + self.burst_window
+        if changed or suspicious:
+            self.unchanged = 0
+            self.current = self.interval
+        else:
+            self.unchanged += 1
+            self.current = min(self.max_interval, self.interval * self.backoff ** self.unchanged)
+
+    def next_delay(self):
+        now = self.clock()
+        self._trim(now)
+        delay = self.current
+        mode = "backoff" if delay > self.interval else "normal"
+        if not self.adaptive:
+            delay = self.interval
+            mode = "fixed"
+        elif self.burst_until is not None and now < self.burst_until:
+            delay = self.burst_interval
+            mode = "burst"
+        if self.budget and self._history:
+            # Spacing needed for the average scan to stay within the duty cycle.
+            paced = (self._used / len(self._history)) * HOUR / self.budget
+            if self._used >= self.budget:
+                paced = max(paced, self._history[0][0] + HOUR - now)
+            if paced > delay:
+                delay = paced
+                mode = "budget"
+        if self.jitter and self.adaptive:
+            delay *= 1 + self.jitter * (2 * self.rng() - 1)
+        self.mode = mode
+        self.last_delay = delay
+        return delay
+
+    def used(self):
+        self._trim(self.clock())
+        return self._used
+
+    def describe(self):
+        return f"{self.last_delay:.1f}s ({self.mode})"
+
+    def _trim(self, now):
+        history = self._history
+        while history and now - history[0][0] >= HOUR:
+            self._used -= history.popleft()[1]
+        if not history:
+            self._used = 0.0
@@ -0,0 +1,261 @@
+import operator
+import unicodedata
+from collections import OrderedDict
+from roguefinder import metrics
+
+SIMILARITY_THRESHOLD = 0.7
+# Below this many characters after normalizing, an SSID only matches an
+# identical one. An SSID of zero-width or blank characters normalizes to "",
+# which is a substring of every name; one or two letters nearly are.
+MIN_MATCH_LENGTH = 3
+
+# Characters commonly swapped into lookalike SSIDs, folded to the ASCII letter
+# they imitate. Applied after NFKC and casefolding.
+CONFUSABLES = {
+    "0": "o", "1": "l", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "|": "l", "!": "l", "i": "l",
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "l",
+    "ї": "l", "ј": "j", "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "l", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+    # Dashes and invisible characters that are easy to miss in a network list
+    "_": "-", "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-",
+    "\u200b": "", "\u200c": "", "\u200d": "", "\ufeff": "",
+}
+_CONFUSABLES_TABLE = str.maketrans(CONFUSABLES)
+
+
+def ssid_similarity(ssid1, ssid2):
+    if not ssid1 or not ssid2:
+        return 0.0
+    s1 = ssid1.strip().lower()
+    s2 = ssid2.strip().lower()
+    if not s1 or not s2:
+        return 0.0
+    if s1 == s2:
+        return 1.0
+    if min(len(s1), len(s2)) < MIN_MATCH_LENGTH:
+        return 0.0
+    if s1 in s2 or s2 in s1:
+        return 0.9
+    len1, len2 = len(s1), len(s2)
+    if len1 == 0 or len2 == 0:
+        return 0.0
+    max_len = max(len1, len2)
+    matches = sum(c1 == c2 for c1, c2 in zip(s1, s2))
+    base_similarity = matches / max_len
+    if abs(len1 - len2) <= 2:
+        base_similarity += 0.1
+    return min(base_similarity, 1.0)
+
+
+def _lower(ssid):
+    return ssid.strip().lower()
+
+
+def _positional_score(s1, s2):
+    # ssid_similarity past its equality and substring checks, on strings
+    # that are already stripped and lowercased.
+    len1, len2 = len(s1), len(s2)
+    if len1 == 0 or len2 == 0:
+        return 0.0
+    score = sum(map(operator.eq, s1, s2)) / max(len1, len2)
+    if abs(len1 - len2) <= 2:
+        score += 0.1
+    return min(score, 1.0)
+
+
+def ssid_skeleton(ssid):
+    return unicodedata.normalize("NFKC", ssid).casefold().translate(_CONFUSABLES_TABLE).strip()
+
+
+def pattern_masks(pattern):
+    peq = {}
+    bit = 1
+    for c in pattern:
+        peq[c] = peq.get(c, 0) | bit
+        bit <<= 1
+    return peq
+
+
+def myers_distance(peq, m, text):
+    """Levenshtein distance between a pattern (given by its masks) and `text`.
+
+    Bit-parallel algorithm of Myers (1999) in Hyyrö's global form: one column
+    of the DP matrix per character of `text`, held as vertical delta bit
+    vectors.
+    """
+    if m == 0:
+        return len(text)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def edit_similarity(ssid1, ssid2):
+    if not ssid1 or not ssid2:
+        return 0.0
+    s1 = ssid_skeleton(ssid1)
+    s2 = ssid_skeleton(ssid2)
+    return _edit_score(s1, pattern_masks(s1), s2)
+
+
+def _edit_score(s1, peq, s2):
+    if not s1 or not s2:
+        return 0.0
+    if s1 == s2:
+        return 1.0
+    if min(len(s1), len(s2)) < MIN_MATCH_LENGTH:
+        return 0.0
+    if s1 in s2 or s2 in s1:
+        return 0.9
+    max_len = max(len(s1), len(s2))
+    return 1.0 - myers_distance(peq, len(s1), s2) / max_len
+
+
+def _positional_bound(len1, len2):
+    # Positional matches can never exceed the shorter length.
+    bound = min(len1, len2) / max(len1, len2)
+    if abs(len1 - len2) <= 2:
+        bound += 0.1
+    return bound
+
+
+def _edit_bound(len1, len2):
+    # The edit distance is at least the length difference.
+    return 1.0 - abs(len1 - len2) / max(len1, len2)
+
+
+MATCHERS = ("positional", "edit")
+
+
+class SimilarityIndex:
+    """Threshold matcher over a fixed set of baseline SSIDs.
+
+    With the default "positional" matcher, results are exactly those of
+    `ssid_similarity(...) >= threshold`; "edit" uses `edit_similarity`, which
+    folds homoglyphs first and scores by bit-parallel edit distance against
+    pattern masks built once per baseline. A candidate is normalized once;
+    each baseline then costs an equality and a substring test, and only the
+    baselines whose length bucket admits the candidate's length are scored.
+    The result for a candidate (all its matches) is memoized in a bounded
+    LRU of `cache_size` candidates, since the same neighbour SSIDs come back
+    every scan; the cache does not grow with the number of baselines.
+    """
+
+    def __init__(self, baselines, threshold=SIMILARITY_THRESHOLD, cache_size=16384, matcher="positional"):
+        if matcher not in MATCHERS:
+            raise ValueError(f"unknown matcher: {matcher}")
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.matcher = matcher
+        self.baselines = [b for b in dict.fromkeys(baselines) if b]
+        if matcher == "edit":
+            self._normalize = ssid_skeleton
+            bound = _edit_bound
+        else:
+            self._normalize = _lower
+            bound = _positional_bound
+        self._norm = {b: self._normalize(b) for b in self.baselines}
+        self._masks = {}
+        if matcher == "edit":
+            self._masks = {b: pattern_masks(s) for b, s in self._norm.items()}
+        self._buckets = {}
+        for b in self.baselines:
+            len1 = len(self._norm[b])
+            if len1 == 0:
+                continue
+            len2 = 1
+            # Past len1 / (threshold - 0.1) both bounds only decrease.
+            limit = int(len1 / max(threshold - 0.1, 0.01)) + 3
+            while len2 <= limit:
+                if bound(len1, len2) >= threshold - 1e-9:
+                    self._buckets.setdefault(len2, set()).add(b)
+                len2 += 1
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def similar(self, baseline, candidate):
+        """Return the similarity score if it reaches the threshold, else None."""
+        if baseline not in self._norm or baseline == candidate:
+            return self._check(baseline, candidate)
+        for b, score in self._lookup(candidate):
+            if b == baseline:
+                return score
+        return None
+
+    def matches(self, candidate):
+        """Return [(baseline, score)] for every baseline the candidate resembles."""
+        with metrics.timer(metrics.SIMILARITY):
+            return list(self._lookup(candidate))
+
+    def _lookup(self, candidate):
+        cache = self._cache
+        found = cache.get(candidate)
+        if found is not None:
+            cache.move_to_end(candidate)
+            self.hits += 1
+            return found
+        self.misses += 1
+        found = self._scan(candidate)
+        cache[candidate] = found
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return found
+
+    def _scan(self, candidate):
+        s2 = self._normalize(candidate)
+        if not s2:
+            return ()
+        short = len(s2) < MIN_MATCH_LENGTH
+        near = self._buckets.get(len(s2), ())
+        threshold = self.threshold
+        found = []
+        for b, s1 in self._norm.items():
+            if b == candidate:
+                continue
+            if s1 == s2:
+                score = 1.0
+            elif short or len(s1) < MIN_MATCH_LENGTH:
+                continue
+            elif s1 in s2 or s2 in s1:
+                score = 0.9
+            elif b not in near:
+                continue
+            elif self.matcher == "edit":
+                score = _edit_score(s1, self._masks[b], s2)
+            else:
+                score = _positional_score(s1, s2)
+            if score >= threshold:
+                found.append((b, score))
+        return tuple(found)
+
+    def _check(self, baseline, candidate):
+        if not baseline or not candidate:
+            return None
+        if self.matcher == "edit":
+            score = edit_similarity(baseline, candidate)
+        else:
+            score = ssid_similarity(baseline, candidate)
+        return score if score >= self.threshold else None
@@ -0,0 +1,254 @@
+import gzip
+import http.client
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+API = "/v1"
+GZIP_MIN = 1024
+TOKEN_ENV = "ROGUEFINDER_TOKEN"
+
+
+def load_token(path=None):
+    """The aggregator's shared secret: the first line of `path`, else $ROGUEFINDER_TOKEN."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            token = f.readline().strip()
+    else:
+        token = os.environ.get(TOKEN_ENV, "").strip()
+    return token or None
+
+
+def pack(pairs):
+    """[(ssid, bssid), ...] -> {ssid: [bssid, ...]}, the wire form of a delta."""
+    groups = {}
+    for ssid, bssid in pairs:
+        groups.setdefault(ssid, []).append(bssid)
+    return groups
+
+
+def unpack(groups):
+    for ssid, bssids in (groups or {}).items():
+        for bssid in bssids:
+            if isinstance(bssid, int) and 0 <= bssid < 1 << 48:
+                yield ssid, bssid
+
+
+def encode_body(obj):
+    body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if len(body) >= GZIP_MIN:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+class Connection:
+    """One persistent HTTP/1.1 connection to the aggregator, reopened after errors.
+
+    `https://` URLs are verified against the system CAs, or `cafile` for a
+    private CA. `token` is sent as a bearer token with every request.
+    """
+
+    def __init__(self, url, timeout=10, token=None, cafile=None):
+        parts = urlsplit(url if "//" in url else f"http://{url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 8470
+        self.prefix = parts.path.rstrip("/")
+        self.tls = parts.scheme == "https"
+        self.timeout = timeout
+        self.token = token
+        self.cafile = cafile
+        self._conn = None
+
+    def _open(self):
+        if not self.tls:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        import ssl
+        context = ssl.create_default_context(cafile=self.cafile)
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=context)
+
+    def request(self, method, path, obj=None, headers=None):
+        body, hdrs = encode_body(obj) if obj is not None else (None, {})
+        if self.token is not None:
+            hdrs["Authorization"] = f"Bearer {self.token}"
+        hdrs.update(headers or {})
+        for attempt in (0, 1):
+            if self._conn is None:
+                self._conn = self._open()
+            try:
+                self._conn.request(method, self.prefix + API + path, body=body, headers=hdrs)
+                resp = self._conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException):
+                self.close()
+                # A kept-alive connection may have been closed by the server
+                # while idle; retry once on a fresh one.
+                if attempt:
+                    raise
+                continue
+            if resp.getheader("Connection", "").lower() == "close":
+                self.close()
+            return resp.status, resp.getheader("ETag"), json.loads(data) if data else None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def push_baseline(url, ssid, bssids, replace=True, token=None, cafile=None):
+    conn = Connection(url, token=token, cafile=cafile)
+    try:
+        status, _, reply = conn.request("POST", "/baseline", {"ssid": ssid, "bssids": sorted(bssids), "replace": replace})
+        return status == 200
+    finally:
+        conn.close()
+
+
+class Uplink:
+    """Sensor side of the aggregator protocol.
+
+    The scan loop calls `record()` with each cycle's AP delta. Deltas are
+    coalesced (an AP that appears and vanishes between uploads cancels out)
+    and a background thread uploads them every `interval` seconds over one
+    kept-alive connection; an empty upload doubles as a heartbeat. The
+    first upload, and any upload after the aggregator asks for a resync, is
+    a full snapshot of the AP table. When the aggregator reports a new
+    shared baseline version it is fetched and handed back to the scan loop
+    through `take_baseline()`.
+
+    An upload that gets no reply, or a server error, is resent unchanged,
+    under the same sequence number, until it is acknowledged: the
+    aggregator may have applied it, and it drops a repeated number without
+    looking at the contents. Events recorded in the meantime wait for the
+    next number. An upload the aggregator refuses (4xx) would be refused
+    again, so it is dropped and a full snapshot sent instead. A 401 stops
+    the uplink for good; `rejected` then says why.
+    """
+
+    def __init__(self, url, sensor, site, interval=5.0, max_pending=50000, timeout=10, token=None, cafile=None):
+        self.conn = Connection(url, timeout=timeout, token=token, cafile=cafile)
+        self.sensor = sensor
+        self.site = site
+        self.interval = interval
+        self.max_pending = max_pending
+        self.seq = 0
+        self.need_full = True
+        self.uploads = 0
+        self.failures = 0
+        self.baseline_version = None
+        self.rejected = None
+        self._pending = {}
+        self._full = None
+        self._inflight = None
+        self._baseline = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="uplink", daemon=True)
+        self._thread.start()
+
+    def record(self, new_aps, lost_aps, present):
+        """Queue a cycle's delta; `present()` returns the AP table contents for a resync."""
+        with self._lock:
+            if self.rejected:
+                return
+            if self.need_full:
+                self._full = [(ap.ssid, ap.bssid) for ap in present()]
+                self._pending.clear()
+                self.need_full = False
+                return
+            pending = self._pending
+            for aps, value in ((new_aps, True), (lost_aps, False)):
+                for ap in aps:
+                    key = (ap.ssid, ap.bssid)
+                    # Events for one AP alternate, so a second change undoes the first.
+                    if key in pending:
+                        del pending[key]
+                    else:
+                        pending[key] = value
+            if len(pending) > self.max_pending:
+                pending.clear()
+                self.need_full = True
+
+    def resync(self):
+        with self._lock:
+            self.need_full = True
+            self._pending.clear()
+            self._inflight = None
+
+    def take_baseline(self):
+        with self._lock:
+            baseline, self._baseline = self._baseline, None
+        return baseline
+
+    def flush(self):
+        with self._lock:
+            msg = self._inflight
+            if self._full is not None:
+                # A fresh snapshot supersedes anything still unacknowledged.
+                msg = None
+            if msg is None:
+                full, self._full = self._full, None
+                pending, self._pending = self._pending, {}
+                if full is None and self.need_full:
+                    # Nothing useful to send until the scan loop supplies a snapshot.
+                    return True
+                msg = {"sensor": self.sensor, "site": self.site, "seq": self.seq + 1}
+                if full is not None:
+                    msg["full"] = True
+                    msg["add"] = pack(full)
+                else:
+                    msg["add"] = pack(k for k, v in pending.items() if v)
+                    msg["remove"] = pack(k for k, v in pending.items() if not v)
+                self._inflight = msg
+        try:
+            status, _, reply = self.conn.request("POST", "/deltas", msg)
+        except Exception:
+            status, reply = None, None
+        if status != 200:
+            self.failures += 1
+            if status == 401:
+                self.rejected = "the aggregator refused the token (401)"
+                self._closing = True
+                self.resync()
+            elif status is not None and status < 500:
+                # Refused as it stands, so sending it again cannot help.
+                self.resync()
+            return False
+        with self._lock:
+            if self._inflight is msg:
+                self._inflight = None
+        self.uploads += 1
+        if reply.get("resync"):
+            self.resync()
+            return True
+        self.seq += 1
+        if reply.get("baseline") != self.baseline_version:
+            self._fetch_baseline()
+        return True
+
+    def close(self, timeout=5.0):
+        self._closing = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self.conn.close()
+
+    def _fetch_baseline(self):
+        try:
+            status, etag, reply = self.conn.request("GET", "/baseline")
+        except Exception:
+            return
+        if status == 200 and reply:
+            with self._lock:
+                self._baseline = {ssid: [b for _, b in unpack({ssid: bssids})]
+                                  for ssid, bssids in reply.get("ssids", {}).items()}
+            self.baseline_version = reply.get("version")
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
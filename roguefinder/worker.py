@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+from collections import deque
+
+
+class MonitorWorker:
+    """Runs all scanning on one long-lived background thread.
+
+    `step()` performs one scan and returns the delay before the next. The
+    thread waits on an Event rather than sleeping, so `start()`, `stop()`,
+    `scan_now()` and `submit()` take effect at once. Jobs passed to `submit()`
+    (e.g. a baseline setup) run on the same thread between scans, so two
+    scans can never overlap however often Start/Stop are pressed. `stop()`
+    also calls `cancel` to abort a scan in progress; a scan that was about to
+    start when Stop landed must abort too, so `cancel` is expected to stick
+    until `start()` or `scan_now()` calls `resume`.
+    """
+
+    def __init__(self, step, cancel=None, resume=None, on_error=None, error_delay=10, name="monitor"):
+        self.step = step
+        self.cancel = cancel
+        self.resume = resume
+        self.on_error = on_error
+        self.error_delay = error_delay
+        self.name = name
+        self.monitoring = False
+        self.scanning = False
+        self._jobs = deque()
+        self._scan_requested = False
+        self._closed = False
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        # Before the scan is requested, so it cannot see the last Stop's cancel.
+        if self.resume is not None:
+            self.resume()
+        with self._lock:
+            self.monitoring = True
+            self._scan_requested = True
+        self._notify()
+
+    def stop(self):
+        with self._lock:
+            self.monitoring = False
+            self._scan_requested = False
+        if self.scanning and self.cancel is not None:
+            self.cancel()
+        self._wake.set()
+
+    def scan_now(self):
+        """Request an immediate scan; ignored while one is already running."""
+        with self._lock:
+            if self.scanning:
+                return False
+            if self.resume is not None:
+                self.resume()
+            self._scan_requested = True
+        self._notify()
+        return True
+
+    def submit(self, job):
+        with self._lock:
+            self._jobs.append(job)
+        self._notify()
+
+    def close(self, timeout=None):
+        with self._lock:
+            self._closed = True
+            self.monitoring = False
+        if self.scanning and self.cancel is not None:
+            self.cancel()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _notify(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        next_at = None
+        while True:
+            timeout = None
+            with self._lock:
+                if self._closed:
+                    return
+                job = self._jobs.popleft() if self._jobs else None
+                now = time.monotonic()
+                scan = job is None and (self._scan_requested or
+                                        (self.monitoring and next_at is not None and now >= next_at))
+                if scan:
+                    self._scan_requested = False
+                    self.scanning = True
+                elif job is None:
+                    self._wake.clear()
+                    if self.monitoring and next_at is not None:
+                        timeout = next_at - now
+            if job is not None:
+                self._call(job)
+            elif scan:
+                delay = self._call(self.step, self.error_delay)
+                self.scanning = False
+                next_at = time.monotonic() + delay if delay is not None else None
+            else:
+                self._wake.wait(timeout)
+
+    def _call(self, fn, error_delay=None):
+        try:
+            return fn()
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+            return error_delay
+        except BaseException as e:
+            # An aborted scan raises asyncio.CancelledError. Look it up rather
+            # than import asyncio here, so the GUI starts without it; if asyncio
+            # was never loaded, nothing could have been cancelled.
+            asyncio = sys.modules.get("asyncio")
+            if asyncio is not None and isinstance(e, asyncio.CancelledError):
+                return None
+            raise